@@ -0,0 +1,68 @@
+"""Throughput of creating calendar events one by one and with batch requests, and API calls of moved classes.
+
+Runs against `FakeCalendarServer` with a fixed delay per HTTP request that models the round-trip to Google.
+The rate limiter is disabled, so only the round-trips are measured.
+Run with `pdm run python -m benchmarks.bench_calendar`.
+"""
+
+import argparse
+import time
+from datetime import datetime, timedelta
+
+from benchmarks.fake_calendar import FakeCalendarServer
+from itmo_ai_timetable.db.base import Class
+from itmo_ai_timetable.instrumentation import get_instrumentation
+from itmo_ai_timetable.rate_limiter import TokenBucket
+from itmo_ai_timetable.repositories.calendar import MAX_BATCH_SIZE, CalendarRepository
+
+START = datetime(2024, 9, 2, 10, 0)  # noqa: DTZ001
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--classes", type=int, default=200, help="Number of created events")
+    parser.add_argument("--latency", type=float, default=0.05, help="Delay of each HTTP request in seconds")
+    args = parser.parse_args()
+    get_instrumentation().configure(enabled=True)
+
+    classes = [
+        Class(
+            id=class_id, start_time=START + timedelta(days=class_id), end_time=START + timedelta(days=class_id, hours=1)
+        )
+        for class_id in range(args.classes)
+    ]
+    with FakeCalendarServer(latency=args.latency) as server:
+        repository = CalendarRepository(server.make_client(), TokenBucket(rate=float("inf"), capacity=MAX_BATCH_SIZE))
+
+        start = time.perf_counter()
+        for class_ in classes:
+            repository.add_class_to_calendar("sequential", "Курс", class_.start_time, class_.end_time)
+        sequential, sequential_requests = time.perf_counter() - start, server.http_requests
+
+        start = time.perf_counter()
+        repository.add_classes_to_calendar("batched", "Курс", classes)
+        batched, batched_requests = time.perf_counter() - start, server.http_requests - sequential_requests
+
+        # every class is moved by an hour: delete and create events again, or patch them in place
+        event_ids = repository.add_classes_to_calendar("moved", "Курс", classes)
+        for class_ in classes:
+            class_.gcal_event_id = event_ids[class_.id]
+            class_.start_time += timedelta(hours=1)
+            class_.end_time += timedelta(hours=1)
+        with get_instrumentation().span("recreate"):
+            repository.delete_classes_from_calendar("moved", event_ids.values())
+            event_ids = repository.add_classes_to_calendar("moved", "Курс", classes)
+        for class_ in classes:
+            class_.gcal_event_id = event_ids[class_.id]
+        with get_instrumentation().span("patch"):
+            repository.update_classes_in_calendar("moved", "Курс", classes)
+
+    print(f"sequential: {args.classes / sequential:.1f} events/s, {sequential_requests} HTTP requests")
+    print(f"batched:    {args.classes / batched:.1f} events/s, {batched_requests} HTTP requests")
+    spans = get_instrumentation().snapshot()["spans"]
+    for name, calls in (("recreate", 2 * args.classes), ("patch", args.classes)):
+        print(f"moved, {name}: {calls} API calls in {spans[name][1]:.3f} s")
+
+
+if __name__ == "__main__":
+    main()
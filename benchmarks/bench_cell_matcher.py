@@ -0,0 +1,89 @@
+"""Compare the cell matcher with the keyword and time search it replaced, on repeated and on unique cells.
+
+Run with `pdm run python -m benchmarks.bench_cell_matcher`.
+"""
+
+import argparse
+import random
+import timeit
+
+from itmo_ai_timetable.cell_matcher import CellTextMatcher
+
+KEYWORDS = ["Экзамен", "Лекция", "Зачет", "Семинар", "Защита", "Дифф. зачет"]
+TITLES = [
+    "Машинное обучение на больших данных (Big Data ML) Чат курса",
+    "Глубокие генеративные модели (Deep Generative Models)",
+    "Разработка приложений разговорного искусственного интеллекта",
+    "Публичные выступления 1 \\ Финансовая грамотность 3",
+    "C++ hard",
+]
+
+
+def legacy_match(cell: str) -> tuple[str, str | None, tuple[int, int] | None, tuple[int, int] | None]:
+    """Removed `_find_key_words_in_cell` followed by `_find_time_in_cell`, the search before the matcher."""
+    key_word = None
+    for word in KEYWORDS:
+        if word in cell:
+            cell, key_word = cell.replace(word, "").strip(), word
+            break
+
+    cell = cell.strip()
+    if not cell or ("-" not in cell and ":" not in cell):
+        return cell, key_word, None, None
+    start_time = end_time = None
+    cell = cell.replace("-", " ")
+    for time in cell.split():
+        if ":" not in time:
+            continue
+        hour, minute = map(int, time.split(":"))
+        if start_time is None:
+            start_time = (hour, minute)
+        else:
+            end_time = (hour, minute)
+        cell = cell.replace(time, "").strip()
+    return cell, key_word, start_time, end_time
+
+
+def generate_cells(count: int, *, unique: bool = False, seed: int = 0) -> list[str]:
+    """Cells of a timetable, by default drawn from a small vocabulary as the same courses repeat every week."""
+    rng = random.Random(seed)
+    cells = []
+    for i in range(count):
+        cell = rng.choice(TITLES)
+        if unique:
+            cell += f" {i}"
+        if rng.random() < 0.3:  # noqa: PLR2004
+            cell += f" {rng.choice(KEYWORDS)}"
+        if rng.random() < 0.2:  # noqa: PLR2004
+            cell += f" {rng.randint(9, 20)}:{rng.choice(['00', '30'])} - {rng.randint(10, 21)}:15"
+        cells.append(cell)
+    return cells
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--cells", type=int, default=50_000, help="Number of cells")
+    parser.add_argument("--repeat", type=int, default=5, help="Number of runs, the best one is reported")
+    args = parser.parse_args()
+
+    for unique in (False, True):
+        cells = generate_cells(args.cells, unique=unique)
+        print(f"{len(set(cells))} distinct of {len(cells)} cells")
+        results = {
+            "legacy": min(timeit.repeat(lambda: [legacy_match(c) for c in cells], number=1, repeat=args.repeat)),  # noqa: B023
+            # a fresh matcher per run, so the memo is filled within the measured pass as with a new sheet
+            "matcher": min(
+                timeit.repeat(
+                    lambda: [m.match(c) for m in [CellTextMatcher(KEYWORDS)] for c in cells],  # noqa: B023
+                    number=1,
+                    repeat=args.repeat,
+                ),
+            ),
+        }
+        for name, seconds in results.items():
+            print(f"{name:>10}: {seconds * 1000:8.1f} ms, {args.cells / seconds:12,.0f} cells/s")
+        print(f"   speedup: {results['legacy'] / results['matcher']:.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,48 @@
+"""Throughput of course name normalization on timetable-like cells.
+
+Run with `pdm run python -m benchmarks.bench_cleaner`.
+"""
+
+import argparse
+import random
+import timeit
+
+from benchmarks.timetable_generator import COURSES
+from itmo_ai_timetable.cleaner import CourseNameNormalizer
+
+
+def generate_names(normalizer: CourseNameNormalizer, count: int, seed: int = 0) -> list[str]:
+    rng = random.Random(seed)
+    names = [*COURSES, *normalizer.aliases]
+    # most cells have no track suffix
+    suffixes = ["", "", "", "\n(LLM трек)", "\n(Hard ML)"]
+    return [rng.choice(names) + rng.choice(suffixes) for _ in range(count)]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--names", type=int, default=100_000, help="Number of course names")
+    parser.add_argument("--repeat", type=int, default=5, help="Number of runs, the best one is reported")
+    args = parser.parse_args()
+
+    normalizer = CourseNameNormalizer()
+    names = generate_names(normalizer, args.names)
+    print(f"{len(set(names))} distinct of {len(names)} names, {len(normalizer.aliases)} aliases")
+
+    def run_memoized() -> None:
+        normalizer.normalize.cache_clear()
+        for name in names:
+            normalizer.normalize(name)
+
+    results = {
+        "uncached": min(
+            timeit.repeat(lambda: [normalizer._normalize(name) for name in names], number=1, repeat=args.repeat)  # noqa: SLF001
+        ),
+        "memoized": min(timeit.repeat(run_memoized, number=1, repeat=args.repeat)),
+    }
+    for name, seconds in results.items():
+        print(f"{name:>10}: {seconds * 1000:8.1f} ms, {args.names / seconds:12,.0f} names/s")
+
+
+if __name__ == "__main__":
+    main()
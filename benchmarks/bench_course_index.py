@@ -0,0 +1,37 @@
+"""Lookup time of the trigram course index on misspelled names.
+
+Run with `pdm run python -m benchmarks.bench_course_index`.
+"""
+
+import argparse
+import random
+import timeit
+
+from itmo_ai_timetable.course_index import CourseNameIndex
+
+
+def misspell(name: str, rng: random.Random) -> str:
+    i = rng.randrange(len(name))
+    return name[:i] + name[i + 1 :]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--courses", type=int, default=300, help="Number of course names in the index")
+    parser.add_argument("--lookups", type=int, default=10_000, help="Number of lookups")
+    args = parser.parse_args()
+
+    rng = random.Random(0)
+    words = ["машинное", "обучение", "анализ", "данных", "системы", "модели", "глубокие", "большие", "языковые"]
+    names = [f"{' '.join(rng.sample(words, 3))} {i}" for i in range(args.courses)]
+    queries = [misspell(rng.choice(names), rng) for _ in range(args.lookups)]
+
+    build = timeit.timeit(lambda: CourseNameIndex(names), number=1)
+    index = CourseNameIndex(names)
+    lookups = timeit.timeit(lambda: [index.best_match(query) for query in queries], number=1)
+    print(f"build: {build * 1000:.2f} ms for {args.courses} courses")
+    print(f"lookup: {lookups / args.lookups * 1e6:.1f} us per name")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,138 @@
+"""Query plans and latency of the hot lookups before and after the `add_lookup_indexes` migration.
+
+Needs a running Postgres from settings, a temporary database is created and dropped.
+Run with `pdm run python -m benchmarks.bench_indexes`.
+"""
+
+import argparse
+import asyncio
+import os
+import time
+from pathlib import Path
+from typing import Any
+from uuid import uuid4
+
+from alembic.command import upgrade
+from alembic.config import Config
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncEngine, create_async_engine
+from sqlalchemy_utils import create_database, drop_database
+
+from itmo_ai_timetable.db.base import get_class_status_id
+from itmo_ai_timetable.schemes import ClassStatus
+from itmo_ai_timetable.settings import Settings
+
+PROJECT_PATH = Path(__file__).parent.parent
+# last revision without the indexes
+BEFORE_REVISION = "c35b1b08a8b9"
+SYNCED = get_class_status_id(ClassStatus.synced)
+NEED_TO_ADD = get_class_status_id(ClassStatus.need_to_add)
+DELETED = get_class_status_id(ClassStatus.deleted)
+
+# queries as they are sent by `DBRepository`
+QUERIES: dict[str, tuple[str, dict[str, Any]]] = {
+    "course by name": ("SELECT id FROM course WHERE name = :name", {"name": "Курс 777"}),
+    "synced classes of course": (
+        "SELECT id, start_time, end_time FROM class WHERE course_id = :course_id AND class_status_id = :status_id",
+        {"course_id": 500, "status_id": SYNCED},
+    ),
+    "unsynced classes of course": (
+        f"SELECT * FROM class WHERE course_id = :course_id AND class_status_id NOT IN ({SYNCED}, {DELETED})",  # noqa: S608
+        {"course_id": 500},
+    ),
+    "user by name": (
+        'SELECT id FROM "user" WHERE user_real_name = :name AND studying_course = :studying_course',
+        {"name": "Студент 7777", "studying_course": 2},
+    ),
+    "class status by name": ("SELECT id FROM class_status WHERE name = :name", {"name": ClassStatus.synced.value}),
+}
+
+
+async def seed(database_uri: str, args: argparse.Namespace) -> None:
+    engine = create_async_engine(database_uri)
+    try:
+        await _seed(engine, args)
+    finally:
+        await engine.dispose()
+
+
+async def _seed(engine: AsyncEngine, args: argparse.Namespace) -> None:
+    async with engine.begin() as conn:
+        await conn.execute(text("SELECT setseed(0)"))
+        await conn.execute(
+            text("INSERT INTO course (name) SELECT 'Курс ' || i FROM generate_series(1, :courses) i"),
+            {"courses": args.courses},
+        )
+        await conn.execute(
+            text(
+                "INSERT INTO class (course_id, start_time, end_time, class_status_id) "
+                "SELECT c.id, now() + make_interval(hours => g), now() + make_interval(hours => g, mins => 90), "
+                "CASE WHEN random() < :unsynced THEN CAST(:need_to_add AS integer) ELSE CAST(:synced AS integer) END "
+                "FROM course c, generate_series(1, :classes) g",
+            ),
+            {"classes": args.classes, "unsynced": args.unsynced, "need_to_add": NEED_TO_ADD, "synced": SYNCED},
+        )
+        await conn.execute(
+            text(
+                'INSERT INTO "user" (user_real_name, studying_course) '
+                "SELECT 'Студент ' || i, 1 + i % 2 FROM generate_series(1, :users) i",
+            ),
+            {"users": args.users},
+        )
+    async with engine.connect() as conn:
+        await conn.execute(text("ANALYZE"))
+
+
+async def run_queries(database_uri: str, repeat: int) -> dict[str, tuple[str, float]]:
+    """Top plan node and mean latency in ms of each query."""
+    engine = create_async_engine(database_uri)
+    results = {}
+    try:
+        async with engine.connect() as conn:
+            for name, (query, params) in QUERIES.items():
+                plan = await conn.execute(text(f"EXPLAIN {query}"), params)
+                start = time.perf_counter()
+                for _ in range(repeat):
+                    (await conn.execute(text(query), params)).all()
+                results[name] = (plan.scalars().first() or "", (time.perf_counter() - start) / repeat * 1000)
+    finally:
+        await engine.dispose()
+    return results
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--courses", type=int, default=1000, help="Number of generated courses")
+    parser.add_argument("--classes", type=int, default=200, help="Number of classes of each course")
+    parser.add_argument("--unsynced", type=float, default=0.02, help="Share of classes that are not synced")
+    parser.add_argument("--users", type=int, default=20_000, help="Number of generated users")
+    parser.add_argument("--repeat", type=int, default=200, help="Number of runs of each query")
+    args = parser.parse_args()
+
+    settings = Settings()
+    settings.postgres_db = f"{uuid4().hex}.bench"
+    # migrations read database from environment
+    os.environ["POSTGRES_DB"] = settings.postgres_db
+    database_uri = settings.database_uri
+    sync_uri = database_uri.replace("postgresql+asyncpg://", "postgresql://")
+    create_database(sync_uri)
+    try:
+        config = Config(PROJECT_PATH / "alembic.ini")
+        config.set_main_option("script_location", str(PROJECT_PATH / config.get_main_option("script_location", "")))
+        upgrade(config, BEFORE_REVISION)
+        asyncio.run(seed(database_uri, args))
+        before = asyncio.run(run_queries(database_uri, args.repeat))
+        upgrade(config, "head")
+        after = asyncio.run(run_queries(database_uri, args.repeat))
+    finally:
+        drop_database(sync_uri)
+
+    for name in QUERIES:
+        (plan_before, ms_before), (plan_after, ms_after) = before[name], after[name]
+        print(f"{name}: {ms_before:.3f} ms -> {ms_after:.3f} ms")
+        print(f"  before: {plan_before}")
+        print(f"  after:  {plan_after}")
+
+
+if __name__ == "__main__":
+    main()
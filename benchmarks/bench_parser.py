@@ -0,0 +1,135 @@
+"""Time the parsing hot paths end to end on synthetic timetables and compare them with a JSON baseline.
+
+Run with `pdm run python -m benchmarks.bench_parser`, `--save` to store a local baseline
+and `--check` to fail if a benchmark became slower or uses more memory than the baseline allows.
+"""
+
+import argparse
+import gc
+import json
+import logging
+import sys
+import tempfile
+import time
+import tracemalloc
+from collections.abc import Callable
+from dataclasses import asdict, fields
+from pathlib import Path
+from typing import Any
+
+from benchmarks.timetable_generator import (
+    SELECTION_COURSE_ROW,
+    SelectionSize,
+    TimetableSize,
+    generate_selection,
+    generate_timetable,
+)
+from itmo_ai_timetable.schedule_parser import ScheduleParser
+from itmo_ai_timetable.selection_parser import SelectionParser
+from itmo_ai_timetable.transform_ics import export_ics
+
+BASELINE_PATH = Path(__file__).parent / "baseline.json"
+
+
+def measure(func: Callable[[], Any], repeat: int) -> dict[str, float]:
+    """Best wall time of `repeat` runs, peak traced memory is taken from a separate run."""
+    seconds = []
+    for _ in range(repeat):
+        gc.collect()
+        start = time.perf_counter()
+        func()
+        seconds.append(time.perf_counter() - start)
+
+    gc.collect()
+    tracemalloc.start()
+    func()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {"seconds": round(min(seconds), 4), "peak_mib": round(peak / 2**20, 2)}
+
+
+def run(timetable_size: TimetableSize, selection_size: SelectionSize, repeat: int) -> dict[str, dict[str, float]]:
+    with tempfile.TemporaryDirectory() as tmp:
+        directory = Path(tmp)
+        timetable_path = directory / "timetable.xlsx"
+        selection_path = directory / "selection.xlsx"
+        ics_dir = directory / "ics"
+        ics_dir.mkdir()
+
+        classes = generate_timetable(timetable_path, timetable_size)
+        first_column, last_column = generate_selection(selection_path, selection_size)
+        pairs = ScheduleParser(str(timetable_path), "Sheet").parse()
+        if len(pairs) != classes:
+            raise ValueError(f"Parser found {len(pairs)} classes, generated {classes}")
+
+        return {
+            "schedule_parse": measure(lambda: ScheduleParser(str(timetable_path), "Sheet").parse(), repeat),
+            "selection_parse": measure(
+                lambda: SelectionParser(
+                    str(selection_path),
+                    "Sheet",
+                    SELECTION_COURSE_ROW,
+                    first_column,
+                    last_column,
+                ).parse(),
+                repeat,
+            ),
+            "export_ics": measure(lambda: export_ics(pairs, ics_dir), repeat),
+        }
+
+
+def check(results: dict[str, Any], baseline: dict[str, Any], tolerance: float) -> list[str]:
+    if results["params"] != baseline["params"]:
+        return ["Benchmark parameters differ from the baseline, run with the same parameters or --save"]
+    regressions = []
+    for name, metrics in results["results"].items():
+        for metric, value in metrics.items():
+            allowed = baseline["results"][name][metric] * (1 + tolerance)
+            if value > allowed:
+                regressions.append(f"{name} {metric}: {value} > {allowed:.4f}")
+    return regressions
+
+
+def create_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__)
+    for size in (TimetableSize(), SelectionSize()):
+        for field in fields(size):
+            if field.name == "seed":
+                continue
+            parser.add_argument(f"--{field.name.replace('_', '-')}", type=field.type, default=getattr(size, field.name))
+    parser.add_argument("--repeat", type=int, default=3, help="Number of timed runs, the best one is reported")
+    parser.add_argument("--baseline", type=Path, default=BASELINE_PATH)
+    parser.add_argument("--save", action="store_true", help="Write results as the new baseline")
+    parser.add_argument("--check", action="store_true", help="Exit with error on regression against the baseline")
+    parser.add_argument("--tolerance", type=float, default=0.3, help="Allowed relative slowdown or memory growth")
+    return parser.parse_args()
+
+
+def main() -> None:
+    args = create_args()
+    # per sheet log lines would be timed too
+    logging.disable(logging.INFO)
+    timetable_size = TimetableSize(**{f.name: getattr(args, f.name) for f in fields(TimetableSize) if f.name != "seed"})
+    selection_size = SelectionSize(**{f.name: getattr(args, f.name) for f in fields(SelectionSize) if f.name != "seed"})
+
+    results = {
+        "params": {"timetable": asdict(timetable_size), "selection": asdict(selection_size), "repeat": args.repeat},
+        "results": run(timetable_size, selection_size, args.repeat),
+    }
+    print(json.dumps(results["results"], indent=4))
+
+    if args.save:
+        args.baseline.write_text(json.dumps(results, indent=4) + "\n")
+        print(f"Baseline saved to {args.baseline}")
+    if args.check:
+        if not args.baseline.exists():
+            sys.exit(f"Baseline {args.baseline} not found, save it with --save before changes")
+        regressions = check(results, json.loads(args.baseline.read_text()), args.tolerance)
+        for regression in regressions:
+            print(f"Regression: {regression}")
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
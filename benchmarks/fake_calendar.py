@@ -0,0 +1,203 @@
+"""Local stand-in for the Google Calendar events API, used by tests and `bench_calendar`.
+
+Serves single event inserts and deletes and multipart batch requests, optionally with latency per HTTP request
+to model network round-trips.
+"""
+
+import json
+import re
+import threading
+import time
+from email.parser import BytesParser
+from http import HTTPStatus
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from itertools import count
+from types import TracebackType
+from typing import Any
+
+import httplib2
+from gcsa.google_calendar import GoogleCalendar
+from google.oauth2.credentials import Credentials
+from googleapiclient import discovery, discovery_cache
+
+EVENTS_PATH = re.compile(r"^/calendar/v3/calendars/(?P<calendar_id>[^/]+)/events(?:/(?P<event_id>[^/?]+))?")
+ACL_PATH = re.compile(r"^/calendar/v3/calendars/(?P<calendar_id>[^/]+)/acl")
+CALENDARS_PATH = "/calendar/v3/calendars"
+CALENDAR_LIST_PATH = "/calendar/v3/users/me/calendarList"
+BATCH_PATH = "/batch/calendar/v3"
+BOUNDARY = "fake_calendar_batch"
+
+
+class FakeCalendarServer:
+    def __init__(
+        self,
+        latency: float = 0.0,
+        fail_calendars: frozenset[str] = frozenset(),
+        rate_limited_inserts: int = 0,
+        failed_batches: dict[int, int] | None = None,
+    ) -> None:
+        """
+        :param latency: seconds of delay before each HTTP response
+        :param fail_calendars: inserts into these calendars are answered with 403 forbidden error
+        :param rate_limited_inserts: number of first event inserts answered with 429 error
+        :param failed_batches: error statuses of whole answers by number of the batch request starting from 0, parts of
+            these batches are not applied
+        """
+        self.latency = latency
+        self.fail_calendars = fail_calendars
+        self.rate_limited_inserts = rate_limited_inserts
+        self.failed_batches = failed_batches or {}
+        self.batch_requests = 0
+        self.events: dict[str, dict[str, dict[str, Any]]] = {}
+        # calendar id by name
+        self.calendars: dict[str, str] = {}
+        self.http_requests = 0
+        self.calendar_list_requests = 0
+        self._ids = count()
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), _make_handler(self))
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+
+    @property
+    def url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host!s}:{port}/"
+
+    def __enter__(self) -> "FakeCalendarServer":
+        self._thread.start()
+        return self
+
+    def __exit__(
+        self,
+        exc_type: type[BaseException] | None,
+        exc: BaseException | None,
+        tb: TracebackType | None,
+    ) -> None:
+        self._server.shutdown()
+        self._server.server_close()
+
+    def make_client(self) -> GoogleCalendar:
+        """`GoogleCalendar` that sends requests to this server."""
+        gc = GoogleCalendar(credentials=Credentials(token="fake"))  # noqa: S106
+        document = json.loads(discovery_cache.get_static_doc("calendar", "v3"))
+        document["rootUrl"] = self.url
+        gc.service = discovery.build_from_document(document, http=httplib2.Http())
+        return gc
+
+    def handle(self, method: str, path: str, body: bytes) -> tuple[int, dict[str, Any] | None]:
+        """Apply one API call, return status and json answer."""
+        if path.startswith(CALENDAR_LIST_PATH) and method == "GET":
+            with self._lock:
+                self.calendar_list_requests += 1
+                items = [{"id": calendar_id, "summary": name} for name, calendar_id in self.calendars.items()]
+            return 200, {"items": items}
+        if path.split("?")[0] == CALENDARS_PATH and method == "POST":
+            with self._lock:
+                calendar = {**json.loads(body), "id": f"calendar{next(self._ids)}"}
+                self.calendars[calendar["summary"]] = calendar["id"]
+            return 200, calendar
+        if ACL_PATH.match(path) and method == "POST":
+            return 200, {**json.loads(body), "id": f"rule{next(self._ids)}"}
+        match = EVENTS_PATH.match(path)
+        if match is None:
+            return 404, _error(404, "notFound")
+        with self._lock:
+            return self._handle_event(method, match["calendar_id"], match["event_id"], body)
+
+    def _handle_event(
+        self,
+        method: str,
+        calendar_id: str,
+        event_id: str | None,
+        body: bytes,
+    ) -> tuple[int, dict[str, Any] | None]:
+        calendar = self.events.setdefault(calendar_id, {})
+        if method == "POST" and event_id is None:
+            return self._insert_event(calendar_id, body)
+        if event_id is not None and event_id not in calendar:
+            return (404, _error(404, "notFound")) if method == "PATCH" else (410, _error(410, "deleted"))
+        if method == "PATCH" and event_id is not None:
+            calendar[event_id].update(json.loads(body))
+            return 200, calendar[event_id]
+        if method == "DELETE" and event_id is not None:
+            del calendar[event_id]
+            return 204, None
+        return 405, _error(405, "methodNotAllowed")
+
+    def _insert_event(self, calendar_id: str, body: bytes) -> tuple[int, dict[str, Any] | None]:
+        if calendar_id in self.fail_calendars:
+            return 403, _error(403, "forbidden")
+        if self.rate_limited_inserts > 0:
+            self.rate_limited_inserts -= 1
+            return 429, _error(429, "rateLimitExceeded")
+        event = {**json.loads(body), "id": f"event{next(self._ids)}"}
+        self.events[calendar_id][event["id"]] = event
+        return 200, event
+
+    def handle_batch(self, content_type: str, body: bytes) -> bytes:
+        message = BytesParser().parsebytes(f"Content-Type: {content_type}\r\n\r\n".encode() + body)
+        parts = []
+        for part in message.get_payload():
+            request = part.get_payload(decode=False).encode()
+            head, _, request_body = request.partition(b"\r\n\r\n")
+            if not _:
+                head, _, request_body = request.partition(b"\n\n")
+            method, path, _ = head.split(b"\r\n" if b"\r\n" in head else b"\n", 1)[0].decode().split(" ", 2)
+            status, answer = self.handle(method, path, request_body)
+            answer_body = json.dumps(answer) if answer is not None else ""
+            content_id = part["Content-ID"].replace("<", "<response-", 1)
+            parts.append(
+                f"--{BOUNDARY}\r\nContent-Type: application/http\r\nContent-ID: {content_id}\r\n\r\n"
+                f"HTTP/1.1 {status} Fake\r\nContent-Type: application/json\r\n\r\n{answer_body}\r\n",
+            )
+        return ("".join(parts) + f"--{BOUNDARY}--\r\n").encode()
+
+
+def _error(code: int, reason: str) -> dict[str, Any]:
+    return {"error": {"code": code, "message": reason, "errors": [{"reason": reason, "message": reason}]}}
+
+
+def _make_handler(server: FakeCalendarServer) -> type[BaseHTTPRequestHandler]:
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self) -> None:  # noqa: N802
+            self._respond()
+
+        def do_POST(self) -> None:  # noqa: N802
+            self._respond()
+
+        def do_PATCH(self) -> None:  # noqa: N802
+            self._respond()
+
+        def do_DELETE(self) -> None:  # noqa: N802
+            self._respond()
+
+        def _respond(self) -> None:
+            body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+            with server._lock:  # noqa: SLF001
+                server.http_requests += 1
+            time.sleep(server.latency)
+            if self.path.startswith(BATCH_PATH):
+                with server._lock:  # noqa: SLF001
+                    status = server.failed_batches.get(server.batch_requests)
+                    server.batch_requests += 1
+                if status is not None:
+                    reason = "rateLimitExceeded" if status == HTTPStatus.TOO_MANY_REQUESTS else "backendError"
+                    self._send(status, "application/json", json.dumps(_error(status, reason)).encode())
+                    return
+                content = server.handle_batch(self.headers["Content-Type"], body)
+                self._send(200, f"multipart/mixed; boundary={BOUNDARY}", content)
+                return
+            status, answer = server.handle(self.command, self.path, body)
+            self._send(status, "application/json", json.dumps(answer).encode() if answer is not None else b"")
+
+        def _send(self, status: int, content_type: str, content: bytes) -> None:
+            self.send_response(status)
+            self.send_header("Content-Type", content_type)
+            self.send_header("Content-Length", str(len(content)))
+            self.end_headers()
+            self.wfile.write(content)
+
+        def log_message(self, format: str, *args: Any) -> None:  # noqa: A002, ANN401
+            pass
+
+    return Handler
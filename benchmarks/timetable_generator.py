@@ -0,0 +1,143 @@
+"""Synthetic timetables in the layout read by `ScheduleParser` and `SelectionParser`."""
+
+import random
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from pathlib import Path
+
+from openpyxl import Workbook
+from openpyxl.styles import PatternFill
+from openpyxl.utils import get_column_letter
+
+from itmo_ai_timetable.settings import Settings
+
+TIMES = ["10:00-11:30", "11:40-13:10", "13:30-15:00", "15:20-16:50", "17:00-18:30", "18:40-20:10"]
+OFFSET_HEAD = 7
+DAY_LENGTH = len(TIMES) + 1
+COURSES = [
+    "Безопасность ИИ",
+    "Машинное обучение на больших данных (Big Data ML)",
+    "Разработка приложений разговорного искусственного интеллекта",
+    "Специальные главы биоинформатики",
+    "Глубокие генеративные модели (Deep Generative Models)",
+    "Рекомендательные системы",
+    "Ранжирование и матчинг",
+    "Этика искусственного интеллекта",
+    "C++ hard",
+    "UPLIFT-моделирование",
+]
+FILLS = ["FFD9D2E9", "FFFFF2CC", "FFD9EAD3", "FFF4CCCC", "FFE6E0EC"]
+
+
+@dataclass(frozen=True)
+class TimetableSize:
+    days: int = 360
+    # parallel class columns, at most `Settings.timetable_len`
+    columns: int = 5
+    # share of time slots with a class
+    fill_density: float = 0.6
+    # share of classes merged with the next time slot
+    merged_density: float = 0.1
+    hyperlink_density: float = 0.2
+    # share of classes with own time inside the cell, like "C++ hard 18:30 - 20:00"
+    time_density: float = 0.05
+    keyword_density: float = 0.2
+    seed: int = 0
+
+
+def generate_timetable(path: Path, size: TimetableSize, sheet_name: str = "Sheet") -> int:
+    """Write timetable to `path`, return number of classes the parser should find."""
+    settings = Settings()
+    days_column = settings.days_column
+    time_column = days_column + settings.timetable_offset
+    if size.columns > settings.timetable_len:
+        raise ValueError(f"At most {settings.timetable_len} columns are parsed, got {size.columns}")
+    rng = random.Random(size.seed)
+
+    wb = Workbook()
+    sheet = wb.active
+    sheet.title = sheet_name
+    sheet["A1"] = "Добро пожаловать в расписание семестра в AI Talent Hub"
+    sheet.merge_cells("A1:K1")
+
+    first_day = datetime.now() + timedelta(days=1)  # noqa: DTZ005
+    classes = 0
+    for i in range(size.days):
+        day_row = OFFSET_HEAD + i * DAY_LENGTH
+        day = first_day + timedelta(days=i)
+        sheet.cell(row=day_row, column=days_column, value=datetime(day.year, day.month, day.day))  # noqa: DTZ001
+        sheet.merge_cells(
+            start_row=day_row,
+            start_column=days_column,
+            end_row=day_row + DAY_LENGTH - 1,
+            end_column=days_column,
+        )
+        for j, time in enumerate(TIMES):
+            sheet.cell(row=day_row + j, column=time_column - 1, value=j + 1)
+            sheet.cell(row=day_row + j, column=time_column, value=time)
+
+        for column in range(time_column + 1, time_column + 1 + size.columns):
+            j = 0
+            while j < len(TIMES):
+                if rng.random() >= size.fill_density:
+                    j += 1
+                    continue
+                cell = sheet.cell(row=day_row + j, column=column, value=_class_title(rng, size))
+                cell.fill = PatternFill(start_color=rng.choice(FILLS), end_color=rng.choice(FILLS), fill_type="solid")
+                if rng.random() < size.hyperlink_density:
+                    cell.hyperlink = f"https://example.com/course/{rng.randrange(len(COURSES))}"
+                classes += 1
+                # a merged class is found once, in its first cell
+                if j + 1 < len(TIMES) and rng.random() < size.merged_density:
+                    sheet.merge_cells(
+                        start_row=day_row + j, start_column=column, end_row=day_row + j + 1, end_column=column
+                    )
+                    j += 1
+                j += 1
+
+    wb.save(path)
+    return classes
+
+
+def _class_title(rng: random.Random, size: TimetableSize) -> str:
+    title = rng.choice(COURSES)
+    if rng.random() < size.keyword_density:
+        title += f"\n{rng.choice(Settings().keywords)}"
+    if rng.random() < size.time_density:
+        title += f"\n{rng.randint(9, 18)}:30 - {rng.randint(19, 21)}:00"
+    return title
+
+
+@dataclass(frozen=True)
+class SelectionSize:
+    students: int = 1000
+    courses: int = 40
+    # share of courses selected by each student
+    select_density: float = 0.15
+    seed: int = 0
+
+
+SELECTION_COURSE_ROW = 3
+SELECTION_FIRST_COLUMN = 5
+
+
+def generate_selection(path: Path, size: SelectionSize, sheet_name: str = "Sheet") -> tuple[str, str]:
+    """Write course selection table to `path`, return first and last columns with courses."""
+    rng = random.Random(size.seed)
+    wb = Workbook()
+    sheet = wb.active
+    sheet.title = sheet_name
+    sheet["A1"] = "Таблица предвыборности"
+
+    last_column = SELECTION_FIRST_COLUMN + size.courses - 1
+    for column in range(SELECTION_FIRST_COLUMN, last_column + 1):
+        sheet.cell(row=SELECTION_COURSE_ROW, column=column, value=f"{rng.choice(COURSES)} {column}")
+    for i in range(size.students):
+        row = SELECTION_COURSE_ROW + 1 + i
+        sheet.cell(row=row, column=1, value=f"Студент {i}")
+        for column in range(SELECTION_FIRST_COLUMN, last_column + 1):
+            if rng.random() < size.select_density:
+                sheet.cell(row=row, column=column, value=1)
+
+    wb.save(path)
+    return get_column_letter(SELECTION_FIRST_COLUMN), get_column_letter(last_column)
@@ -1,10 +1,12 @@
+import asyncio
 import html
 import json
 import traceback
+from collections.abc import Collection
 from datetime import time
+from typing import Any
 
 import pytz
-from logger import get_logger
 from telegram import Update
 from telegram.constants import ParseMode
 from telegram.ext import (
@@ -13,51 +15,81 @@ from telegram.ext import (
     ContextTypes,
 )
 
+from itmo_ai_timetable.calendar_sync import CalendarSync
+from itmo_ai_timetable.class_listener import ClassChangeListener
+from itmo_ai_timetable.db.session_manager import SessionManager
+from itmo_ai_timetable.ingestion import ScheduleIngestion
+from itmo_ai_timetable.instrumentation import get_instrumentation, span
+from itmo_ai_timetable.logger import get_logger
 from itmo_ai_timetable.repositories.calendar import CalendarRepository
-from itmo_ai_timetable.repositories.db import DBRepository
-from itmo_ai_timetable.schedule_parser import ScheduleParser
 from itmo_ai_timetable.settings import Settings
 
 logger = get_logger(__name__)
 settings = Settings()
+schedule_ingestion = ScheduleIngestion()
+
+
+def log_instrumentation(job_name: str) -> None:
+    instrumentation = get_instrumentation()
+    if instrumentation.enabled:
+        logger.info(f"{job_name} instrumentation:\n{instrumentation.report()}")
+        logger.info(f"{job_name} connection pool: {SessionManager().pool_status()}")
+        instrumentation.reset()
 
 
 async def sync_courses_table(context: ContextTypes.DEFAULT_TYPE) -> None:
     await context.bot.send_message(settings.admin_chat_id, "Start sync table")
-    for i, (excel_url, list_name) in enumerate(settings.get_calendar_settings()):
-        logger.info(f"Start sync {list_name}")
-        parser = ScheduleParser(excel_url, list_name)
-        pairs = parser.parse()
-        not_found = await DBRepository.add_classes(pairs)
-        if not_found:
-            logger.warning(f"Classes not found: {not_found}")
-            not_found_str = [f"- {pair}\n" for pair in not_found]
+    with get_instrumentation().profile("sync_courses_table"), span("job.sync_courses_table"):
+        sheets = await schedule_ingestion.run(settings.get_calendar_settings())
+    log_instrumentation("sync_courses_table")
+    for i, sheet in enumerate(sheets):
+        if sheet.not_found:
+            logger.warning(f"Classes not found: {sheet.not_found}")
+            not_found_str = [
+                f"- {pair}" + (f" (возможно {sheet.suggestions[pair]})" if pair in sheet.suggestions else "") + "\n"
+                for pair in sheet.not_found
+            ]
             await context.bot.send_message(
                 settings.admin_chat_id,
                 f"Classes not found: {not_found_str}\nКурс: {i}",
             )
-            continue
-        logger.info(f"End sync {list_name}")
     await context.bot.send_message(settings.admin_chat_id, "Sync finished table")
 
 
 async def update_classes_calendar(context: ContextTypes.DEFAULT_TYPE) -> None:  # noqa: ARG001
-    courses = await DBRepository.get_courses()
-    calendar_repo = CalendarRepository()
-
-    for course in courses:
-        if course.name not in ["Этика искусственного интеллекта", "Продвинутый курс научных исследований"]:
-            continue
-        if course.timetable_id is None:
-            course.timetable_id = calendar_repo.get_or_create_calendar(course.name)
-            await DBRepository.update_courses([course])
-        classes = await DBRepository.get_unsynced_classes_for_course(course)
-        for class_ in classes:
-            class_.gcal_event_id = calendar_repo.add_class_to_calendar(
-                course.timetable_id, course.name, class_.start_time, class_.end_time
-            )
-            class_.class_status_id = 5
-        await DBRepository.update_classes(classes)
+    with get_instrumentation().profile("update_classes_calendar"), span("job.update_classes_calendar"):
+        await sync_classes_to_calendar()
+    log_instrumentation("update_classes_calendar")
+
+
+async def sync_changed_courses(course_ids: Collection[int] | None) -> None:
+    with get_instrumentation().profile("sync_changed_courses"), span("job.sync_changed_courses"):
+        await sync_classes_to_calendar(course_ids)
+    log_instrumentation("sync_changed_courses")
+
+
+async def sync_classes_to_calendar(course_ids: Collection[int] | None = None) -> None:
+    # the listener and the periodic job must not push the same classes twice
+    async with calendar_sync_lock:
+        calendar_sync = CalendarSync(
+            CalendarRepository,
+            course_names=["Этика искусственного интеллекта", "Продвинутый курс научных исследований"],
+            course_ids=course_ids,
+        )
+        await calendar_sync.run()
+
+
+calendar_sync_lock = asyncio.Lock()
+class_listener = ClassChangeListener(sync_changed_courses)
+
+
+async def post_init(application: Application[Any, Any, Any, Any, Any, Any]) -> None:
+    class_listener.start()
+    await sync_courses_table(application)  # type: ignore[arg-type]
+
+
+async def post_shutdown(application: Application[Any, Any, Any, Any, Any, Any]) -> None:  # noqa: ARG001
+    await class_listener.stop()
 
 
 async def ping(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:  # noqa: ARG001
@@ -97,14 +129,17 @@ def add_jobs(application: Application, time_zone_str: str) -> None:
     if application.job_queue is None:
         raise ValueError("Job queue is None")
     application.job_queue.run_daily(sync_courses_table, time=time(8, tzinfo=time_zone))
-    application.job_queue.run_repeating(update_classes_calendar, interval=60)
+    # classes are synced by `class_listener` right after they change, the job only catches missed changes
+    application.job_queue.run_repeating(update_classes_calendar, interval=settings.calendar_sync_interval)
 
 
 def main() -> None:
     """Start the bot."""
     logger.info("start bot")
 
-    application = Application.builder().token(settings.tg_bot_token).post_init(sync_courses_table).build()
+    application = (
+        Application.builder().token(settings.tg_bot_token).post_init(post_init).post_shutdown(post_shutdown).build()
+    )
 
     add_handlers(application)
     add_jobs(application, settings.tz)
@@ -0,0 +1,115 @@
+import asyncio
+from collections.abc import Callable, Collection, Sequence
+
+from itmo_ai_timetable.db.base import Class, Course
+from itmo_ai_timetable.db.session_manager import unit_of_work
+from itmo_ai_timetable.instrumentation import span
+from itmo_ai_timetable.logger import get_logger
+from itmo_ai_timetable.repositories.calendar import CalendarRepository
+from itmo_ai_timetable.repositories.db import DBRepository
+from itmo_ai_timetable.schemes import ClassStatus
+from itmo_ai_timetable.settings import Settings
+
+logger = get_logger(__name__)
+
+
+class CalendarSync:
+    """Push unsynced classes of all courses to Google Calendar, several courses at once.
+
+    Blocking Google API calls run in threads, each worker thread gets its own `CalendarRepository`. Requests of all
+    workers share one rate limiter, so the sync time depends on the API quota instead of the number of courses.
+    Must not run inside `unit_of_work`, every course is written in its own session.
+    """
+
+    def __init__(
+        self,
+        repository_factory: Callable[[], CalendarRepository] = CalendarRepository,
+        course_names: Collection[str] | None = None,
+        course_ids: Collection[int] | None = None,
+    ) -> None:
+        """
+        :param repository_factory: creates a calendar repository for a worker
+        :param course_names: sync only these courses, all courses if not set
+        :param course_ids: sync only courses with these ids, all courses if not set
+        """
+        self.settings = Settings()
+        self.repository_factory = repository_factory
+        self.course_names = course_names
+        self.course_ids = course_ids
+        self._semaphore = asyncio.Semaphore(self.settings.calendar_sync_workers)
+        # repositories of idle workers
+        self._repositories: list[CalendarRepository] = []
+
+    async def run(self) -> None:
+        async with unit_of_work():
+            courses = await DBRepository.get_courses(self.course_ids)
+            # load status ids before the courses would all miss the cache at once
+            await DBRepository.get_class_status_id(ClassStatus.synced)
+        if self.course_names is not None:
+            courses = [course for course in courses if course.name in self.course_names]
+        # a failed course doesn't stop the others, the first error is raised after all courses are done
+        results = await asyncio.gather(*(self._sync_course(course) for course in courses), return_exceptions=True)
+        errors = []
+        for course, result in zip(courses, results, strict=True):
+            if isinstance(result, BaseException):
+                logger.error(f"Sync of course {course.name} failed", exc_info=result)
+                errors.append(result)
+        if errors:
+            raise errors[0]
+
+    async def _sync_course(self, course: Course) -> None:
+        async with self._semaphore:
+            if self._repositories:
+                repository = self._repositories.pop()
+            else:
+                # the repository loads and refreshes OAuth token and builds the API client, all blocking
+                repository = await asyncio.to_thread(self.repository_factory)
+            try:
+                with span("calendar_sync.course"):
+                    await self._push_classes(course, repository)
+            finally:
+                self._repositories.append(repository)
+
+    async def _push_classes(self, course: Course, repository: CalendarRepository) -> None:
+        async with unit_of_work() as session:
+            if course.timetable_id is None:
+                course.timetable_id = await asyncio.to_thread(repository.get_or_create_calendar, course.name)
+                await DBRepository.update_courses([course])
+            async for classes in DBRepository.stream_unsynced_classes_for_course(course):
+                await self._push_chunk(course, classes, repository)
+            await session.commit()
+
+    async def _push_chunk(self, course: Course, classes: Sequence[Class], repository: CalendarRepository) -> None:
+        """Send changes of classes to calendar, then move each group of classes to its next status in bulk."""
+        status_ids = {status: await DBRepository.get_class_status_id(status) for status in ClassStatus}
+        to_add, to_update, to_delete = [], [], []
+        for class_ in classes:
+            if class_.class_status_id == status_ids[ClassStatus.need_to_delete]:
+                to_delete.append(class_)
+            elif class_.class_status_id == status_ids[ClassStatus.need_to_update] and class_.gcal_event_id:
+                to_update.append(class_)
+            else:
+                to_add.append(class_)
+
+        calendar_id = course.timetable_id
+        event_ids = {}
+        if to_add:
+            event_ids.update(
+                await asyncio.to_thread(repository.add_classes_to_calendar, calendar_id, course.name, to_add),
+            )
+        if to_update:
+            event_ids.update(
+                await asyncio.to_thread(repository.update_classes_in_calendar, calendar_id, course.name, to_update),
+            )
+        await DBRepository.mark_classes_synced(event_ids, commit=False)
+
+        events_to_delete = [class_.gcal_event_id for class_ in to_delete if class_.gcal_event_id]
+        deleted_events = set()
+        if events_to_delete:
+            deleted_events.update(
+                await asyncio.to_thread(repository.delete_classes_from_calendar, calendar_id, events_to_delete),
+            )
+        deleted = [
+            class_.id for class_ in to_delete if not class_.gcal_event_id or class_.gcal_event_id in deleted_events
+        ]
+        await DBRepository.set_class_status(deleted, ClassStatus.deleted, commit=False)
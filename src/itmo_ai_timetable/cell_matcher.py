@@ -0,0 +1,67 @@
+import re
+from collections.abc import Sequence
+from functools import lru_cache
+from typing import NamedTuple
+
+# start and optional end of a time range, digit ranges are matched faster than \d
+TIME_PATTERN = r"([0-9][0-9]?:[0-9][0-9])(?:\s*-\s*([0-9][0-9]?:[0-9][0-9]))?"
+MATCH_CACHE_SIZE = 4096
+
+
+class CellMatch(NamedTuple):
+    title: str
+    pair_type: str | None
+    start: tuple[int, int] | None
+    end: tuple[int, int] | None
+
+
+def _parse_time(time: str) -> tuple[int, int]:
+    return int(time[:-3]), int(time[-2:])
+
+
+class CellTextMatcher:
+    """Find pair type keyword and embedded time of a timetable cell.
+
+    "C++ hard Зачет 18:30 - 20:00" -> ("C++ hard", "Зачет", (18, 30), (20, 0))
+
+    Results are memoised by cell text: the same course cells repeat every week of a timetable.
+    """
+
+    def __init__(self, keywords: Sequence[str]) -> None:
+        # the first keyword from settings is the pair type if several are present, all of them are cut from the title
+        self.keywords = tuple(keywords)
+        self._priority = {keyword: i for i, keyword in enumerate(self.keywords)}
+        # longer keywords are cut first not to be cut by a shorter one
+        self._keywords_by_length = sorted((keyword for keyword in self.keywords if keyword), key=len, reverse=True)
+        self._time_pattern = re.compile(TIME_PATTERN)
+        self._cached_match = lru_cache(maxsize=MATCH_CACHE_SIZE)(self._match)
+
+    def match(self, text: str) -> CellMatch:
+        return self._cached_match(text)
+
+    def _match(self, text: str) -> CellMatch:
+        # substring checks and a time regex only for text with a colon are faster than one alternation regex over
+        # keywords and times in CPython, most cells have neither
+        pair_type = None
+        for keyword in self._keywords_by_length:
+            if keyword in text:
+                text = text.replace(keyword, "")
+                if pair_type is None or self._priority[keyword] < self._priority[pair_type]:
+                    pair_type = keyword
+        if ":" not in text:
+            return CellMatch(text.strip(), pair_type, None, None)
+
+        # title parts interleaved with start and end of found times
+        pieces = self._time_pattern.split(text)
+        if len(pieces) == 1:
+            return CellMatch(text.strip(), pair_type, None, None)
+        starts, ends = pieces[1::3], pieces[2::3]
+        # end of the last range, or start of the last time if there are several
+        last = ends[-1] or (starts[-1] if len(starts) > 1 else None)
+        end = _parse_time(last) if last is not None else None
+        return CellMatch("".join(pieces[::3]).strip(), pair_type, _parse_time(starts[0]), end)
+
+
+@lru_cache
+def get_matcher(keywords: tuple[str, ...]) -> CellTextMatcher:
+    return CellTextMatcher(keywords)
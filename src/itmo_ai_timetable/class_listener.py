@@ -0,0 +1,102 @@
+import asyncio
+from collections.abc import Awaitable, Callable, Collection
+
+import asyncpg  # type: ignore[import-untyped]
+
+from itmo_ai_timetable.instrumentation import count
+from itmo_ai_timetable.logger import get_logger
+from itmo_ai_timetable.settings import Settings
+
+logger = get_logger(__name__)
+
+# channel of the `class_changed` trigger, payload is the course id of a class that needs to be synced
+CHANNEL = "class_changed"
+
+
+class ClassChangeListener:
+    """Sync courses to Google Calendar when their classes change.
+
+    A trigger on `class` notifies `CHANNEL` with the course id. The listener collects course ids until no new
+    notification comes for `calendar_notify_debounce` seconds, but not longer than `calendar_notify_max_delay`, then
+    syncs only these courses. It listens on its own connection, a pooled one would lose LISTEN on return to the pool.
+    Notifications sent while the connection is down are lost, so all courses are synced after each connect.
+    """
+
+    def __init__(
+        self,
+        sync: Callable[[Collection[int] | None], Awaitable[None]],
+        connect: Callable[[], Awaitable[asyncpg.Connection]] | None = None,
+    ) -> None:
+        """
+        :param sync: syncs courses with given ids, all courses if `None`
+        :param connect: opens the listening connection, connects with database settings if not set
+        """
+        self.settings = Settings()
+        self.sync = sync
+        self._connect = connect or (lambda: asyncpg.connect(**self.settings.database_settings))
+        self._course_ids: set[int] = set()
+        self._changed = asyncio.Event()
+        self._task: asyncio.Task[None] | None = None
+
+    def start(self) -> None:
+        self._task = asyncio.create_task(self.run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    async def run(self) -> None:
+        while True:
+            try:
+                connection = await self._connect()
+                try:
+                    await self._listen(connection)
+                finally:
+                    await connection.close()
+            except (OSError, asyncpg.PostgresError, asyncpg.InterfaceError) as e:
+                logger.warning(f"Class change listener failed: {e}")
+            else:
+                logger.warning("Class change listener lost connection")
+            await asyncio.sleep(self.settings.calendar_listener_reconnect_delay)
+
+    async def _listen(self, connection: asyncpg.Connection) -> None:
+        self._changed.clear()
+        connection.add_termination_listener(lambda _: self._changed.set())
+        await connection.add_listener(CHANNEL, self._on_notification)
+        logger.info(f"Listening to {CHANNEL}")
+        await self._sync(None)
+        while not connection.is_closed():
+            course_ids = await self._wait_changes(connection)
+            if course_ids:
+                await self._sync(course_ids)
+
+    def _on_notification(self, connection: asyncpg.Connection, pid: int, channel: str, payload: str) -> None:  # noqa: ARG002
+        count("class_change_notifications")
+        self._course_ids.add(int(payload))
+        self._changed.set()
+
+    async def _wait_changes(self, connection: asyncpg.Connection) -> set[int]:
+        """Wait for a change, then for a pause in changes, return ids of changed courses."""
+        await self._changed.wait()
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + self.settings.calendar_notify_max_delay
+        while not connection.is_closed():
+            self._changed.clear()
+            timeout = min(self.settings.calendar_notify_debounce, deadline - loop.time())
+            if timeout <= 0:
+                break
+            try:
+                await asyncio.wait_for(self._changed.wait(), timeout)
+            except asyncio.TimeoutError:
+                break
+        course_ids, self._course_ids = self._course_ids, set()
+        return course_ids
+
+    async def _sync(self, course_ids: set[int] | None) -> None:
+        try:
+            await self.sync(course_ids)
+        except Exception:
+            # failed classes stay unsynced, the courses are synced again with the next change or the periodic sync
+            logger.exception(f"Sync of changed courses {course_ids or 'all'} failed")
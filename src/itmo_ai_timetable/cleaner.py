@@ -1,75 +1,65 @@
-def course_name_cleaner(course: str) -> str:
-    course = course.strip()
+import hashlib
+import json
+import re
+from functools import cache, lru_cache
+from pathlib import Path
+
+from itmo_ai_timetable.logger import get_logger
+from itmo_ai_timetable.settings import Settings
+
+logger = get_logger(__name__)
+
+DEFAULT_ALIASES_PATH = Path(__file__).parent / "data" / "course_aliases.json"
+NORMALIZE_CACHE_SIZE = 4096
+
+
+class CourseNameNormalizer:
+    """Map course names from timetables and selection tables to names used in db.
 
-    additional_info = [
-        "\n(LLM трек)",
-        "\n(Hard ML)",
-        "\n(Перезачет с MLOps, 4 семестр)",
-        "\n(Перезачет с Продвинутый уровень, 4 семестр)",
-        "\n(команда Даниила Потапова)",
-        "\n(Перезачет Прикладной анализ временных рядов, 4 семестр)",
-    ]
-    for info in additional_info:
-        course = course.replace(info, "")
+    Alias table is loaded from a json file with keys:
+    - `additional_info`: parts of name that are removed, like track of the course
+    - `aliases`: spelling of course name -> name in db
+    - `expansions`: course name -> several courses it stands for, used only by `courses_processor`
+    """
 
-    replacements = {
-        "A/B тестирование": "А/В тестирование",
-        "A\\B тестирование": "А/В тестирование",
-        "UNIX\\Linux системы": "UNIX/Linux системы",
-        "Управление RnD командами": "Проведение научных исследований в области ИИ (Управление RnD командами)",
-        "Проведение научных исследований в области ИИ": (
-            "Проведение научных исследований в области ИИ (Управление RnD командами)"
-        ),
-        "Этика ИИ": "Этика искусственного интеллекта",
-        "Системы обработки и анализа больших массивов данных (VK)": (
-            "Системы обработки и анализа больших массивов данных"
-        ),
-        "Симулятор DS от Karpov.courses": "Симулятор DS от Karpov.Courses",
-        "DS симулятор от Karpov.courses": "Симулятор DS от Karpov.Courses",
-        # appears in only course description, but this function only uses for preselection and timetable
-        # "Программирование на С++": ["C++ Lite", "C++ Hard"],
-        "Uplift-моделирование": "UPLIFT-моделирование",
-        "Продвинутое A/B-тестирование": "Продвинутое А/B - тестирование",
-        "А/В тестирование и Reliable ML": "А/В тестирование",
-        "Построение баз данных": "Построение БД",
-        "Введение в большие языковые модели (LLM)": "Введение в LLM",
-        "Создание технологического бизнеса: чек-лист для предпринимателей": "Создание технологического бизнеса",
-        (
-            "High Tech Business Creation: check-list for entrepreneurs"
-            " // Создание технологического бизнеса: чек-лист для предпринимателей"
-        ): "Создание технологического бизнеса",
-        (
-            "High Tech Business Creation: check-list for entrepreneurs"
-            r" \ Создание технологического бизнеса: чек-лист для предпринимателей"
-        ): "Создание технологического бизнеса",
-        (
-            "Компьютерная химия и моделирование химических систем \\ "
-            "Computational Chemistry and Modeling of Chemical Systems"
-        ): (
-            "Компьютерная химия и моделирование химических систем /"
-            " Computational Chemistry and Modeling of Chemical Systems"
-        ),
-        "Основы машинного обучения (ml basic)": "Основы машинного обучения (ml-basic)",
-        "Воркшоп по разработке автономного агента на основе LLM (Осенний семестр)": (
-            "Воркшоп по разработке автономного агента на основе LLM"
-        ),
-        "Практика применения машинного обучения\nот Радослава Нейчева": "Практика применения машинного обучения",
-        "Хакатон\nAI Product Hack": "Хакатон",
-        # Работа в удаленных командах
-        "Преподаватель:\nБашмакова Анастасия Ивановна": "Работа в удаленных командах (в 9)",
-        "Преподаватель: \nРоманенко Юлия Николаевна (набор закрыт)": "Работа в удаленных командах (в 17)",
-        "Преподаватель: \nБазалюк Василина Игоревна": "Работа в удаленных командах (в 17)",
-        "Преподаватель:\nПодгорская Ленина Сергеевна": "Работа в удаленных командах (в 17)",
-        "Преподаватель:\nСанжаровская Полина Рудольфовна": "Работа в удаленных командах (в 17)",
-        (
-            "Преподаватель: \nКудринская Маргарита Викторовна (2 - в другой поток, мест нет)"
-        ): "Работа в удаленных командах (в 18)",
-        "Преподаватель: \nСкакун Светлана Александровна\n(набор закрыт)": "Работа в удаленных командах (в 18)",
-        "Преподаватель: \nКазанцева Анна Сергеевна (набор закрыт)": "Работа в удаленных командах (в 18)",
-        "Преподаватель: \nРукосуев Александр Николаевич": "Работа в удаленных командах (в 18)",
-    }
+    def __init__(self, path: Path = DEFAULT_ALIASES_PATH) -> None:
+        self.path = path
+        self._mtime = 0.0
+        self.digest = ""
+        self.aliases: dict[str, str] = {}
+        self.expansions: dict[str, list[str]] = {}
+        self._additional_info: re.Pattern[str] | None = None
+        self.normalize = lru_cache(maxsize=NORMALIZE_CACHE_SIZE)(self._normalize)
+        self.reload()
 
-    if course in replacements:
-        return replacements[course]
+    def reload(self) -> bool:
+        """Reload alias table if file changed since last load, return True if it was reloaded."""
+        mtime = self.path.stat().st_mtime
+        if mtime == self._mtime:
+            return False
+        content = self.path.read_bytes()
+        data = json.loads(content)
+        self.aliases = data["aliases"]
+        self.expansions = data.get("expansions", {})
+        additional_info = data.get("additional_info", [])
+        self._additional_info = re.compile("|".join(map(re.escape, additional_info))) if additional_info else None
+        self.digest = hashlib.sha256(content).hexdigest()
+        self._mtime = mtime
+        self.normalize.cache_clear()
+        logger.info("Loaded %d course aliases from %s", len(self.aliases), self.path)
+        return True
 
-    return course
+    def _normalize(self, course: str) -> str:
+        course = course.strip()
+        if self._additional_info is not None:
+            course = self._additional_info.sub("", course)
+        return self.aliases.get(course, course)
+
+
+@cache
+def get_normalizer() -> CourseNameNormalizer:
+    return CourseNameNormalizer(Settings().course_aliases_path or DEFAULT_ALIASES_PATH)
+
+
+def course_name_cleaner(course: str) -> str:
+    return get_normalizer().normalize(course)
@@ -4,13 +4,16 @@ import enum
 import json
 from pathlib import Path
 
-from repositories.calendar import CalendarRepository
 from repositories.course_info import CourseInfoRepository
 
+from itmo_ai_timetable.db.session_manager import unit_of_work
+from itmo_ai_timetable.ingestion import ScheduleIngestion
+from itmo_ai_timetable.instrumentation import get_instrumentation
 from itmo_ai_timetable.logger import get_logger
+from itmo_ai_timetable.repositories.calendar import CalendarRepository
 from itmo_ai_timetable.repositories.db import DBRepository
-from itmo_ai_timetable.schedule_parser import ScheduleParser
 from itmo_ai_timetable.selection_parser import SelectionParser
+from itmo_ai_timetable.settings import Settings
 from itmo_ai_timetable.transform_ics import export_ics
 
 logger = get_logger(__name__)
@@ -24,14 +27,19 @@ class SubparserName(str, enum.Enum):
 
 def create_args() -> argparse.Namespace:
     parser = argparse.ArgumentParser(description="Обработка excel в ics")
+    parser.add_argument(
+        "--instrument",
+        help="Вывести время этапов и счетчики, по умолчанию из настроек",
+        action=argparse.BooleanOptionalAction,
+        default=None,
+    )
+    parser.add_argument("--profile", help="Папка для сохранения cProfile", type=Path)
     subparsers = parser.add_subparsers(required=True, dest="subparser_name")
     schedule_parser = subparsers.add_parser(SubparserName.SCHEDULE, help="Обработка excel в ics")
     schedule_parser.add_argument(
         "--filepath",
-        help="Путь к файлу excel",
-        default="Расписание 1 курс весна 2024.xlsx",
+        help="Путь к файлу excel, по умолчанию все расписания из настроек",
         type=str,
-        required=True,
     )
     schedule_parser.add_argument("--output_path", help="Папка для экспорта ics", type=str)
     schedule_parser.add_argument("--sheet_name", help="Страница с расписанием в excel файле", type=str)
@@ -71,45 +79,63 @@ def create_args() -> argparse.Namespace:
 
 
 async def sync_calendar() -> None:
-    courses = await DBRepository.get_courses()
-    calendar = CalendarRepository()
-    for course in courses:
-        if course.timetable_id is None:
-            calendar_id = calendar.get_or_create_calendar(course.name)
-            course.timetable_id = calendar_id
-        if course.course_info_link is None:
-            course.course_info_link = CourseInfoRepository.add_link(course.name)
-    await DBRepository.update_courses(courses)
+    async with unit_of_work():
+        calendar = CalendarRepository()
+        changed_courses = []
+        async for course in DBRepository.stream_courses():
+            if course.timetable_id is not None and course.course_info_link is not None:
+                continue
+            if course.timetable_id is None:
+                calendar_id = calendar.get_or_create_calendar(course.name)
+                course.timetable_id = calendar_id
+            if course.course_info_link is None:
+                course.course_info_link = CourseInfoRepository.add_link(course.name)
+            changed_courses.append(course)
+        await DBRepository.update_courses(changed_courses)
 
 
 async def main() -> None:
     logger.info("Start")
     args = create_args()
+    instrumentation = get_instrumentation()
+    instrumentation.configure(
+        enabled=instrumentation.enabled if args.instrument is None else args.instrument,
+        profile_dir=args.profile or instrumentation.profile_dir,
+    )
+    with instrumentation.profile(f"cli-{args.subparser_name}"), instrumentation.span(f"job.cli.{args.subparser_name}"):
+        await run_command(args)
+    if instrumentation.enabled:
+        logger.info(f"Instrumentation:\n{instrumentation.report()}")
+
 
+async def run_command(args: argparse.Namespace) -> None:
     output_path = Path(args.output_path)
     output_dir = output_path.parent
     if not Path.exists(output_dir):
         Path.mkdir(output_dir)
     match args.subparser_name:
         case SubparserName.SCHEDULE:
-            schedule = ScheduleParser(args.filepath, args.sheet_name).parse()
-            if args.db:
-                _ = await DBRepository.add_classes(schedule)
-            export_ics(schedule, output_dir)
+            sources = Settings().get_calendar_settings()
+            if args.filepath is not None:
+                sources = [(args.filepath, args.sheet_name)]
+            sheets = await ScheduleIngestion().run(sources, save=args.db)
+            export_ics([pair for sheet in sheets for pair in sheet.pairs], output_dir)
         case SubparserName.SELECTION:
-            results = SelectionParser(
+            matrix = SelectionParser(
                 args.filepath,
                 args.sheet_name,
                 args.course_row,
                 args.first_select_column,
                 args.last_select_column,
                 args.name_column,
-            ).parse()
+            ).parse_matrix()
+            results = matrix.to_dict()
             with Path(output_path).open("w") as f:  # noqa: ASYNC230
                 json.dump(results, f, ensure_ascii=False, indent=4)
             course_number = args.course_number
             if args.db:
-                await DBRepository.create_matching(results, course_number)
+                # students who deselected everything are passed too, so their old enrolments are removed
+                await DBRepository.create_matching(matrix.to_dict(with_empty=True), course_number)
         case SubparserName.SYNC:
             await sync_calendar()
         case _:
@@ -0,0 +1,52 @@
+import re
+from collections import Counter, defaultdict
+from collections.abc import Iterable
+from typing import NamedTuple
+
+# numbers and bracketed parts tell apart sibling courses like "Публичные выступления 1" and "... 2"
+_QUALIFIER_RE = re.compile(r"\d+|\([^)]*\)")
+
+
+class CourseMatch(NamedTuple):
+    name: str
+    # Dice coefficient of trigram sets, 1.0 for equal names
+    score: float
+
+
+def _trigrams(name: str) -> frozenset[str]:
+    text = f"  {' '.join(name.lower().split())} "
+    return frozenset(text[i : i + 3] for i in range(len(text) - 2))
+
+
+def qualifiers(name: str) -> list[str]:
+    """Numbers and bracketed parts of the name in order, lowercased with collapsed spaces."""
+    return [" ".join(qualifier.lower().split()) for qualifier in _QUALIFIER_RE.findall(name)]
+
+
+def same_qualifiers(name: str, other: str) -> bool:
+    """Whether names can refer to one course, names of sibling courses differ only in qualifiers."""
+    return qualifiers(name) == qualifiers(other)
+
+
+class CourseNameIndex:
+    """Trigram index over course names to find the closest course for a misspelled name."""
+
+    def __init__(self, names: Iterable[str]) -> None:
+        self.names = list(dict.fromkeys(names))
+        self._trigrams = [_trigrams(name) for name in self.names]
+        self._postings: dict[str, list[int]] = defaultdict(list)
+        for i, trigrams in enumerate(self._trigrams):
+            for trigram in trigrams:
+                self._postings[trigram].append(i)
+
+    def best_match(self, name: str) -> CourseMatch | None:
+        trigrams = _trigrams(name)
+        shared: Counter[int] = Counter()
+        for trigram in trigrams:
+            shared.update(self._postings.get(trigram, ()))
+        if not shared:
+            return None
+        best_score, best = max(
+            (2 * common / (len(trigrams) + len(self._trigrams[i])), i) for i, common in shared.items()
+        )
+        return CourseMatch(self.names[best], best_score)
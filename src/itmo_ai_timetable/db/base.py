@@ -1,7 +1,7 @@
 from datetime import datetime
 from typing import Any, ClassVar
 
-from sqlalchemy import TIMESTAMP, ForeignKey
+from sqlalchemy import TIMESTAMP, ForeignKey, Index, text
 from sqlalchemy.orm import DeclarativeBase, Mapped, mapped_column, relationship
 from sqlalchemy.sql.type_api import TypeEngine
 
@@ -18,7 +18,7 @@ class Course(Base):
     __tablename__ = "course"
 
     id: Mapped[int] = mapped_column(primary_key=True)
-    name: Mapped[str]
+    name: Mapped[str] = mapped_column(unique=True, index=True)
     meeting_link: Mapped[str] = mapped_column(nullable=True)
     course_info_link: Mapped[str] = mapped_column(nullable=True)
     chat_link: Mapped[str] = mapped_column(nullable=True)
@@ -40,6 +40,9 @@ class Course(Base):
 
 class User(Base):
     __tablename__ = "user"
+    __table_args__ = (
+        Index("ix_user_user_real_name_studying_course", "user_real_name", "studying_course", unique=True),
+    )
 
     id: Mapped[int] = mapped_column(primary_key=True)
     user_real_name: Mapped[str] = mapped_column(nullable=True)
@@ -76,7 +79,7 @@ class ClassStatusTable(Base):
     __tablename__ = "class_status"
 
     id: Mapped[int] = mapped_column(primary_key=True)
-    name: Mapped[str]
+    name: Mapped[str] = mapped_column(unique=True, index=True)
     classes: Mapped[list["Class"]] = relationship("Class", back_populates="class_status")
 
     def __repr__(self) -> str:
@@ -90,8 +93,21 @@ def get_class_status_id(status_name: ClassStatus) -> int:
     raise ValueError(f"Class status {status_name} not found")
 
 
+# classes in these statuses need no calendar changes
+SETTLED_STATUSES = (ClassStatus.synced, ClassStatus.deleted)
+
+
+def not_settled_condition() -> str:
+    """Predicate of the partial index over classes waiting for calendar sync, queries must use the same one."""
+    return f"class_status_id NOT IN ({', '.join(str(get_class_status_id(status)) for status in SETTLED_STATUSES)})"
+
+
 class Class(Base):
     __tablename__ = "class"
+    __table_args__ = (
+        Index("ix_class_course_id_class_status_id", "course_id", "class_status_id"),
+        Index("ix_class_not_synced_course_id", "course_id", postgresql_where=text(not_settled_condition())),
+    )
 
     id: Mapped[int] = mapped_column(primary_key=True)
     course_id: Mapped[int] = mapped_column(ForeignKey("course.id"))
@@ -0,0 +1,66 @@
+from collections.abc import Iterable
+from weakref import WeakKeyDictionary
+
+from sqlalchemy import Engine, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from itmo_ai_timetable.db.base import ClassStatusTable, get_class_status_id
+from itmo_ai_timetable.schemes import ClassStatus
+
+# `class_status` is filled by migrations and never changes, so it is read once per engine
+_registries: WeakKeyDictionary[Engine, "ClassStatusRegistry"] = WeakKeyDictionary()
+
+
+class ClassStatusRegistry:
+    """Ids of `ClassStatus` values in `class_status` table."""
+
+    def __init__(self, ids: dict[ClassStatus, int]) -> None:
+        self._ids = ids
+
+    @classmethod
+    def from_rows(cls, rows: Iterable[tuple[int, str]]) -> "ClassStatusRegistry":
+        """Build registry from `(id, name)` rows, ids must match ones used by the model defaults and indexes."""
+        ids = {ClassStatus(name): status_id for status_id, name in rows}
+        for status in ClassStatus:
+            if status not in ids:
+                raise ValueError(f"Class status {status.value} not found in db")
+            if ids[status] != get_class_status_id(status):
+                raise ValueError(
+                    f"Class status {status.value} has id {ids[status]} in db, expected {get_class_status_id(status)}",
+                )
+        return cls(ids)
+
+    def id(self, status: ClassStatus) -> int:
+        return self._ids[status]
+
+    def status(self, status_id: int) -> ClassStatus:
+        return next(status for status, id_ in self._ids.items() if id_ == status_id)
+
+
+# Class lifecycle:
+#   need_to_add -> synced, event is created
+#   synced -> need_to_update -> synced, event is patched
+#   synced, need_to_update -> need_to_delete -> deleted, event is deleted
+#   need_to_add -> deleted, class removed before its event was created
+
+
+def changed_status(status: ClassStatus) -> ClassStatus:
+    """Status of class whose time or type is changed in the timetable."""
+    return ClassStatus.need_to_add if status == ClassStatus.need_to_add else ClassStatus.need_to_update
+
+
+def removed_status(status: ClassStatus) -> ClassStatus:
+    """Status of class that is removed from the timetable."""
+    return ClassStatus.deleted if status == ClassStatus.need_to_add else ClassStatus.need_to_delete
+
+
+async def get_class_status_registry(session: AsyncSession) -> ClassStatusRegistry:
+    engine = session.get_bind()
+    if not isinstance(engine, Engine):
+        engine = engine.engine
+    registry = _registries.get(engine)
+    if registry is None:
+        query = await session.execute(select(ClassStatusTable.id, ClassStatusTable.name))
+        registry = ClassStatusRegistry.from_rows(query.tuples())
+        _registries[engine] = registry
+    return registry
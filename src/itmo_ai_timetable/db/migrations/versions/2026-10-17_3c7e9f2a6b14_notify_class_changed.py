@@ -0,0 +1,50 @@
+"""notify_class_changed
+
+Revision ID: 3c7e9f2a6b14
+Revises: 8b41e6d07a2c
+Create Date: 2026-10-17 19:05:31.480216
+
+"""
+
+from collections.abc import Sequence
+
+from alembic import op
+
+from itmo_ai_timetable.db.base import get_class_status_id
+from itmo_ai_timetable.schemes import ClassStatus
+
+# revision identifiers, used by Alembic.
+revision: str = "3c7e9f2a6b14"
+down_revision: str | None = "8b41e6d07a2c"
+branch_labels: str | Sequence[str] | None = None
+depends_on: str | Sequence[str] | None = None
+
+
+def upgrade() -> None:
+    # notifications with the same payload are sent once per transaction, so a bulk write wakes listeners once per course
+    op.execute(
+        """
+        CREATE FUNCTION notify_class_changed() RETURNS trigger AS $$
+        BEGIN
+            PERFORM pg_notify('class_changed', NEW.course_id::text);
+            RETURN NULL;
+        END;
+        $$ LANGUAGE plpgsql
+        """,
+    )
+    # writes of the sync itself only set synced and deleted statuses and don't wake it again
+    op.execute(
+        f"""
+        CREATE TRIGGER class_changed
+        AFTER INSERT OR UPDATE ON class
+        FOR EACH ROW
+        WHEN (NEW.class_status_id NOT IN ({get_class_status_id(ClassStatus.synced)},
+                                         {get_class_status_id(ClassStatus.deleted)}))
+        EXECUTE FUNCTION notify_class_changed()
+        """,
+    )
+
+
+def downgrade() -> None:
+    op.execute("DROP TRIGGER class_changed ON class")
+    op.execute("DROP FUNCTION notify_class_changed()")
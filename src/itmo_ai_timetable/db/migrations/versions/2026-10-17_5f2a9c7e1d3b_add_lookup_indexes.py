@@ -0,0 +1,116 @@
+"""add_lookup_indexes
+
+Revision ID: 5f2a9c7e1d3b
+Revises: c35b1b08a8b9
+Create Date: 2026-10-17 12:04:31.482913
+
+"""
+
+from collections.abc import Sequence
+
+import sqlalchemy as sa
+from alembic import op
+
+from itmo_ai_timetable.db.base import get_class_status_id
+from itmo_ai_timetable.schemes import ClassStatus
+
+# revision identifiers, used by Alembic.
+revision: str = "5f2a9c7e1d3b"
+down_revision: str | None = "c35b1b08a8b9"
+branch_labels: str | Sequence[str] | None = None
+depends_on: str | Sequence[str] | None = None
+
+
+def merge_duplicates(
+    table: str,
+    key_columns: Sequence[str],
+    fill_columns: Sequence[str] = (),
+    references: Sequence[tuple[str, str]] = (),
+    links: Sequence[tuple[str, str, str]] = (),
+) -> None:
+    """Keep the row with the smallest id of rows with equal `key_columns` and delete the others.
+
+    Empty `fill_columns` of the kept row are taken from its duplicates. `references` are `(table, column)` foreign
+    keys moved to the kept row. `links` are `(table, column, other column)` of association tables, links that the
+    kept row already has are dropped.
+    """
+    keys = ", ".join(key_columns)
+    not_null = " AND ".join(f"{column} IS NOT NULL" for column in key_columns)
+    op.execute(
+        f"""
+        CREATE TEMPORARY TABLE duplicate_ids AS
+        SELECT id, keep_id FROM (
+            SELECT id, min(id) OVER (PARTITION BY {keys}) AS keep_id FROM "{table}" WHERE {not_null}
+        ) ids
+        WHERE id <> keep_id
+        """,  # noqa: S608
+    )
+    if fill_columns:
+        assignments = ", ".join(f"{column} = coalesce(kept.{column}, duplicate.{column})" for column in fill_columns)
+        op.execute(
+            f"""
+            UPDATE "{table}" kept SET {assignments}
+            FROM duplicate_ids d JOIN "{table}" duplicate ON duplicate.id = d.id
+            WHERE kept.id = d.keep_id
+            """,  # noqa: S608
+        )
+    for reference_table, column in references:
+        op.execute(
+            f'UPDATE "{reference_table}" SET {column} = d.keep_id '  # noqa: S608
+            f'FROM duplicate_ids d WHERE "{reference_table}".{column} = d.id',
+        )
+    for link_table, column, other_column in links:
+        op.execute(
+            f"""
+            INSERT INTO "{link_table}" ({column}, {other_column})
+            SELECT DISTINCT d.keep_id, link.{other_column}
+            FROM "{link_table}" link JOIN duplicate_ids d ON link.{column} = d.id
+            WHERE NOT EXISTS (
+                SELECT 1 FROM "{link_table}" kept
+                WHERE kept.{column} = d.keep_id AND kept.{other_column} = link.{other_column}
+            )
+            """,  # noqa: S608
+        )
+        op.execute(f'DELETE FROM "{link_table}" link USING duplicate_ids d WHERE link.{column} = d.id')  # noqa: S608
+    op.execute(f'DELETE FROM "{table}" duplicate USING duplicate_ids d WHERE duplicate.id = d.id')  # noqa: S608
+    op.execute("DROP TABLE duplicate_ids")
+
+
+def upgrade() -> None:
+    # nothing kept names unique before, duplicates are merged so that unique indexes can be built
+    merge_duplicates(
+        "course",
+        ["name"],
+        fill_columns=["meeting_link", "course_info_link", "chat_link", "timetable_id"],
+        references=[("class", "course_id")],
+        links=[("user_course", "course_id", "user_id")],
+    )
+    merge_duplicates("class_status", ["name"], references=[("class", "class_status_id")])
+    merge_duplicates(
+        "user",
+        ["user_real_name", "studying_course"],
+        fill_columns=["user_tg_id"],
+        links=[("user_course", "user_id", "course_id")],
+    )
+
+    op.create_index("ix_course_name", "course", ["name"], unique=True)
+    op.create_index("ix_class_status_name", "class_status", ["name"], unique=True)
+    op.create_index(
+        "ix_user_user_real_name_studying_course", "user", ["user_real_name", "studying_course"], unique=True
+    )
+    op.create_index("ix_class_course_id_class_status_id", "class", ["course_id", "class_status_id"])
+    # classes waiting for calendar sync are a small part of the table
+    op.create_index(
+        "ix_class_not_synced_course_id",
+        "class",
+        ["course_id"],
+        postgresql_where=sa.text(f"class_status_id <> {get_class_status_id(ClassStatus.synced)}"),
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("ix_class_not_synced_course_id", table_name="class")
+    op.drop_index("ix_class_course_id_class_status_id", table_name="class")
+    op.drop_index("ix_user_user_real_name_studying_course", table_name="user")
+    op.drop_index("ix_class_status_name", table_name="class_status")
+    op.drop_index("ix_course_name", table_name="course")
@@ -0,0 +1,45 @@
+"""skip_deleted_in_not_synced_index
+
+Revision ID: 8b41e6d07a2c
+Revises: 5f2a9c7e1d3b
+Create Date: 2026-10-17 16:42:09.217604
+
+"""
+
+from collections.abc import Sequence
+
+import sqlalchemy as sa
+from alembic import op
+
+from itmo_ai_timetable.db.base import get_class_status_id
+from itmo_ai_timetable.schemes import ClassStatus
+
+# revision identifiers, used by Alembic.
+revision: str = "8b41e6d07a2c"
+down_revision: str | None = "5f2a9c7e1d3b"
+branch_labels: str | Sequence[str] | None = None
+depends_on: str | Sequence[str] | None = None
+
+
+def upgrade() -> None:
+    # deleted classes are never synced again, they would only grow the index
+    op.drop_index("ix_class_not_synced_course_id", table_name="class")
+    op.create_index(
+        "ix_class_not_synced_course_id",
+        "class",
+        ["course_id"],
+        postgresql_where=sa.text(
+            f"class_status_id NOT IN ({get_class_status_id(ClassStatus.synced)}, "
+            f"{get_class_status_id(ClassStatus.deleted)})",
+        ),
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("ix_class_not_synced_course_id", table_name="class")
+    op.create_index(
+        "ix_class_not_synced_course_id",
+        "class",
+        ["course_id"],
+        postgresql_where=sa.text(f"class_status_id <> {get_class_status_id(ClassStatus.synced)}"),
+    )
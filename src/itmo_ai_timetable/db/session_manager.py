@@ -1,11 +1,18 @@
-from collections.abc import Callable
+import inspect
+from collections.abc import AsyncIterator, Callable
+from contextlib import asynccontextmanager
+from contextvars import ContextVar
 from functools import wraps
 from typing import Any, Optional
 
 from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, async_sessionmaker, create_async_engine
 
+from itmo_ai_timetable.instrumentation import count_pool_events, count_sql_statements
 from itmo_ai_timetable.settings import Settings
 
+# session of the current unit of work, shared by all decorated calls inside it
+_current_session: ContextVar[AsyncSession | None] = ContextVar("current_session", default=None)
+
 
 class SessionManager:
     _instance: Optional["SessionManager"] = None
@@ -23,7 +30,17 @@ class SessionManager:
 
     def refresh(self) -> None:
         settings = Settings()
-        self._engine = create_async_engine(settings.database_uri, echo=True, future=True)
+        self._engine = create_async_engine(
+            settings.database_uri,
+            echo=settings.db_echo,
+            pool_size=settings.db_pool_size,
+            max_overflow=settings.db_max_overflow,
+            pool_pre_ping=settings.db_pool_pre_ping,
+            pool_recycle=settings.db_pool_recycle,
+            connect_args={"prepared_statement_cache_size": settings.db_statement_cache_size},
+        )
+        count_sql_statements(self._engine.sync_engine)
+        count_pool_events(self._engine.sync_engine)
         self._session_maker = async_sessionmaker(self._engine, expire_on_commit=False)
 
     @property
@@ -38,12 +55,51 @@ class SessionManager:
             raise RuntimeError("SessionManager not initialized")
         return self._engine
 
+    def pool_status(self) -> dict[str, int]:
+        """Current usage of the connection pool."""
+        pool = self.engine.pool
+        return {
+            "size": pool.size(),  # type: ignore[attr-defined]
+            "checked_in": pool.checkedin(),  # type: ignore[attr-defined]
+            "checked_out": pool.checkedout(),  # type: ignore[attr-defined]
+            "overflow": pool.overflow(),  # type: ignore[attr-defined]
+        }
+
+
+@asynccontextmanager
+async def unit_of_work() -> AsyncIterator[AsyncSession]:
+    """Share one session and connection between all `with_async_session` calls inside the block.
+
+    Methods still commit their own changes, the connection is returned to the pool when the block ends.
+    Nested blocks reuse the outer session.
+    """
+    session = _current_session.get()
+    if session is not None:
+        yield session
+        return
+    manager = SessionManager()
+    async with manager.engine.connect() as connection, manager.session_maker(bind=connection) as session:
+        token = _current_session.set(session)
+        try:
+            yield session
+        except Exception:
+            await session.rollback()
+            raise
+        finally:
+            _current_session.reset(token)
+
 
 def with_async_session(func: Callable[..., Any]) -> Callable[..., Any]:
+    if inspect.isasyncgenfunction(func):
+        return _with_async_session_gen(func)
+
     @wraps(func)
     async def wrapper(*args: Any, **kwargs: Any) -> Any:  # noqa: ANN401
         if "session" in kwargs:
             return await func(*args, **kwargs)
+        current_session = _current_session.get()
+        if current_session is not None:
+            return await func(*args, session=current_session, **kwargs)
         session_maker = SessionManager().session_maker
         async with session_maker() as session:
             try:
@@ -55,3 +111,22 @@ def with_async_session(func: Callable[..., Any]) -> Callable[..., Any]:
                 await session.close()
 
     return wrapper
+
+
+def _with_async_session_gen(func: Callable[..., AsyncIterator[Any]]) -> Callable[..., AsyncIterator[Any]]:
+    """`with_async_session` for async generators, the session is open until the iteration ends."""
+
+    @wraps(func)
+    async def wrapper(*args: Any, **kwargs: Any) -> AsyncIterator[Any]:  # noqa: ANN401
+        if "session" not in kwargs:
+            kwargs["session"] = _current_session.get()
+        if kwargs["session"] is not None:
+            async for item in func(*args, **kwargs):
+                yield item
+            return
+        async with SessionManager().session_maker() as session:
+            kwargs["session"] = session
+            async for item in func(*args, **kwargs):
+                yield item
+
+    return wrapper
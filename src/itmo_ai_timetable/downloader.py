@@ -0,0 +1,85 @@
+from dataclasses import dataclass
+from functools import cache
+from http import HTTPStatus
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from itmo_ai_timetable.instrumentation import count, span
+from itmo_ai_timetable.logger import get_logger
+from itmo_ai_timetable.settings import Settings
+
+logger = get_logger(__name__)
+
+RETRY_STATUSES = (
+    HTTPStatus.TOO_MANY_REQUESTS,
+    HTTPStatus.INTERNAL_SERVER_ERROR,
+    HTTPStatus.BAD_GATEWAY,
+    HTTPStatus.SERVICE_UNAVAILABLE,
+    HTTPStatus.GATEWAY_TIMEOUT,
+)
+
+
+@dataclass(frozen=True)
+class Download:
+    content: bytes
+    not_modified: bool = False
+
+
+@dataclass(frozen=True)
+class _CachedResponse:
+    content: bytes
+    etag: str | None
+    last_modified: str | None
+
+
+class SpreadsheetDownloader:
+    """Download spreadsheets into memory over a pooled session with conditional GET and retries."""
+
+    def __init__(self, session: requests.Session | None = None) -> None:
+        self.settings = Settings()
+        self.session = session or self._create_session()
+        self._responses: dict[str, _CachedResponse] = {}
+
+    def _create_session(self) -> requests.Session:
+        retry = Retry(
+            total=self.settings.download_retries,
+            backoff_factor=self.settings.download_backoff_factor,
+            status_forcelist=RETRY_STATUSES,
+            allowed_methods=frozenset({"GET"}),
+        )
+        adapter = HTTPAdapter(pool_maxsize=self.settings.download_pool_size, max_retries=retry)
+        session = requests.Session()
+        session.mount("https://", adapter)
+        session.mount("http://", adapter)
+        return session
+
+    def download(self, url: str) -> Download:
+        cached = self._responses.get(url)
+        headers = {}
+        if cached is not None:
+            if cached.etag:
+                headers["If-None-Match"] = cached.etag
+            if cached.last_modified:
+                headers["If-Modified-Since"] = cached.last_modified
+
+        with span("download"):
+            response = self.session.get(url, headers=headers, timeout=self.settings.download_timeout)
+        if response.status_code == HTTPStatus.NOT_MODIFIED and cached is not None:
+            logger.info("Spreadsheet %s not modified", url)
+            return Download(cached.content, not_modified=True)
+        response.raise_for_status()
+
+        etag = response.headers.get("ETag")
+        last_modified = response.headers.get("Last-Modified")
+        if etag or last_modified:
+            self._responses[url] = _CachedResponse(response.content, etag, last_modified)
+        count("downloaded_bytes", len(response.content))
+        logger.info("Downloaded spreadsheet %s, %d bytes", url, len(response.content))
+        return Download(response.content)
+
+
+@cache
+def get_downloader() -> SpreadsheetDownloader:
+    return SpreadsheetDownloader()
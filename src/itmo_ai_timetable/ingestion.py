@@ -0,0 +1,177 @@
+import asyncio
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any
+
+from itmo_ai_timetable.cleaner import get_normalizer
+from itmo_ai_timetable.db.session_manager import unit_of_work
+from itmo_ai_timetable.downloader import get_downloader
+from itmo_ai_timetable.instrumentation import get_instrumentation, span
+from itmo_ai_timetable.logger import get_logger
+from itmo_ai_timetable.parse_cache import ParseCache
+from itmo_ai_timetable.repositories.db import DBRepository
+from itmo_ai_timetable.schedule_parser import ScheduleParser, ScheduleSnapshot
+from itmo_ai_timetable.schemes import Pair, ScheduleDelta, diff_pairs
+from itmo_ai_timetable.settings import Settings
+
+logger = get_logger(__name__)
+
+
+@dataclass
+class SheetIngestion:
+    source: str
+    list_name: str
+    cache_key: str
+    pairs: list[Pair] = field(default_factory=list)
+    from_cache: bool = False
+    # same content as the last version of this sheet written to the database
+    unchanged: bool = False
+    not_found: list[str] = field(default_factory=list)
+    # closest known course for not found names that are too different to be matched automatically
+    suggestions: dict[str, str] = field(default_factory=dict)
+    # changes since the previous snapshot of this sheet, None if there was no snapshot
+    delta: ScheduleDelta | None = None
+    snapshot: ScheduleSnapshot = field(default_factory=dict)
+
+
+def parse_sheet(
+    content: bytes,
+    list_name: str,
+    snapshot: ScheduleSnapshot | None,
+    instrumentation_config: tuple[bool, Path | None] = (False, None),
+) -> tuple[ScheduleDelta, ScheduleSnapshot, dict[str, Any]]:
+    """Entry point for pool workers, must stay importable at module level.
+
+    Instrumentation of the parent process is passed explicitly and stats are returned, because workers don't
+    share memory with it.
+    """
+    instrumentation = get_instrumentation()
+    enabled, profile_dir = instrumentation_config
+    instrumentation.configure(enabled=enabled, profile_dir=profile_dir)
+    instrumentation.reset()
+    with instrumentation.profile(f"parse-{os.getpid()}"):
+        delta, new_snapshot = ScheduleParser(content, list_name).parse_incremental(snapshot)
+    return delta, new_snapshot, instrumentation.snapshot()
+
+
+def fetch_source(source: str) -> bytes:
+    if source.startswith("http"):
+        return get_downloader().download(source).content
+    return Path(source).read_bytes()
+
+
+class ScheduleIngestion:
+    """Download all timetables concurrently, parse them in a process pool and write them in one transaction."""
+
+    def __init__(self, parse_cache: ParseCache | None = None) -> None:
+        self.settings = Settings()
+        self.parse_cache = parse_cache or ParseCache()
+        # snapshots of the last saved version of each sheet, used to re-parse and write only changed days
+        self._snapshots: dict[tuple[str, str], ScheduleSnapshot] = {}
+        # cache keys of the last saved version of each sheet, a parse cache hit alone doesn't mean the database
+        # holds this version: the sheet could be changed and then reverted
+        self._saved_keys: dict[tuple[str, str], str] = {}
+
+    async def run(self, sources: list[tuple[str, str]], *, save: bool = True) -> list[SheetIngestion]:
+        # workers load the alias table themselves, reload here keeps cache keys in sync with them
+        if get_normalizer().reload():
+            # names in snapshots were normalized with the previous alias table
+            self._snapshots.clear()
+            self._saved_keys.clear()
+        # a 304 answer returns the previously downloaded bytes, which are then found in the parse cache
+        with span("ingestion.fetch"):
+            contents = await asyncio.gather(*(asyncio.to_thread(fetch_source, source) for source, _ in sources))
+
+        sheets = []
+        for (source, list_name), content in zip(sources, contents, strict=True):
+            sheet = SheetIngestion(source, list_name, self.parse_cache.make_key(content, list_name))
+            sheet.unchanged = self._saved_keys.get((source, list_name)) == sheet.cache_key
+            cached_pairs = self.parse_cache.get(sheet.cache_key)
+            if cached_pairs is not None:
+                sheet.pairs, sheet.from_cache = cached_pairs, True
+                if not sheet.unchanged:
+                    self._use_cached_pairs(sheet)
+            sheets.append(sheet)
+
+        to_parse = [(sheet, content) for sheet, content in zip(sheets, contents, strict=True) if not sheet.from_cache]
+        with span("ingestion.parse"):
+            await self._parse(to_parse)
+        logger.info(f"Parse cache hits: {self.parse_cache.hits}, misses: {self.parse_cache.misses}")
+
+        if save:
+            with span("ingestion.save"):
+                await self._save(sheets)
+        return sheets
+
+    async def _parse(self, to_parse: list[tuple[SheetIngestion, bytes]]) -> None:
+        if not to_parse:
+            return
+        loop = asyncio.get_running_loop()
+        instrumentation = get_instrumentation()
+        instrumentation_config = (instrumentation.enabled, instrumentation.profile_dir)
+        workers = min(len(to_parse), self.settings.ingestion_workers)
+        # spawn, not fork: the bot process runs an event loop and threads that must not be copied into workers
+        with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn")) as pool:
+            results = await asyncio.gather(
+                *(
+                    loop.run_in_executor(
+                        pool,
+                        parse_sheet,
+                        content,
+                        sheet.list_name,
+                        self._get_snapshot(sheet),
+                        instrumentation_config,
+                    )
+                    for sheet, content in to_parse
+                ),
+            )
+        for (sheet, _), (delta, snapshot, stats) in zip(to_parse, results, strict=True):
+            instrumentation.merge(stats)
+            if self._get_snapshot(sheet) is not None:
+                sheet.delta = delta
+            sheet.snapshot = snapshot
+            sheet.pairs = [pair for pairs in snapshot.values() for pair in pairs]
+
+    def _get_snapshot(self, sheet: SheetIngestion) -> ScheduleSnapshot | None:
+        return self._snapshots.get((sheet.source, sheet.list_name))
+
+    def _use_cached_pairs(self, sheet: SheetIngestion) -> None:
+        """Diff cached pairs of a sheet with its saved version, e.g. after an edit of the sheet was reverted."""
+        snapshot = self._get_snapshot(sheet)
+        if snapshot is not None:
+            sheet.delta = diff_pairs([pair for pairs in snapshot.values() for pair in pairs], sheet.pairs)
+        # day fingerprints of this version are unknown, so the next change of the sheet is parsed in full
+        sheet.snapshot = {sheet.cache_key: sheet.pairs}
+
+    async def _save(self, sheets: list[SheetIngestion]) -> None:
+        if all(sheet.unchanged for sheet in sheets):
+            logger.info("Timetables not changed since last sync")
+            return
+        changed_sheets = [sheet for sheet in sheets if not sheet.unchanged]
+        deltas = [sheet.delta for sheet in changed_sheets]
+        async with unit_of_work():
+            if all(delta is not None for delta in deltas):
+                logger.info("Apply changes of re-parsed days")
+                delta = ScheduleDelta(
+                    added=[pair for d in deltas if d is not None for pair in d.added],
+                    removed=[pair for d in deltas if d is not None for pair in d.removed],
+                    changed=[pair for d in deltas if d is not None for pair in d.changed],
+                )
+                not_found = set(await DBRepository.apply_schedule_delta(delta))
+            else:
+                # unchanged sheets are written too, so a course spread over several sheets is diffed as a whole
+                not_found = set(await DBRepository.add_classes([pair for sheet in sheets for pair in sheet.pairs]))
+
+            suggestions = await DBRepository.suggest_courses(sorted(not_found)) if not_found else {}
+        for sheet in changed_sheets:
+            sheet.not_found = sorted({pair.name for pair in sheet.pairs} & not_found)
+            sheet.suggestions = {name: suggestions[name] for name in sheet.not_found if name in suggestions}
+            # keep only fully applied tables, so missing courses are retried on the next sync
+            if not sheet.not_found:
+                if not sheet.from_cache:
+                    self.parse_cache.put(sheet.cache_key, sheet.pairs)
+                self._snapshots[sheet.source, sheet.list_name] = sheet.snapshot
+                self._saved_keys[sheet.source, sheet.list_name] = sheet.cache_key
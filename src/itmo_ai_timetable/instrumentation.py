@@ -0,0 +1,255 @@
+import cProfile
+import inspect
+import time
+from collections import Counter
+from collections.abc import AsyncGenerator, Callable, Iterator
+from contextlib import AbstractContextManager, contextmanager, nullcontext
+from contextvars import ContextVar, Token
+from dataclasses import dataclass
+from datetime import datetime
+from functools import cache, wraps
+from pathlib import Path
+from types import TracebackType
+from typing import Any, TypeVar
+
+from sqlalchemy import Connection, Engine, event
+
+from itmo_ai_timetable.logger import get_logger
+from itmo_ai_timetable.settings import Settings
+
+logger = get_logger(__name__)
+
+F = TypeVar("F", bound=Callable[..., Any])
+
+# returned by `span` when instrumentation is off, so hot paths pay only for a method call
+_NULL_SPAN = nullcontext()
+# names of open spans, SQL statements are attributed to each of them
+_open_spans: ContextVar[tuple[str, ...]] = ContextVar("open_spans", default=())
+
+
+@dataclass
+class SpanStats:
+    calls: int = 0
+    seconds: float = 0.0
+
+
+class _Span:
+    __slots__ = ("instrumentation", "name", "start", "token")
+
+    def __init__(self, instrumentation: "Instrumentation", name: str) -> None:
+        self.instrumentation = instrumentation
+        self.name = name
+        self.start = 0.0
+        self.token: Token[tuple[str, ...]] | None = None
+
+    def __enter__(self) -> None:
+        self.token = _open_spans.set((*_open_spans.get(), self.name))
+        self.start = time.perf_counter()
+
+    def __exit__(
+        self,
+        exc_type: type[BaseException] | None,
+        exc: BaseException | None,
+        tb: TracebackType | None,
+    ) -> None:
+        self.instrumentation.record_span(self.name, time.perf_counter() - self.start)
+        if self.token is not None:
+            _open_spans.reset(self.token)
+
+
+@contextmanager
+def _attribute_queries(name: str) -> Iterator[None]:
+    """Attribute SQL statements of the block to span `name` without timing it."""
+    token = _open_spans.set((*_open_spans.get(), name))
+    try:
+        yield
+    finally:
+        _open_spans.reset(token)
+
+
+class Instrumentation:
+    """Opt-in timing spans, counters and cProfile dumps for sync stages."""
+
+    def __init__(self, *, enabled: bool = False, profile_dir: Path | None = None) -> None:
+        self.enabled = enabled
+        self.profile_dir = profile_dir
+        self.spans: dict[str, SpanStats] = {}
+        self.counters: Counter[str] = Counter()
+        # SQL statements and their total time per open span, `calls` is the number of statements
+        self.queries: dict[str, SpanStats] = {}
+
+    def configure(self, *, enabled: bool, profile_dir: Path | None = None) -> None:
+        self.enabled = enabled
+        self.profile_dir = profile_dir
+
+    def span(self, name: str) -> AbstractContextManager[None]:
+        if not self.enabled:
+            return _NULL_SPAN
+        return _Span(self, name)
+
+    def count(self, name: str, value: int = 1) -> None:
+        if self.enabled:
+            self.counters[name] += value
+
+    def record_span(self, name: str, seconds: float) -> None:
+        stats = self.spans.setdefault(name, SpanStats())
+        stats.calls += 1
+        stats.seconds += seconds
+
+    def record_query(self, seconds: float) -> None:
+        for name in set(_open_spans.get()):
+            stats = self.queries.setdefault(name, SpanStats())
+            stats.calls += 1
+            stats.seconds += seconds
+
+    def reset(self) -> None:
+        self.spans.clear()
+        self.counters.clear()
+        self.queries.clear()
+
+    def snapshot(self) -> dict[str, Any]:
+        """Picklable copy of collected stats, used to pass stats from pool workers."""
+        return {
+            "spans": {name: (stats.calls, stats.seconds) for name, stats in self.spans.items()},
+            "counters": dict(self.counters),
+            "queries": {name: (stats.calls, stats.seconds) for name, stats in self.queries.items()},
+        }
+
+    def merge(self, snapshot: dict[str, Any]) -> None:
+        for key in ("spans", "queries"):
+            collected = getattr(self, key)
+            for name, (calls, seconds) in snapshot[key].items():
+                stats = collected.setdefault(name, SpanStats())
+                stats.calls += calls
+                stats.seconds += seconds
+        self.counters.update(snapshot["counters"])
+
+    def report(self) -> str:
+        lines = [
+            f"{name}: {stats.seconds:.3f}s in {stats.calls} calls"
+            for name, stats in sorted(self.spans.items(), key=lambda item: item[1].seconds, reverse=True)
+        ]
+        lines.extend(
+            f"{name}: {stats.calls} SQL statements in {stats.seconds:.3f}s"
+            for name, stats in sorted(self.queries.items(), key=lambda item: item[1].calls, reverse=True)
+        )
+        lines.extend(f"{name}: {value}" for name, value in sorted(self.counters.items()))
+        return "\n".join(lines)
+
+    @contextmanager
+    def profile(self, name: str) -> Iterator[None]:
+        """Dump cProfile stats of the block to `profile_dir`, open them with `snakeviz` or `pstats`."""
+        if self.profile_dir is None:
+            yield
+            return
+        profiler = cProfile.Profile()
+        profiler.enable()
+        try:
+            yield
+        finally:
+            profiler.disable()
+            self.profile_dir.mkdir(parents=True, exist_ok=True)
+            path = self.profile_dir / f"{name}-{datetime.now().strftime('%Y%m%d-%H%M%S-%f')}.prof"  # noqa: DTZ005
+            profiler.dump_stats(path)
+            logger.info("Profile saved to %s", path)
+
+
+@cache
+def get_instrumentation() -> Instrumentation:
+    settings = Settings()
+    return Instrumentation(enabled=settings.instrumentation, profile_dir=settings.profile_dir)
+
+
+def span(name: str) -> AbstractContextManager[None]:
+    return get_instrumentation().span(name)
+
+
+def count(name: str, value: int = 1) -> None:
+    get_instrumentation().count(name, value)
+
+
+def instrumented(name: str) -> Callable[[F], F]:
+    """Wrap sync or async function into a span, the time of async generator covers the whole iteration."""
+
+    def decorator(func: F) -> F:
+        if inspect.isasyncgenfunction(func):
+            return _instrumented_async_gen(name, func)  # type: ignore[return-value]
+
+        if inspect.iscoroutinefunction(func):
+
+            @wraps(func)
+            async def async_wrapper(*args: Any, **kwargs: Any) -> Any:  # noqa: ANN401
+                with span(name):
+                    return await func(*args, **kwargs)
+
+            return async_wrapper  # type: ignore[return-value]
+
+        @wraps(func)
+        def wrapper(*args: Any, **kwargs: Any) -> Any:  # noqa: ANN401
+            with span(name):
+                return func(*args, **kwargs)
+
+        return wrapper  # type: ignore[return-value]
+
+    return decorator
+
+
+def _instrumented_async_gen(
+    name: str,
+    func: Callable[..., AsyncGenerator[Any, None]],
+) -> Callable[..., AsyncGenerator[Any, None]]:
+    @wraps(func)
+    async def wrapper(*args: Any, **kwargs: Any) -> AsyncGenerator[Any, None]:  # noqa: ANN401
+        instrumentation = get_instrumentation()
+        if not instrumentation.enabled:
+            async for item in func(*args, **kwargs):
+                yield item
+            return
+        # the span is open only while the generator runs, not across yields: statements of the consumer are not
+        # attributed to it, and closing the generator from another task doesn't reset a foreign token
+        start = time.perf_counter()
+        iterator = func(*args, **kwargs)
+        try:
+            while True:
+                with _attribute_queries(name):
+                    try:
+                        item = await iterator.__anext__()
+                    except StopAsyncIteration:
+                        break
+                yield item
+        finally:
+            await iterator.aclose()
+            instrumentation.record_span(name, time.perf_counter() - start)
+
+    return wrapper
+
+
+def count_sql_statements(engine: Engine) -> None:
+    """Count statements sent by `engine` into the `sql_statements` counter and time them per open span."""
+
+    def before_cursor_execute(conn: Connection, *args: Any) -> None:  # noqa: ARG001, ANN401
+        instrumentation = get_instrumentation()
+        if instrumentation.enabled:
+            instrumentation.count("sql_statements")
+            conn.info.setdefault("query_start", []).append(time.perf_counter())
+
+    def after_cursor_execute(conn: Connection, *args: Any) -> None:  # noqa: ARG001, ANN401
+        starts = conn.info.get("query_start")
+        if starts:
+            get_instrumentation().record_query(time.perf_counter() - starts.pop())
+
+    event.listen(engine, "before_cursor_execute", before_cursor_execute)
+    event.listen(engine, "after_cursor_execute", after_cursor_execute)
+
+
+def count_pool_events(engine: Engine) -> None:
+    """Count new connections and checkouts from the pool of `engine`."""
+
+    def connect(*args: Any) -> None:  # noqa: ARG001, ANN401
+        count("db.pool_connects")
+
+    def checkout(*args: Any) -> None:  # noqa: ARG001, ANN401
+        count("db.pool_checkouts")
+
+    event.listen(engine, "connect", connect)
+    event.listen(engine, "checkout", checkout)
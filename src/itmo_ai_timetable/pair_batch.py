@@ -0,0 +1,183 @@
+import sys
+from array import array
+from collections import defaultdict
+from collections.abc import Iterable, Iterator
+from dataclasses import dataclass, field
+from datetime import date, datetime, tzinfo
+
+from itmo_ai_timetable.schemes import Pair
+
+# (start, end) in epoch seconds, the identity of a class inside a course
+TimeKey = tuple[int, int]
+
+
+def to_epoch(time: datetime) -> int:
+    return int(time.timestamp())
+
+
+def match_moved(
+    removed: Iterable[TimeKey],
+    added: Iterable[TimeKey],
+    timezone: tzinfo | None,
+) -> list[tuple[TimeKey, TimeKey]]:
+    """Pair removed and added classes of one course that fall on the same day, in time order.
+
+    A class moved within a day is then updated in place instead of being deleted and created again.
+    """
+
+    def by_day(keys: Iterable[TimeKey]) -> dict[date, list[TimeKey]]:
+        days: dict[date, list[TimeKey]] = defaultdict(list)
+        for key in sorted(keys):
+            days[datetime.fromtimestamp(key[0], tz=timezone).date()].append(key)
+        return days
+
+    added_by_day = by_day(added)
+    return [
+        pair
+        for day, day_removed in by_day(removed).items()
+        for pair in zip(day_removed, added_by_day.get(day, []), strict=False)
+    ]
+
+
+@dataclass
+class ClassesDiff:
+    """Changes of one course, classes are referred by their time key."""
+
+    added: list[TimeKey] = field(default_factory=list)
+    # old and new time of classes changed in place
+    changed: list[tuple[TimeKey, TimeKey]] = field(default_factory=list)
+    removed: list[TimeKey] = field(default_factory=list)
+
+
+def diff_classes(
+    old: dict[TimeKey, str | None],
+    new: dict[TimeKey, str | None],
+    timezone: tzinfo | None,
+) -> ClassesDiff:
+    """Diff classes of one course given as type by time key.
+
+    Classes with the same time and another type and classes moved within a day are changed, not re-created.
+    """
+    diff = ClassesDiff(changed=[(key, key) for key, class_type in new.items() if key in old and old[key] != class_type])
+    added = [key for key in new if key not in old]
+    removed = [key for key in old if key not in new]
+    moved = match_moved(removed, added, timezone)
+    diff.changed.extend(moved)
+    moved_from, moved_to = {old_key for old_key, _ in moved}, {new_key for _, new_key in moved}
+    diff.added = [key for key in added if key not in moved_to]
+    diff.removed = [key for key in removed if key not in moved_from]
+    return diff
+
+
+class PairBatch:
+    """Column-oriented storage of parsed pairs.
+
+    Course names and pair types are interned into tables and stored as small int codes, start and end as int64
+    epoch seconds. `Pair` objects are created only when asked for.
+    """
+
+    def __init__(self, timezone: tzinfo | None = None) -> None:
+        self.timezone = timezone
+        self.names: list[str] = []
+        self.pair_types: list[str | None] = [None]
+        self.name_codes = array("i")
+        self.type_codes = array("B")
+        self.starts = array("q")
+        self.ends = array("q")
+        self.links: list[str | None] = []
+        self._name_index: dict[str, int] = {}
+        self._type_index: dict[str | None, int] = {None: 0}
+
+    @classmethod
+    def from_pairs(cls, pairs: Iterable[Pair]) -> "PairBatch":
+        batch = cls()
+        for pair in pairs:
+            if batch.timezone is None:
+                batch.timezone = pair.start_time.tzinfo
+            batch.append(pair.name, pair.start_time, pair.end_time, pair.pair_type, pair.link)
+        return batch
+
+    def append(
+        self,
+        name: str,
+        start_time: datetime,
+        end_time: datetime,
+        pair_type: str | None = None,
+        link: str | None = None,
+    ) -> None:
+        """Add a pair without validation, values should come from a trusted source like `ScheduleParser`."""
+        name_code = self._name_index.get(name)
+        if name_code is None:
+            name_code = self._name_index[name] = len(self.names)
+            self.names.append(sys.intern(name))
+        type_code = self._type_index.get(pair_type)
+        if type_code is None:
+            type_code = self._type_index[pair_type] = len(self.pair_types)
+            self.pair_types.append(pair_type)
+        self.name_codes.append(name_code)
+        self.type_codes.append(type_code)
+        self.starts.append(to_epoch(start_time))
+        self.ends.append(to_epoch(end_time))
+        self.links.append(link)
+
+    def __len__(self) -> int:
+        return len(self.starts)
+
+    def __iter__(self) -> Iterator[Pair]:
+        return (self.pair(i) for i in range(len(self)))
+
+    def name(self, i: int) -> str:
+        return self.names[self.name_codes[i]]
+
+    def pair_type(self, i: int) -> str | None:
+        return self.pair_types[self.type_codes[i]]
+
+    def start_time(self, i: int) -> datetime:
+        return datetime.fromtimestamp(self.starts[i], tz=self.timezone)
+
+    def end_time(self, i: int) -> datetime:
+        return datetime.fromtimestamp(self.ends[i], tz=self.timezone)
+
+    def time_key(self, i: int) -> TimeKey:
+        return self.starts[i], self.ends[i]
+
+    def pair(self, i: int) -> Pair:
+        # values were checked on append, so pydantic validation is skipped
+        return Pair.model_construct(
+            name=self.name(i),
+            start_time=self.start_time(i),
+            end_time=self.end_time(i),
+            pair_type=self.pair_type(i),
+            link=self.links[i],
+        )
+
+    def to_pairs(self) -> list[Pair]:
+        return list(self)
+
+    def by_course(self) -> dict[str, "CourseView"]:
+        """Group pairs by course name, views share the columns of this batch."""
+        indices: list[array[int]] = [array("i") for _ in self.names]
+        for i, name_code in enumerate(self.name_codes):
+            indices[name_code].append(i)
+        return {name: CourseView(self, rows) for name, rows in zip(self.names, indices, strict=True) if rows}
+
+
+class CourseView:
+    """Rows of one course in a `PairBatch`."""
+
+    def __init__(self, batch: PairBatch, rows: "array[int]") -> None:
+        self.batch = batch
+        self.rows = rows
+
+    def __len__(self) -> int:
+        return len(self.rows)
+
+    def __iter__(self) -> Iterator[int]:
+        return iter(self.rows)
+
+    def time_keys(self) -> set[TimeKey]:
+        starts, ends = self.batch.starts, self.batch.ends
+        return {(starts[i], ends[i]) for i in self.rows}
+
+    def pairs(self) -> list[Pair]:
+        return [self.batch.pair(i) for i in self.rows]
@@ -0,0 +1,84 @@
+import hashlib
+import json
+from pathlib import Path
+
+from pydantic import TypeAdapter, ValidationError
+
+from itmo_ai_timetable.cleaner import get_normalizer
+from itmo_ai_timetable.logger import get_logger
+from itmo_ai_timetable.schemes import Pair
+from itmo_ai_timetable.settings import Settings
+
+logger = get_logger(__name__)
+
+# bump when parser output changes for the same spreadsheet, so stale entries are not reused
+CACHE_VERSION = 1
+PARSER_SETTINGS = (
+    "days_column",
+    "timetable_offset",
+    "timetable_len",
+    "keywords",
+    "max_days_difference",
+    "tz",
+    "courses_to_skip",
+)
+
+_pairs_adapter = TypeAdapter(list[Pair])
+
+
+class ParseCache:
+    """Disk cache of parsed schedules keyed by the hash of the downloaded spreadsheet."""
+
+    def __init__(self, directory: Path | None = None, max_bytes: int | None = None) -> None:
+        self.settings = Settings()
+        self.directory = directory or self.settings.parse_cache_dir
+        self.max_bytes = max_bytes if max_bytes is not None else self.settings.parse_cache_max_bytes
+        self.hits = 0
+        self.misses = 0
+
+    def make_key(self, content: bytes, sheet: str) -> str:
+        parser_settings = {name: getattr(self.settings, name) for name in PARSER_SETTINGS}
+        digest = hashlib.sha256(content)
+        digest.update(sheet.encode())
+        # parsed course names depend on the alias table too
+        aliases_digest = get_normalizer().digest
+        digest.update(json.dumps([CACHE_VERSION, parser_settings, aliases_digest], sort_keys=True).encode())
+        return digest.hexdigest()
+
+    def get(self, key: str) -> list[Pair] | None:
+        path = self._path(key)
+        try:
+            pairs = _pairs_adapter.validate_json(path.read_bytes())
+        except FileNotFoundError:
+            self.misses += 1
+            return None
+        except ValidationError:
+            logger.warning("Drop corrupted cache entry %s", path)
+            path.unlink(missing_ok=True)
+            self.misses += 1
+            return None
+        # mtime is used as last access time for eviction
+        path.touch()
+        self.hits += 1
+        return pairs
+
+    def put(self, key: str, pairs: list[Pair]) -> None:
+        self.directory.mkdir(parents=True, exist_ok=True)
+        path = self._path(key)
+        tmp_path = path.with_suffix(".tmp")
+        tmp_path.write_bytes(_pairs_adapter.dump_json(pairs))
+        tmp_path.replace(path)
+        self._evict()
+
+    def _path(self, key: str) -> Path:
+        return self.directory / f"{key}.json"
+
+    def _evict(self) -> None:
+        entries = sorted(self.directory.glob("*.json"), key=lambda p: p.stat().st_mtime)
+        total_size = sum(p.stat().st_size for p in entries)
+        # always keep the newest entry, even if it alone exceeds the limit
+        while total_size > self.max_bytes and len(entries) > 1:
+            oldest = entries.pop(0)
+            total_size -= oldest.stat().st_size
+            oldest.unlink(missing_ok=True)
+            logger.info("Evict parse cache entry %s", oldest.name)
@@ -0,0 +1,73 @@
+import threading
+import time
+from collections.abc import Callable
+
+# share of max rate restored after each successful request
+RECOVERY_STEP = 0.01
+
+
+class TokenBucket:
+    """Thread-safe token bucket with adaptive rate.
+
+    Tokens are refilled at `rate` per second up to `capacity`. `backoff` halves the rate and pauses all callers after
+    a rate limit answer, each successful request moves the rate back to `max_rate` additively.
+    """
+
+    def __init__(
+        self,
+        rate: float,
+        capacity: float,
+        min_rate: float = 0.5,
+        clock: Callable[[], float] = time.monotonic,
+        sleep: Callable[[float], None] = time.sleep,
+    ) -> None:
+        self.max_rate = rate
+        self.rate = rate
+        self.min_rate = min(min_rate, rate)
+        self.capacity = capacity
+        self._clock = clock
+        self._sleep = sleep
+        self._tokens = capacity
+        self._updated_at = clock()
+        self._paused_until = 0.0
+        self._lock = threading.Lock()
+
+    def acquire(self, tokens: float = 1) -> float:
+        """Block until `tokens` are available and take them, return seconds spent waiting.
+
+        Requests larger than capacity wait for a full bucket.
+        """
+        tokens = min(tokens, self.capacity)
+        waited = 0.0
+        while True:
+            with self._lock:
+                now = self._clock()
+                self._refill(now)
+                wait = self._paused_until - now
+                if wait <= 0:
+                    if self._tokens >= tokens:
+                        self._tokens -= tokens
+                        return waited
+                    wait = (tokens - self._tokens) / self.rate
+            self._sleep(wait)
+            waited += wait
+
+    def backoff(self, delay: float) -> None:
+        """Slow down after a rate limit answer and let nobody send requests for `delay` seconds."""
+        with self._lock:
+            now = self._clock()
+            self._refill(now)
+            self.rate = max(self.rate / 2, self.min_rate)
+            self._tokens = 0
+            self._paused_until = max(self._paused_until, now + delay)
+
+    def succeeded(self, requests: int = 1) -> None:
+        with self._lock:
+            self.rate = min(self.rate + self.max_rate * RECOVERY_STEP * requests, self.max_rate)
+
+    def _refill(self, now: float) -> None:
+        # tokens are not accumulated during a pause
+        start = max(self._updated_at, self._paused_until)
+        if now > start:
+            self._tokens = min(self._tokens + (now - start) * self.rate, self.capacity)
+        self._updated_at = now
@@ -1,41 +1,302 @@
+import threading
+import time
+from collections.abc import Callable, Iterable
 from datetime import datetime
+from functools import cache
+from http import HTTPStatus
+from itertools import count as counter
+from typing import Any, TypeVar
 
 from gcsa.acl import AccessControlRule, ACLRole, ACLScopeType
 from gcsa.calendar import Calendar
 from gcsa.event import Event, Visibility
 from gcsa.google_calendar import GoogleCalendar
-from settings import Settings
+from gcsa.serializers.event_serializer import EventSerializer  # type: ignore[import-untyped]
+from googleapiclient.errors import HttpError  # type: ignore[import-untyped]
+from httplib2 import HttpLib2Error  # type: ignore[import-untyped]
+
+from itmo_ai_timetable.db.base import Class
+from itmo_ai_timetable.instrumentation import count, instrumented
+from itmo_ai_timetable.logger import get_logger
+from itmo_ai_timetable.rate_limiter import TokenBucket
+from itmo_ai_timetable.settings import Settings
+
+logger = get_logger(__name__)
+
+T = TypeVar("T")
+
+# Google Calendar API accepts at most 50 requests in one batch
+MAX_BATCH_SIZE = 50
+# reasons of 403 answers that mean quota is exceeded, other 403 answers are permanent
+RATE_LIMIT_REASONS = frozenset({"rateLimitExceeded", "userRateLimitExceeded"})
+
+
+@cache
+def get_rate_limiter() -> TokenBucket:
+    """Limiter shared by all repositories, because Google quota is counted per user."""
+    settings = Settings()
+    return TokenBucket(settings.calendar_requests_per_second, settings.calendar_burst)
+
+
+@cache
+def get_calendar_ids() -> "CalendarIdCache":
+    """Cache shared by all repositories of the process."""
+    return CalendarIdCache(Settings().calendar_cache_ttl)
+
+
+class CalendarIdCache:
+    """Calendar id by name, filled from one calendar list request and kept for `ttl` seconds.
+
+    Created calendars are added in place. Threads that miss the cache at once wait for a single list request.
+    """
+
+    def __init__(self, ttl: float, clock: Callable[[], float] = time.monotonic) -> None:
+        self.ttl = ttl
+        self._clock = clock
+        self._ids: dict[str, str] | None = None
+        self._loaded_at = 0.0
+        self._lock = threading.Lock()
+
+    def get(self, calendar_name: str, load: Callable[[], Iterable[tuple[str, str]]]) -> str | None:
+        """Id of calendar, `load` returns `(name, id)` of all calendars and is called when the map is expired."""
+        with self._lock:
+            if self._ids is None or self._clock() - self._loaded_at >= self.ttl:
+                ids: dict[str, str] = {}
+                for name, calendar_id in load():
+                    ids.setdefault(name, calendar_id)
+                self._ids, self._loaded_at = ids, self._clock()
+            return self._ids.get(calendar_name)
+
+    def put(self, calendar_name: str, calendar_id: str) -> None:
+        with self._lock:
+            if self._ids is not None:
+                self._ids[calendar_name] = calendar_id
+
+    def invalidate(self) -> None:
+        with self._lock:
+            self._ids = None
+
+
+def is_missing_error(exception: Exception) -> bool:
+    return isinstance(exception, HttpError) and exception.status_code in (HTTPStatus.NOT_FOUND, HTTPStatus.GONE)
+
+
+def is_rate_limit_error(exception: Exception) -> bool:
+    if not isinstance(exception, HttpError):
+        return False
+    if exception.status_code == HTTPStatus.TOO_MANY_REQUESTS:
+        return True
+    if exception.status_code != HTTPStatus.FORBIDDEN or not isinstance(exception.error_details, list):
+        return False
+    return any(
+        isinstance(error, dict) and error.get("reason") in RATE_LIMIT_REASONS for error in exception.error_details
+    )
 
 
 class CalendarRepository:
-    def __init__(self) -> None:
+    """Google Calendar calls, rate limited and retried on 403/429 quota errors.
+
+    The underlying http client is not thread-safe, use one repository per thread.
+    """
+
+    def __init__(
+        self,
+        gc: GoogleCalendar | None = None,
+        rate_limiter: TokenBucket | None = None,
+        calendar_ids: CalendarIdCache | None = None,
+    ) -> None:
         self.settings = Settings()
 
-        self.gc = GoogleCalendar(
+        self.gc = gc or GoogleCalendar(
             credentials_path=self.settings.google_credentials_path, token_path=self.settings.google_token_path
         )
+        self.rate_limiter = rate_limiter or get_rate_limiter()
+        self.calendar_ids = calendar_ids or get_calendar_ids()
 
+    @instrumented("calendar.get_or_create_calendar")
     def get_or_create_calendar(self, calendar_name: str) -> str:
-        for calendar in self.gc.get_calendar_list():
-            if calendar.summary == calendar_name:
-                return calendar.calendar_id
-        calendar = Calendar(calendar_name, description=calendar_name)
-        calendar = self.gc.add_calendar(calendar)
-        self.gc.add_acl_rule(self.get_public_acl(), calendar_id=calendar.calendar_id)
+        calendar_id = self.calendar_ids.get(calendar_name, self._list_calendars)
+        if calendar_id is not None:
+            return calendar_id
+        calendar = self._call(lambda: self.gc.add_calendar(Calendar(calendar_name, description=calendar_name)))
+        self._call(lambda: self.gc.add_acl_rule(self.get_public_acl(), calendar_id=calendar.calendar_id))
+        self.calendar_ids.put(calendar_name, calendar.calendar_id)
         return calendar.calendar_id
 
+    def _list_calendars(self) -> list[tuple[str, str]]:
+        calendars = self._call(lambda: list(self.gc.get_calendar_list()))
+        return [(calendar.summary, calendar.calendar_id) for calendar in calendars]
+
     def get_public_acl(self) -> AccessControlRule:
         return AccessControlRule(
             role=ACLRole.READER,
             scope_type=ACLScopeType.DEFAULT,  # DEFAULT - The public scope
         )
 
+    @instrumented("calendar.add_class_to_calendar")
     def add_class_to_calendar(
         self, calendar_id: str, class_name: str, start_datetime: datetime, end_datetime: datetime
     ) -> str:
         event = Event(class_name, start=start_datetime, end=end_datetime, visibility=Visibility.PUBLIC)
-        self.gc.add_event(event, calendar_id=calendar_id)
+        event = self._call(lambda: self.gc.add_event(event, calendar_id=calendar_id))
         return event.id
 
+    @instrumented("calendar.add_classes_to_calendar")
+    def add_classes_to_calendar(self, calendar_id: str, class_name: str, classes: Iterable[Class]) -> dict[int, str]:
+        """Create events of classes with batch requests, return event id of each created class.
+
+        Failed inserts are logged and left out, so their classes stay unsynced and are retried on the next sync.
+        """
+        requests = {
+            str(class_.id): self.gc.service.events().insert(
+                calendarId=calendar_id,
+                body=self._event_body(class_name, class_),
+            )
+            for class_ in classes
+        }
+        responses = self._execute_batches(requests)
+        return {int(class_id): response["id"] for class_id, response in responses.items()}
+
+    @instrumented("calendar.update_classes_in_calendar")
+    def update_classes_in_calendar(
+        self,
+        calendar_id: str,
+        class_name: str,
+        classes: Iterable[Class],
+    ) -> dict[int, str]:
+        """Patch events of classes with batch requests, return event id of each updated class.
+
+        Events deleted from the calendar by hand are created again.
+        """
+        classes_by_id = {str(class_.id): class_ for class_ in classes}
+        requests = {
+            class_id: self.gc.service.events().patch(
+                calendarId=calendar_id,
+                eventId=class_.gcal_event_id,
+                body=self._event_body(class_name, class_),
+            )
+            for class_id, class_ in classes_by_id.items()
+        }
+        responses = self._execute_batches(requests, missing_ok=True)
+        event_ids = {int(class_id): response["id"] for class_id, response in responses.items() if response is not None}
+        missing = [classes_by_id[class_id] for class_id, response in responses.items() if response is None]
+        if missing:
+            event_ids.update(self.add_classes_to_calendar(calendar_id, class_name, missing))
+        return event_ids
+
+    @instrumented("calendar.delete_classes_from_calendar")
+    def delete_classes_from_calendar(self, calendar_id: str, event_ids: Iterable[str]) -> list[str]:
+        """Delete events with batch requests, return ids of deleted events including already missing ones."""
+        requests = {
+            event_id: self.gc.service.events().delete(calendarId=calendar_id, eventId=event_id)
+            for event_id in event_ids
+        }
+        return list(self._execute_batches(requests, missing_ok=True))
+
+    @staticmethod
+    def _event_body(class_name: str, class_: Class) -> dict[str, Any]:
+        event = Event(
+            class_name,
+            start=class_.start_time,
+            end=class_.end_time,
+            description=class_.class_type,
+            visibility=Visibility.PUBLIC,
+        )
+        return EventSerializer.to_json(event)  # type: ignore[no-any-return]
+
+    def _execute_batches(self, requests: dict[str, Any], *, missing_ok: bool = False) -> dict[str, Any]:
+        """Send requests in batches of `MAX_BATCH_SIZE`, return responses of successful requests by their keys.
+
+        Rate limited requests are sent again after a pause, up to `calendar_max_retries` times. With `missing_ok`
+        requests to deleted events are successful with `None` response. If a whole batch fails for another reason,
+        the remaining requests are not sent and responses received so far are returned, so they can still be saved.
+        """
+        responses = {}
+        rate_limited: dict[str, Any] = {}
+
+        def callback(request_id: str, response: Any, exception: Exception | None) -> None:  # noqa: ANN401
+            if exception is None:
+                responses[request_id] = response
+            elif is_rate_limit_error(exception):
+                rate_limited[request_id] = requests[request_id]
+            elif missing_ok and is_missing_error(exception):
+                responses[request_id] = None
+            else:
+                logger.warning(f"Calendar request {request_id} failed: {exception}")
+
+        pending = requests
+        for attempt in counter():
+            items = list(pending.items())
+            answered = len(responses)
+            failed = False
+            for i in range(0, len(items), MAX_BATCH_SIZE):
+                chunk = dict(items[i : i + MAX_BATCH_SIZE])
+                if not self._execute_batch(chunk, callback, rate_limited):
+                    logger.warning(f"{len(items) - i} calendar requests are not sent")
+                    failed = True
+                    break
+            # failed requests neither slow down nor speed up sending
+            self.rate_limiter.succeeded(len(responses) - answered)
+            if failed or not rate_limited:
+                break
+            if attempt >= self.settings.calendar_max_retries:
+                logger.warning(f"Calendar requests {list(rate_limited)} are still rate limited, giving up")
+                break
+            self._backoff(attempt, len(rate_limited))
+            pending, rate_limited = rate_limited, {}
+        return responses
+
+    def _execute_batch(
+        self,
+        chunk: dict[str, Any],
+        callback: Callable[[str, Any, Exception | None], None],
+        rate_limited: dict[str, Any],
+    ) -> bool:
+        """Send one batch, return `False` if it failed as a whole.
+
+        Parts of a failed batch are not applied, a rate limited batch is added to `rate_limited` to be sent again.
+        """
+        batch = self.gc.service.new_batch_http_request(callback=callback)
+        for request_id, request in chunk.items():
+            batch.add(request, request_id=request_id)
+        self.rate_limiter.acquire(len(chunk))
+        count("calendar_api_calls")
+        count("calendar_batched_requests", len(chunk))
+        try:
+            batch.execute()
+        except HttpError as e:
+            if not is_rate_limit_error(e):
+                logger.warning(f"Calendar batch failed: {e}")
+                return False
+            rate_limited.update(chunk)
+        except (OSError, HttpLib2Error) as e:
+            logger.warning(f"Calendar batch failed: {e}")
+            return False
+        return True
+
+    def _call(self, func: Callable[[], T]) -> T:
+        """Make a single API call, retry it after a pause if it is rate limited."""
+        attempt = 0
+        while True:
+            self.rate_limiter.acquire()
+            count("calendar_api_calls")
+            try:
+                result = func()
+            except HttpError as e:
+                if not is_rate_limit_error(e) or attempt >= self.settings.calendar_max_retries:
+                    raise
+                self._backoff(attempt)
+                attempt += 1
+                continue
+            self.rate_limiter.succeeded()
+            return result
+
+    def _backoff(self, attempt: int, requests: int = 1) -> None:
+        delay = self.settings.calendar_backoff_factor * 2**attempt
+        logger.info(f"Calendar API rate limit exceeded for {requests} requests, retry in {delay} seconds")
+        count("calendar_rate_limited", requests)
+        self.rate_limiter.backoff(delay)
+
+    @instrumented("calendar.delete_class_from_calendar")
     def delete_class_from_calendar(self, calendar_id: str, event_id: str) -> None:
-        self.gc.delete_event(event_id, calendar_id=calendar_id)
+        self._call(lambda: self.gc.delete_event(event_id, calendar_id=calendar_id))
@@ -1,12 +1,27 @@
 from collections import defaultdict
-from collections.abc import Sequence
+from collections.abc import AsyncIterator, Collection, Iterable, Sequence
+from typing import Any
 
-from sqlalchemy import and_, select
+from dateutil import tz
+from sqlalchemy import Integer, Select, and_, any_, bindparam, delete, insert, select, tuple_, update
+from sqlalchemy.dialects.postgresql import ARRAY
+from sqlalchemy.dialects.postgresql import insert as pg_insert
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from itmo_ai_timetable.db.base import Class, ClassStatusTable, Course, User
+from itmo_ai_timetable.course_index import CourseNameIndex, same_qualifiers
+from itmo_ai_timetable.db.base import SETTLED_STATUSES, Class, ClassStatusTable, Course, User, UserCourse
+from itmo_ai_timetable.db.class_status import changed_status, get_class_status_registry, removed_status
 from itmo_ai_timetable.db.session_manager import with_async_session
-from itmo_ai_timetable.schemes import ClassStatus, Pair
+from itmo_ai_timetable.instrumentation import count, instrumented
+from itmo_ai_timetable.logger import get_logger
+from itmo_ai_timetable.pair_batch import PairBatch, TimeKey, diff_classes, to_epoch
+from itmo_ai_timetable.schemes import ClassStatus, Pair, ScheduleDelta
+from itmo_ai_timetable.settings import Settings
+
+logger = get_logger(__name__)
+
+# statuses of classes that are in the timetable, diffs are made against them
+LIVE_STATUSES = (ClassStatus.need_to_add, ClassStatus.need_to_update, ClassStatus.synced)
 
 
 class DBRepository:
@@ -16,30 +31,139 @@ class DBRepository:
         result = await session.execute(select(ClassStatusTable).filter(ClassStatusTable.name == class_status.name))
         return result.scalar_one()
 
+    @staticmethod
+    @with_async_session
+    async def get_class_status_id(class_status: ClassStatus, *, session: AsyncSession) -> int:
+        """Id of status from the registry, db is queried only on the first call for the engine."""
+        return (await get_class_status_registry(session)).id(class_status)
+
     @staticmethod
     async def get_course(course_name: str, session: AsyncSession) -> Course | None:
         query = await session.execute(select(Course).filter(Course.name == course_name))
         return query.scalar()
 
+    @staticmethod
+    async def resolve_courses(
+        course_names: Iterable[str],
+        session: AsyncSession,
+    ) -> tuple[dict[str, Course], list[str]]:
+        """Find courses by name, misspelled names are matched to the closest course above the threshold.
+
+        A match that differs in a number or a bracketed part is another course of a series, it is left unresolved and
+        is only suggested to the admin. Returns course for each resolved name and names that were not resolved.
+        """
+        settings = Settings()
+        query = await session.execute(select(Course))
+        courses_by_name = {course.name: course for course in query.scalars()}
+        index = CourseNameIndex(courses_by_name)
+
+        courses, not_found_courses = {}, []
+        for course_name in course_names:
+            course = courses_by_name.get(course_name)
+            match = index.best_match(course_name) if course is None else None
+            if (
+                match is not None
+                and match.score >= settings.course_match_threshold
+                and same_qualifiers(course_name, match.name)
+            ):
+                logger.warning(f"Course {course_name!r} matched to {match.name!r} with score {match.score:.2f}")
+                course = courses_by_name[match.name]
+            if course is None:
+                not_found_courses.append(course_name)
+            else:
+                courses[course_name] = course
+        return courses, not_found_courses
+
     @staticmethod
     @with_async_session
-    async def get_courses(*, session: AsyncSession) -> Sequence[Course]:
+    async def suggest_courses(course_names: Iterable[str], *, session: AsyncSession) -> dict[str, str]:
+        """Closest known course for each name with similarity above `course_suggest_threshold`."""
+        threshold = Settings().course_suggest_threshold
+        query = await session.execute(select(Course.name))
+        index = CourseNameIndex(query.scalars())
+        suggestions = {}
+        for course_name in course_names:
+            match = index.best_match(course_name)
+            if match is not None and match.score >= threshold:
+                suggestions[course_name] = match.name
+        return suggestions
+
+    @staticmethod
+    @instrumented("db.get_courses")
+    @with_async_session
+    async def get_courses(course_ids: Collection[int] | None = None, *, session: AsyncSession) -> Sequence[Course]:
+        """All courses or only courses with given ids."""
         query = select(Course)
+        if course_ids is not None:
+            query = query.where(Course.id.in_(course_ids))
         result = await session.execute(query)
         return result.scalars().all()
 
     @staticmethod
+    @instrumented("db.stream_courses")
+    @with_async_session
+    async def stream_courses(*, session: AsyncSession) -> AsyncIterator[Course]:
+        """Iterate over courses fetched from a server-side cursor by `db_stream_chunk_size` rows."""
+        query = select(Course).execution_options(yield_per=Settings().db_stream_chunk_size)
+        async for course in await session.stream_scalars(query):
+            yield course
+
+    @staticmethod
+    @instrumented("db.update_courses")
     @with_async_session
     async def update_courses(courses: list[Course], *, session: AsyncSession) -> None:
         session.add_all(courses)
         await session.commit()
 
     @staticmethod
+    @instrumented("db.update_classes")
     @with_async_session
     async def update_classes(classes: list[Class], *, session: AsyncSession) -> None:
         session.add_all(classes)
         await session.commit()
 
+    @staticmethod
+    @instrumented("db.mark_classes_synced")
+    @with_async_session
+    async def mark_classes_synced(event_ids: dict[int, str], *, commit: bool = True, session: AsyncSession) -> None:
+        """Save calendar event ids of classes and set them synced status with one bulk update by primary key.
+
+        Pass `commit=False` while streaming classes, commit closes the server-side cursor.
+        """
+        if event_ids:
+            synced_status_id = (await get_class_status_registry(session)).id(ClassStatus.synced)
+            await session.execute(
+                update(Class),
+                [
+                    {"id": class_id, "gcal_event_id": event_id, "class_status_id": synced_status_id}
+                    for class_id, event_id in event_ids.items()
+                ],
+            )
+        if commit:
+            await session.commit()
+
+    @staticmethod
+    @instrumented("db.set_class_status")
+    @with_async_session
+    async def set_class_status(
+        class_ids: Sequence[int],
+        status: ClassStatus,
+        *,
+        commit: bool = True,
+        session: AsyncSession,
+    ) -> None:
+        """Move classes to `status` with one statement."""
+        if class_ids:
+            status_id = (await get_class_status_registry(session)).id(status)
+            await session.execute(
+                update(Class)
+                .where(Class.id == any_(bindparam("class_ids", list(class_ids), type_=ARRAY(Integer))))
+                .values(class_status_id=status_id)
+                .execution_options(synchronize_session="fetch"),
+            )
+        if commit:
+            await session.commit()
+
     @staticmethod
     async def get_existing_classes(
         course_id: int,
@@ -63,37 +187,162 @@ class DBRepository:
         ]
 
     @staticmethod
+    @instrumented("db.add_classes")
     @with_async_session
-    async def add_classes(classes: list[Pair], *, session: AsyncSession) -> list[str]:
-        synced_status = await DBRepository.get_class_status_by_name(ClassStatus.synced, session=session)
-        need_to_delete_status = await DBRepository.get_class_status_by_name(ClassStatus.need_to_delete, session=session)
+    async def add_classes(classes: list[Pair] | PairBatch, *, session: AsyncSession) -> list[str]:
+        """Diff classes with live classes of their courses and apply the diff with a fixed number of statements.
+
+        New classes are inserted with `need_to_add` status. Classes with a new type, and removed and added classes
+        of a course on the same day, are updated in place, so their events are patched instead of re-created.
+        Removed classes get `need_to_delete` status, or `deleted` if their event was not created yet.
+        """
+        statuses = await get_class_status_registry(session)
+        need_to_add_status_id = statuses.id(ClassStatus.need_to_add)
 
-        courses_classes = defaultdict(list)
-        for c in classes:
-            courses_classes[c.name].append(c)
+        batch = classes if isinstance(classes, PairBatch) else PairBatch.from_pairs(classes)
+        timezone = batch.timezone or tz.gettz(Settings().tz)
 
-        not_found_courses = []
+        courses_classes = batch.by_course()
+        courses, not_found_courses = await DBRepository.resolve_courses(courses_classes, session)
+        # a misspelled name and the correct one may be resolved to the same course, its classes are diffed together
+        course_rows: dict[int, list[int]] = defaultdict(list)
         for course_name, course_classes in courses_classes.items():
-            course = await DBRepository.get_course(course_name, session)
+            if course_name in courses:
+                course_rows[courses[course_name].id].extend(course_classes)
 
-            if course is None:
-                not_found_courses.append(course_name)
-                continue
+        query = await session.execute(
+            select(Class.id, Class.course_id, Class.start_time, Class.end_time, Class.class_type, Class.class_status_id)
+            .filter(Class.course_id.in_(course_rows))
+            .filter(Class.class_status_id.in_([statuses.id(status) for status in LIVE_STATUSES])),
+        )
+        # id, type and status id of classes by course and time
+        existing_classes: dict[int, dict[TimeKey, tuple[int, str | None, int]]] = defaultdict(dict)
+        for class_id, course_id, start_time, end_time, class_type, status_id in query.tuples():
+            existing_classes[course_id][(to_epoch(start_time), to_epoch(end_time))] = (class_id, class_type, status_id)
+        statements = 2
 
-            existing_classes = await DBRepository.get_existing_classes(course.id, synced_status, session)
-            existing_class_identifiers = {(c.start_time, c.end_time) for c in existing_classes}
-            new_class_identifiers = {(c.start_time, c.end_time) for c in course_classes}
+        def new_class(course_id: int, i: int, status_id: int) -> dict[str, Any]:
+            return {
+                "course_id": course_id,
+                "start_time": batch.start_time(i),
+                "end_time": batch.end_time(i),
+                "class_type": batch.pair_type(i),
+                "class_status_id": status_id,
+            }
 
-            classes_to_add = [c for c in course_classes if (c.start_time, c.end_time) not in existing_class_identifiers]
-            classes_to_delete = [c for c in existing_classes if (c.start_time, c.end_time) not in new_class_identifiers]
+        new_classes: list[dict[str, Any]] = []
+        changed_classes: list[dict[str, Any]] = []
+        removed_classes: dict[ClassStatus, list[int]] = defaultdict(list)
+        for course_id, rows in course_rows.items():
+            existing_class_keys = existing_classes[course_id]
+            new_class_keys = {batch.time_key(i): i for i in rows}
+            diff = diff_classes(
+                {key: class_type for key, (_, class_type, _) in existing_class_keys.items()},
+                {key: batch.pair_type(i) for key, i in new_class_keys.items()},
+                timezone,
+            )
+            new_classes.extend(new_class(course_id, new_class_keys[key], need_to_add_status_id) for key in diff.added)
+            for old_key, new_key in diff.changed:
+                class_id, _, status_id = existing_class_keys[old_key]
+                status = changed_status(statuses.status(status_id))
+                changed_classes.append(
+                    {"id": class_id, **new_class(course_id, new_class_keys[new_key], statuses.id(status))},
+                )
+            for key in diff.removed:
+                class_id, _, status_id = existing_class_keys[key]
+                removed_classes[removed_status(statuses.status(status_id))].append(class_id)
 
-            await DBRepository.update_class_statuses(classes_to_delete, need_to_delete_status)
-            new_classes = await DBRepository.create_new_classes(course.id, classes_to_add)
+        statements += await DBRepository._write_classes(new_classes, changed_classes, removed_classes, session)
+        await session.commit()
 
-            session.add_all(new_classes)
+        count("db.add_classes.statements", statements)
+        logger.info(
+            f"Classes: {len(new_classes)} added, {len(changed_classes)} changed, "
+            f"{sum(map(len, removed_classes.values()))} removed, {statements} statements",
+        )
+        return not_found_courses
+
+    @staticmethod
+    async def _write_classes(
+        new_classes: list[dict[str, Any]],
+        changed_classes: list[dict[str, Any]],
+        removed_classes: dict[ClassStatus, list[int]],
+        session: AsyncSession,
+    ) -> int:
+        """Insert, update by primary key and move removed classes to their status, return number of statements."""
+        statements = 0
+        if new_classes:
+            await session.execute(insert(Class), new_classes)
+            statements += 1
+        if changed_classes:
+            await session.execute(update(Class), changed_classes)
+            statements += 1
+        for status, class_ids in removed_classes.items():
+            await DBRepository.set_class_status(class_ids, status, commit=False, session=session)
+            statements += 1
+        return statements
+
+    @staticmethod
+    @instrumented("db.apply_schedule_delta")
+    @with_async_session
+    async def apply_schedule_delta(delta: ScheduleDelta, *, session: AsyncSession) -> list[str]:
+        """Apply changes found by `ScheduleParser.parse_incremental` without diffing whole courses.
+
+        Status changes follow the same rules as in `add_classes`.
+        """
+        statuses = await get_class_status_registry(session)
+
+        course_names = {p.name for p in [*delta.added, *delta.removed, *delta.changed]}
+        courses, not_found_courses = await DBRepository.resolve_courses(course_names, session)
+
+        classes_query = await session.execute(
+            select(Class).filter(
+                and_(
+                    Class.course_id.in_([course.id for course in courses.values()]),
+                    Class.class_status_id.in_([statuses.id(status) for status in LIVE_STATUSES]),
+                ),
+            ),
+        )
+        existing_classes: dict[int, dict[TimeKey, Class]] = defaultdict(dict)
+        for class_obj in classes_query.scalars():
+            existing_classes[class_obj.course_id][(to_epoch(class_obj.start_time), to_epoch(class_obj.end_time))] = (
+                class_obj
+            )
+
+        def by_course(pairs: list[Pair]) -> dict[int, dict[TimeKey, Pair]]:
+            course_pairs: dict[int, dict[TimeKey, Pair]] = defaultdict(dict)
+            for pair in pairs:
+                if pair.name in courses:
+                    course_pairs[courses[pair.name].id][(to_epoch(pair.start_time), to_epoch(pair.end_time))] = pair
+            return course_pairs
+
+        removed, added, changed = by_course(delta.removed), by_course(delta.added), by_course(delta.changed)
+        timezone = tz.gettz(Settings().tz)
+        for course_id in removed.keys() | added.keys() | changed.keys():
+            course_classes = existing_classes[course_id]
+            # only the delta is diffed: removed and changed classes that exist against added and changed ones
+            old_keys = [key for key in [*removed[course_id], *changed[course_id]] if key in course_classes]
+            new_pairs = {key: pair for key, pair in added[course_id].items() if key not in course_classes}
+            new_pairs.update((key, pair) for key, pair in changed[course_id].items() if key in course_classes)
+            diff = diff_classes(
+                {key: course_classes[key].class_type for key in old_keys},
+                {key: pair.pair_type for key, pair in new_pairs.items()},
+                timezone,
+            )
+            for old_key, new_key in diff.changed:
+                class_obj, pair = course_classes[old_key], new_pairs[new_key]
+                class_obj.start_time, class_obj.end_time = pair.start_time, pair.end_time
+                class_obj.class_type = pair.pair_type  # type: ignore[assignment]
+                class_obj.class_status_id = statuses.id(changed_status(statuses.status(class_obj.class_status_id)))
+            for key in diff.removed:
+                class_obj = course_classes[key]
+                class_obj.class_status_id = statuses.id(removed_status(statuses.status(class_obj.class_status_id)))
+            session.add_all(
+                await DBRepository.create_new_classes(course_id, [new_pairs[key] for key in diff.added]),
+            )
 
         await session.commit()
-        return list(set(not_found_courses))
+        return sorted(not_found_courses)
 
     @staticmethod
     @with_async_session
@@ -109,28 +358,71 @@ class DBRepository:
         return user
 
     @staticmethod
+    @instrumented("db.create_matching")
     @with_async_session
     async def create_matching(selected: dict[str, list[str]], course_number: int, *, session: AsyncSession) -> None:
         """
-        :param selected: contains pairs of names of users and courses he selected
+        Replace courses of users from `selected` with courses they selected, in one transaction.
+
+        Users with an empty list lose all their courses, users missing from `selected` are not changed.
+
+        :param selected: contains pairs of names of users and courses he selected, including users without courses
         :param course_number: number of course
         :param session:
         :return:
         """
-        for user_name, courses in selected.items():
-            user = await DBRepository.get_or_create_user(user_name, course_number, session=session)
-            for course_name in courses:
-                course = await DBRepository.get_course(course_name, session)
-                # Fetch the user's current courses
-                await session.refresh(user, ["courses"])
+        query = await session.execute(select(Course.name, Course.id))
+        course_ids = dict(query.tuples().all())
+        not_found_courses = sorted({course for courses in selected.values() for course in courses} - course_ids.keys())
+        if not_found_courses:
+            raise ValueError(f"Courses {not_found_courses} not found")
 
-                if course is None:
-                    raise ValueError(f"Course {course_name} not found")
+        user_ids = await DBRepository.get_or_create_users(list(selected), course_number, session=session)
+        desired = {
+            (user_ids[user_name], course_ids[course_name])
+            for user_name, courses in selected.items()
+            for course_name in courses
+        }
+        query = await session.execute(
+            select(UserCourse.user_id, UserCourse.course_id).filter(UserCourse.user_id.in_(user_ids.values())),
+        )
+        existing = set(query.tuples().all())
 
-                if course not in user.courses:
-                    user.courses.append(course)
+        to_insert = desired - existing
+        to_delete = existing - desired
+        if to_insert:
+            await session.execute(
+                insert(UserCourse),
+                [{"user_id": user_id, "course_id": course_id} for user_id, course_id in sorted(to_insert)],
+            )
+        if to_delete:
+            await session.execute(
+                delete(UserCourse).where(tuple_(UserCourse.user_id, UserCourse.course_id).in_(sorted(to_delete))),
+            )
+        await session.commit()
+        logger.info(f"Enrolments: {len(to_insert)} added, {len(to_delete)} removed")
 
-                await session.commit()
+    @staticmethod
+    async def get_or_create_users(
+        user_names: list[str],
+        course_number: int,
+        *,
+        session: AsyncSession,
+    ) -> dict[str, int]:
+        """Ids of users with given names on the course, missing users are created in the same statement."""
+        if not user_names:
+            return {}
+        statement = pg_insert(User).values(
+            [{"user_real_name": name, "studying_course": course_number} for name in dict.fromkeys(user_names)],
+        )
+        # no-op update makes existing rows returned too
+        query = await session.execute(
+            statement.on_conflict_do_update(
+                index_elements=[User.user_real_name, User.studying_course],
+                set_={"studying_course": statement.excluded.studying_course},
+            ).returning(User.user_real_name, User.id),
+        )
+        return dict(query.tuples().all())
 
     @staticmethod
     @with_async_session
@@ -140,9 +432,39 @@ class DBRepository:
         await session.commit()
 
     @staticmethod
+    async def _unsynced_classes_query(course: Course, session: AsyncSession) -> Select[tuple[Class]]:
+        statuses = await get_class_status_registry(session)
+        # statuses are rendered inline to let the planner use the partial `ix_class_not_synced_course_id` index
+        settled_status_ids = bindparam(
+            "settled_status_ids",
+            [statuses.id(status) for status in SETTLED_STATUSES],
+            type_=Integer,
+            expanding=True,
+            literal_execute=True,
+        )
+        return select(Class).filter(
+            and_(Class.course_id == course.id, Class.class_status_id.not_in(settled_status_ids)),
+        )
+
+    @staticmethod
+    @instrumented("db.get_unsynced_classes_for_course")
     @with_async_session
     async def get_unsynced_classes_for_course(course: Course, *, session: AsyncSession) -> Sequence[Class]:
-        synced_status = await DBRepository.get_class_status_by_name(ClassStatus.synced, session=session)
-        query = select(Class).filter(and_(Class.course_id == course.id, Class.class_status != synced_status))
+        query = await DBRepository._unsynced_classes_query(course, session)
         result = await session.execute(query)
         return result.scalars().all()
+
+    @staticmethod
+    @instrumented("db.stream_unsynced_classes_for_course")
+    @with_async_session
+    async def stream_unsynced_classes_for_course(
+        course: Course,
+        *,
+        session: AsyncSession,
+    ) -> AsyncIterator[Sequence[Class]]:
+        """Yield unsynced classes of course in chunks of `db_stream_chunk_size` from a server-side cursor."""
+        chunk_size = Settings().db_stream_chunk_size
+        query = await DBRepository._unsynced_classes_query(course, session)
+        result = await session.stream_scalars(query.execution_options(yield_per=chunk_size))
+        async for chunk in result.partitions():
+            yield chunk
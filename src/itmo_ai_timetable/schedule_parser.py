@@ -1,59 +1,120 @@
+import hashlib
 from collections.abc import Generator, Iterable
 from datetime import datetime
-from pathlib import Path
+from io import BytesIO
 
-import openpyxl
-import requests
 from dateutil import tz
 from openpyxl.cell.cell import Cell, MergedCell
 from openpyxl.worksheet.merge import MergedCellRange
 from openpyxl.worksheet.worksheet import Worksheet
 
+from itmo_ai_timetable.cell_matcher import CellMatch, CellTextMatcher, get_matcher
 from itmo_ai_timetable.cleaner import course_name_cleaner
+from itmo_ai_timetable.downloader import get_downloader
+from itmo_ai_timetable.instrumentation import count, span
 from itmo_ai_timetable.logger import get_logger
-from itmo_ai_timetable.schemes import Pair
+from itmo_ai_timetable.pair_batch import PairBatch
+from itmo_ai_timetable.schemes import Pair, ScheduleDelta, diff_pairs
 from itmo_ai_timetable.settings import Settings
+from itmo_ai_timetable.xlsx_reader import load_sheet
 
 logger = get_logger(__name__)
 
+# fingerprint of a day block -> pairs parsed from it
+ScheduleSnapshot = dict[str, list[Pair]]
+
 
 class ScheduleParser:
-    def __init__(self, path: str, sheet: str) -> None:
+    def __init__(self, path: str | bytes, sheet: str) -> None:
         self.settings = Settings()
         self.timezone = tz.gettz(self.settings.tz)
         self.sheet = self._load_workbook(path, sheet)
-
-    def _download_excel(self, url: str) -> Path:
-        request = requests.get(url, timeout=5)
-        file_path = Path("file.xlsx")
-        with file_path.open("wb") as file:
-            file.write(request.content)
-        return file_path
-
-    def _load_workbook(self, path: str, sheet: str) -> Worksheet:
-        logger.info("Open file %s", path)
-        if path.startswith("http"):
-            path = str(self._download_excel(path))
-        workbook = openpyxl.load_workbook(path)
-        return workbook[sheet]
+        self.merged_ranges = self._build_merged_index()
+
+    def _load_workbook(self, path: str | bytes, sheet: str) -> Worksheet:
+        if isinstance(path, bytes):
+            logger.info("Open downloaded file, sheet %s", sheet)
+            source: str | BytesIO = BytesIO(path)
+        elif path.startswith("http"):
+            logger.info("Open file %s", path)
+            source = BytesIO(get_downloader().download(path).content)
+        else:
+            logger.info("Open file %s", path)
+            source = path
+        with span("parser.load_sheet"):
+            return load_sheet(source, sheet)
 
     def parse(self) -> list[Pair]:
+        return self.parse_batch().to_pairs()
+
+    def parse_batch(self) -> PairBatch:
         logger.info("Start parse")
-        pairs = []
-        for day_cell in self._get_days():
-            day = self._get_day(day_cell)
-            if day is None:
-                continue
-            pairs.extend(self._parse_day(day, day_cell))
+        batch = PairBatch(self.timezone)
+        with span("parser.walk_cells"):
+            for day_cell in self._get_days():
+                day = self._get_day(day_cell)
+                if day is None:
+                    continue
+                self._parse_day(day, day_cell, batch)
+        count("pairs_emitted", len(batch))
         logger.info("End parse")
-        return pairs
+        return batch
+
+    def parse_incremental(self, snapshot: ScheduleSnapshot | None = None) -> tuple[ScheduleDelta, ScheduleSnapshot]:
+        """Parse only day blocks that changed since `snapshot`.
+
+        Returns difference with pairs from `snapshot` and a new snapshot for the next call.
+        """
+        logger.info("Start incremental parse")
+        previous = snapshot or {}
+        current: ScheduleSnapshot = {}
+        with span("parser.walk_cells"):
+            for day_cell in self._get_days():
+                fingerprint = self._get_day_fingerprint(day_cell)
+                if fingerprint in previous:
+                    current[fingerprint] = previous[fingerprint]
+                    continue
+                day = self._get_day(day_cell)
+                day_batch = PairBatch(self.timezone)
+                if day is not None:
+                    self._parse_day(day, day_cell, day_batch)
+                count("pairs_emitted", len(day_batch))
+                current[fingerprint] = day_batch.to_pairs()
+        reparsed = len(current.keys() - previous.keys())
+        count("days_reparsed", reparsed)
+        logger.info(f"End incremental parse, reparsed {reparsed} of {len(current)} days")
+
+        old_pairs = [pair for pairs in previous.values() for pair in pairs]
+        new_pairs = [pair for pairs in current.values() for pair in pairs]
+        return diff_pairs(old_pairs, new_pairs), current
+
+    def _get_day_fingerprint(self, day_cell: MergedCellRange) -> str:
+        digest = hashlib.blake2b(repr(self._get_first_cell_from_range(day_cell).value).encode(), digest_size=16)
+        for row in self._iter_day_rows(day_cell):
+            values = [(cell.value, cell.hyperlink.target if cell.hyperlink else None) for cell in row]
+            digest.update(repr(values).encode())
+        return digest.hexdigest()
+
+    def _build_merged_index(self) -> dict[tuple[int, int], MergedCellRange]:
+        """Map every (row, column) covered by a merged range to that range.
+
+        Built once per sheet, so lookups from `_get_days` and `_match_cell` don't rescan all ranges.
+        """
+        index = {}
+        for merged_range in self.sheet.merged_cells.ranges:
+            for row in range(merged_range.min_row, merged_range.max_row + 1):
+                for col in range(merged_range.min_col, merged_range.max_col + 1):
+                    index[row, col] = merged_range
+        return index
 
     def _get_days(self) -> list[MergedCellRange]:
-        return [
-            cell_range
-            for cell_range in self.sheet.merged_cells.ranges
-            if cell_range.min_col == self.settings.days_column == cell_range.max_col
-        ]
+        days_column = self.settings.days_column
+        days = []
+        for row in range(1, self.sheet.max_row + 1):
+            cell_range = self.merged_ranges.get((row, days_column))
+            if cell_range is not None and cell_range.min_row == row and cell_range.min_col == cell_range.max_col:
+                days.append(cell_range)
+        return days
 
     def _get_day(self, day_cell: MergedCellRange) -> datetime | None:
         day = self._get_first_cell_from_range(day_cell).value
@@ -69,15 +130,14 @@ class ScheduleParser:
         if (datetime.now(tz=self.timezone) - day).days > self.settings.max_days_difference:
             raise ValueError(f"Date {day.date()} is in previous semester, cell range {day_cell}")
 
-    def _parse_day(self, day: datetime, day_cell: MergedCellRange) -> list[Pair]:
-        pairs = []
+    def _parse_day(self, day: datetime, day_cell: MergedCellRange, batch: PairBatch) -> None:
         for row in self._iter_day_rows(day_cell):
             if row[0].value is None:
                 continue
             # first cell in row is time, other cells are pairs
             pair_start, pair_end = self._get_pair_time(row[0], day)
-            pairs.extend(self._parse_row(row[1:], pair_start, pair_end))
-        return pairs
+            count("cells_visited", len(row) - 1)
+            self._parse_row(row[1:], pair_start, pair_end, batch)
 
     def _iter_day_rows(self, day_cell: MergedCellRange) -> Generator[tuple[Cell, ...], None, None]:
         if day_cell.min_col is None or day_cell.max_col is None:
@@ -101,95 +161,49 @@ class ScheduleParser:
             day.replace(hour=end_hour, minute=end_minute).astimezone(self.timezone),
         )
 
-    def _parse_row(self, cells: Iterable[Cell], pair_start: datetime, pair_end: datetime) -> list[Pair]:
-        pairs = []
+    def _parse_row(self, cells: Iterable[Cell], pair_start: datetime, pair_end: datetime, batch: PairBatch) -> None:
         for cell in cells:
             if cell.value is None or cell.value == "":
                 continue
-            title, pair_type, link = self._process_cell(cell)
-
-            title, parsed_pair_start, parsed_pair_end = self._find_time_in_cell(title)
-            if parsed_pair_start and parsed_pair_end:
-                pair_start = pair_start.replace(hour=parsed_pair_start[0], minute=parsed_pair_start[1])
-                pair_end = pair_end.replace(hour=parsed_pair_end[0], minute=parsed_pair_end[1])
-            if title and title not in self.settings.courses_to_skip:
-                pairs.append(
-                    Pair(
-                        start_time=pair_start,
-                        end_time=pair_end,
-                        name=title,
-                        pair_type=pair_type,
-                        link=link,
-                    ),
-                )
-        return pairs
-
-    def _process_cell(self, cell: Cell | MergedCell) -> tuple[str, str | None, str | None]:
+            match, link = self._match_cell(cell)
+
+            start_time, end_time = pair_start, pair_end
+            if match.start and match.end:
+                start_time = pair_start.replace(hour=match.start[0], minute=match.start[1])
+                end_time = pair_end.replace(hour=match.end[0], minute=match.end[1])
+            if match.title and match.title not in self.settings.courses_to_skip:
+                batch.append(match.title, start_time, end_time, match.pair_type, link)
+
+    def _match_cell(self, cell: Cell | MergedCell) -> tuple[CellMatch, str | None]:
         if cell.value is None:
-            return "", None, None
+            return CellMatch("", None, None, None), None
 
         if isinstance(cell, MergedCell):
             merge_range = self._find_mergedcell_mergerange(cell)
             cell = self._get_first_cell_from_range(merge_range)
 
         link = cell.hyperlink.target if cell.hyperlink else None
-        cell_title = self._clean_cell_value(cell)
-        cell_title, key_word = self._find_key_words_in_cell(cell_title)
-        cell_title = course_name_cleaner(cell_title)
+        match = self._matcher.match(self._clean_cell_value(cell))
+        with span("parser.clean_course_name"):
+            title = course_name_cleaner(match.title)
+        return match._replace(title=title), link
 
-        return cell_title, key_word, link
+    @property
+    def _matcher(self) -> CellTextMatcher:
+        return get_matcher(tuple(self.settings.keywords))
 
     def _find_mergedcell_mergerange(self, merged_cell: MergedCell) -> MergedCellRange:
-        for merged_range in self.sheet.merged_cells.ranges:
-            if (
-                merged_range.min_col <= merged_cell.column <= merged_range.max_col
-                and merged_range.min_row <= merged_cell.row <= merged_range.max_row
-                and isinstance(merged_range, MergedCellRange)
-            ):
-                return merged_range
-        raise ValueError(f"Can't find merged cell range for cell {merged_cell}")
+        merged_range = self.merged_ranges.get((merged_cell.row, merged_cell.column))  # type: ignore[arg-type]
+        if merged_range is None:
+            raise ValueError(f"Can't find merged cell range for cell {merged_cell}")
+        return merged_range
 
     def _get_first_cell_from_range(self, cell_range: MergedCellRange) -> Cell:
-        for row, col in cell_range.cells:
-            return self.sheet.cell(row=row, column=col)
-        raise ValueError(f"Can't find cell in merged cell range {cell_range}")
+        if cell_range.min_row is None or cell_range.min_col is None:
+            raise ValueError(f"Can't find cell in merged cell range {cell_range}")
+        return self.sheet.cell(row=cell_range.min_row, column=cell_range.min_col)
 
     def _clean_cell_value(self, cell: Cell) -> str:
         if not isinstance(cell.value, str):
             raise ValueError(f"Cell value should be string, got {type(cell.value)}")
         return cell.value.replace("/", "\\").replace("\n", " ").strip()
-
-    def _find_key_words_in_cell(self, cell_title: str) -> tuple[str, str | None]:
-        if not isinstance(cell_title, str):
-            raise ValueError(f"Cell title should be string, got {type(cell_title)}")
-        for key_word in self.settings.keywords:
-            if key_word in cell_title:
-                return cell_title.replace(key_word, "").strip(), key_word
-        return cell_title, None
-
-    def _find_time_in_cell(self, cell: str) -> tuple[str, tuple[int, int] | None, tuple[int, int] | None]:
-        """Find time in cell.
-
-        "Публичные выступления 1 / Финансовая грамотность 3 17:00 - 19:15" should be 17:00 and 19:15
-        """
-        cell = cell.strip()
-        if not cell or ("-" not in cell and ":" not in cell):
-            return cell, None, None
-
-        start_time = end_time = None
-        cell = cell.replace("-", " ")
-        for time in cell.split():
-            if ":" not in time:
-                continue
-            try:
-                hour, minute = map(int, time.split(":"))
-            except ValueError as e:
-                raise ValueError(f"Invalid time format in cell: {cell}") from e
-
-            if start_time is None:
-                start_time = (hour, minute)
-            else:
-                end_time = (hour, minute)
-            cell = cell.replace(time, "").strip()
-
-        return cell, start_time, end_time
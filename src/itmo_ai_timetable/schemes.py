@@ -12,6 +12,26 @@ class Pair(BaseModel):
     link: str | None = None
 
 
+class ScheduleDelta(BaseModel):
+    added: list[Pair] = []
+    removed: list[Pair] = []
+    # pairs with the same course and time, but new type or link
+    changed: list[Pair] = []
+
+    def __bool__(self) -> bool:
+        return bool(self.added or self.removed or self.changed)
+
+
+def diff_pairs(old_pairs: list[Pair], new_pairs: list[Pair]) -> ScheduleDelta:
+    old = {(p.name, p.start_time, p.end_time): p for p in old_pairs}
+    new = {(p.name, p.start_time, p.end_time): p for p in new_pairs}
+    return ScheduleDelta(
+        added=[p for key, p in new.items() if key not in old],
+        removed=[p for key, p in old.items() if key not in new],
+        changed=[p for key, p in new.items() if key in old and old[key] != p],
+    )
+
+
 class ClassStatus(Enum):
     need_to_add = "need_to_add"
     need_to_delete = "need_to_delete"
@@ -1,10 +1,59 @@
 from collections import defaultdict
 
-import openpyxl
 from openpyxl.cell import MergedCell
 from openpyxl.utils import column_index_from_string
 
 from itmo_ai_timetable.cleaner import course_name_cleaner
+from itmo_ai_timetable.xlsx_reader import load_sheet
+
+
+class SelectionMatrix:
+    """Students x courses selection table stored as int bitsets.
+
+    Bit `j` of `student_rows[i]` is set if student `i` selected course `j`, `course_columns` is the transposed view.
+    """
+
+    def __init__(self, courses: list[str]) -> None:
+        self.courses = courses
+        self.students: list[str] = []
+        self.student_rows: list[int] = []
+        self.course_columns = [0] * len(courses)
+        self._course_index = {course: j for j, course in enumerate(courses)}
+
+    def add_student(self, name: str, row: int) -> None:
+        i = len(self.students)
+        self.students.append(name)
+        self.student_rows.append(row)
+        student_bit = 1 << i
+        while row:
+            low_bit = row & -row
+            self.course_columns[low_bit.bit_length() - 1] |= student_bit
+            row ^= low_bit
+
+    def courses_of(self, student_index: int) -> list[str]:
+        row = self.student_rows[student_index]
+        return [course for j, course in enumerate(self.courses) if row >> j & 1]
+
+    def students_of(self, course: str) -> list[str]:
+        column = self.course_columns[self._course_index[course]]
+        return [student for i, student in enumerate(self.students) if column >> i & 1]
+
+    def enrolment_counts(self) -> dict[str, int]:
+        return {course: column.bit_count() for course, column in zip(self.courses, self.course_columns, strict=True)}
+
+    def overlap(self, first_course: str, second_course: str) -> int:
+        """Number of students who selected both courses."""
+        first = self.course_columns[self._course_index[first_course]]
+        second = self.course_columns[self._course_index[second_course]]
+        return (first & second).bit_count()
+
+    def to_dict(self, *, with_empty: bool = False) -> dict[str, list[str]]:
+        """Courses of each student, students without selected courses are kept only if `with_empty` is set."""
+        matches: defaultdict[str, list[str]] = defaultdict(list)
+        for i, name in enumerate(self.students):
+            if self.student_rows[i] or with_empty:
+                matches[name].extend(self.courses_of(i))
+        return dict(matches)
 
 
 class SelectionParser:
@@ -17,8 +66,7 @@ class SelectionParser:
         last_select_column: str,
         name_column: str = "A",
     ) -> None:
-        self.workbook = openpyxl.load_workbook(filepath)
-        self.sheet = self.workbook[sheet_name]
+        self.sheet = load_sheet(filepath, sheet_name)
         self.course_row = course_row
         self.start_column = first_select_column
         self.end_column = last_select_column
@@ -26,35 +74,40 @@ class SelectionParser:
         self.data_start_row = course_row + 1
 
     def parse(self) -> dict[str, list[str]]:
+        return self.parse_matrix().to_dict()
+
+    def parse_matrix(self) -> SelectionMatrix:
         courses = self._get_courses()
-        return self._match_names_to_courses(courses)
+        return self._build_matrix(courses)
 
-    def _get_courses(self) -> list[tuple[str, str]]:
+    def _get_courses(self) -> list[tuple[int, str]]:
+        """Find courses in header row, returns column index and name of each course."""
+        start = column_index_from_string(self.start_column)
+        end = column_index_from_string(self.end_column)
         courses = []
         for cell in self.sheet[self.course_row]:
             if isinstance(cell, MergedCell):
-                if cell.column <= column_index_from_string(
-                    self.start_column,
-                ) or cell.column >= column_index_from_string(self.end_column):
+                if cell.column <= start or cell.column >= end:
                     break
                 raise ValueError(f"Cell {cell} is merged")
-            if (
-                column_index_from_string(self.start_column)
-                <= column_index_from_string(cell.column_letter)
-                <= column_index_from_string(self.end_column)
-                and cell.value
-                and isinstance(cell.value, str)
-            ):
-                courses.append((cell.column_letter, cell.value))
+            if start <= cell.column <= end and cell.value and isinstance(cell.value, str):
+                courses.append((cell.column, cell.value))
         return courses
 
-    def _match_names_to_courses(self, courses: list[tuple[str, str]]) -> dict[str, list[str]]:
-        matches = defaultdict(list)
-        for row in self.sheet.iter_rows(min_row=self.data_start_row, min_col=1, max_col=1):
-            name = row[0].value
-            if name and isinstance(name, str):
-                for col, course in courses:
-                    cell_value = self.sheet[f"{col}{row[0].row}"].value
-                    if cell_value == 1:
-                        matches[name].append(course_name_cleaner(course))
-        return matches
+    def _build_matrix(self, courses: list[tuple[int, str]]) -> SelectionMatrix:
+        matrix = SelectionMatrix([course_name_cleaner(course) for _, course in courses])
+        name_column = column_index_from_string(self.name_column)
+        # positions in a row tuple that starts from the first column
+        name_position = name_column - 1
+        course_positions = [(column - 1, 1 << j) for j, (column, _) in enumerate(courses)]
+        max_column = max([name_column, *(column for column, _ in courses)])
+        for values in self.sheet.iter_rows(min_row=self.data_start_row, max_col=max_column, values_only=True):
+            name = values[name_position]
+            if not name or not isinstance(name, str):
+                continue
+            row = 0
+            for position, course_bit in course_positions:
+                if values[position] == 1:
+                    row |= course_bit
+            matrix.add_student(name, row)
+        return matrix
@@ -1,3 +1,5 @@
+from pathlib import Path
+
 from pydantic import Field, FilePath, HttpUrl
 from pydantic_settings import BaseSettings, SettingsConfigDict
 
@@ -11,6 +13,17 @@ class Settings(BaseSettings):
     postgres_user: str
     postgres_password: str
 
+    db_echo: bool = Field(False, description="Log every SQL statement")  # noqa: FBT003
+    db_pool_size: int = Field(5, description="Connections kept open in the pool")
+    db_max_overflow: int = Field(10, description="Connections opened above the pool size under load")
+    db_pool_pre_ping: bool = Field(True, description="Check connection liveness on checkout")  # noqa: FBT003
+    db_pool_recycle: int = Field(1800, description="Reopen connections older than this number of seconds, -1 to keep")
+    db_statement_cache_size: int = Field(
+        100,
+        description="Prepared statements cached per connection by asyncpg, 0 to disable for pgbouncer",
+    )
+    db_stream_chunk_size: int = Field(500, description="Rows fetched at once by streaming queries")
+
     days_column: int = Field(2, description="Column with days")
     timetable_offset: int = Field(3, description="Offset between date and timetable")
     timetable_len: int = Field(5, description="Number of columns that relate to timetable")
@@ -24,6 +37,55 @@ class Settings(BaseSettings):
 
     courses_to_skip: list[str] = Field(["Выходной", "Demoday 12:00-15:30"], description="Courses to skip")
 
+    download_timeout: float = Field(30, description="Timeout for spreadsheet download in seconds")
+    download_retries: int = Field(3, description="Retries for failed spreadsheet downloads")
+    download_backoff_factor: float = Field(0.5, description="Backoff factor between download retries")
+    download_pool_size: int = Field(4, description="Max connections kept per host by the downloader")
+
+    ingestion_workers: int = Field(4, description="Max processes used to parse timetables in parallel")
+
+    parse_cache_dir: Path = Field(Path(".cache/schedule"), description="Directory with parsed schedules cache")
+    parse_cache_max_bytes: int = Field(50 * 1024 * 1024, description="Max size of parsed schedules cache")
+
+    course_aliases_path: Path | None = Field(
+        None,
+        description="Json file with course name aliases, packaged table is used if not set",
+    )
+    course_match_threshold: float = Field(
+        0.85,
+        description="Min trigram similarity to save classes of unknown course name to the closest course",
+    )
+    course_suggest_threshold: float = Field(0.5, description="Min trigram similarity to suggest the closest course")
+
+    calendar_cache_ttl: int = Field(3600, description="Seconds calendar ids by name are kept before list is refetched")
+    calendar_sync_workers: int = Field(4, description="Courses synced to Google Calendar concurrently")
+    calendar_requests_per_second: float = Field(
+        10,
+        description="Max Google Calendar API requests per second, batched requests are counted one by one",
+    )
+    calendar_burst: int = Field(50, description="Google Calendar API requests that can be sent at once after a pause")
+    calendar_max_retries: int = Field(5, description="Retries of rate limited Google Calendar API requests")
+    calendar_backoff_factor: float = Field(
+        1.0,
+        description="Pause in seconds after a rate limit answer, doubled on each retry",
+    )
+    calendar_sync_interval: int = Field(
+        900,
+        description="Seconds between syncs of all courses that catch changes missed by the change listener",
+    )
+    calendar_notify_debounce: float = Field(
+        2.0,
+        description="Seconds without new class changes before changed courses are synced",
+    )
+    calendar_notify_max_delay: float = Field(30, description="Max seconds a change waits while changes keep coming")
+    calendar_listener_reconnect_delay: float = Field(
+        5.0,
+        description="Pause in seconds before the change listener connects again",
+    )
+
+    instrumentation: bool = Field(False, description="Collect timings and counters of sync stages")  # noqa: FBT003
+    profile_dir: Path | None = Field(None, description="Directory for cProfile dumps of sync runs, off if not set")
+
     course_1_excel_calendar_id: str = Field(description="Link to course 1 calendar")
     course_1_list_name: str = Field("Расписание", description="Name of course 1 list")
     course_2_excel_calendar_id: str = Field(description="Link to course 2 calendar")
@@ -55,7 +117,7 @@ class Settings(BaseSettings):
             **self.database_settings,
         )
 
-    def get_calendar_settings(self) -> list[tuple[HttpUrl, str]]:
+    def get_calendar_settings(self) -> list[tuple[str, str]]:
         return [
             (transform_calndar_id_to_url(self.course_1_excel_calendar_id), self.course_1_list_name),
             (transform_calndar_id_to_url(self.course_2_excel_calendar_id), self.course_2_list_name),
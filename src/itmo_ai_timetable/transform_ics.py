@@ -2,24 +2,25 @@ from pathlib import Path
 
 from ics import Calendar, Event  # type: ignore[attr-defined]
 
+from itmo_ai_timetable.instrumentation import instrumented
+from itmo_ai_timetable.pair_batch import PairBatch
 from itmo_ai_timetable.schemes import Pair
 
 
-def export_ics(pairs: list[Pair], path: Path) -> None:
-    unique_courses = {p.name for p in pairs}
-    for course in unique_courses:
+@instrumented("export_ics")
+def export_ics(pairs: list[Pair] | PairBatch, path: Path) -> None:
+    batch = pairs if isinstance(pairs, PairBatch) else PairBatch.from_pairs(pairs)
+    for course, rows in batch.by_course().items():
         c = Calendar()
 
-        for pair in pairs:
-            if pair.name != course:
-                continue
-
+        for i in rows:
+            pair_type = batch.pair_type(i)
             e = Event(
-                name=pair.name + (f" ({pair.pair_type})" if pair.pair_type else ""),
-                begin=pair.start_time,
-                end=pair.end_time,
-                url=pair.link,
-                description=pair.link,
+                name=course + (f" ({pair_type})" if pair_type else ""),
+                begin=batch.start_time(i),
+                end=batch.end_time(i),
+                url=batch.links[i],
+                description=batch.links[i],
             )
             c.events.add(e)
         course_file_name = course.replace("/", "-")
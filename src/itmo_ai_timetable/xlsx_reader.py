@@ -0,0 +1,96 @@
+from copy import copy
+from typing import BinaryIO
+
+import openpyxl
+from openpyxl import Workbook
+from openpyxl.cell.cell import Cell, MergedCell
+from openpyxl.packaging.relationship import RelationshipList, get_dependents, get_rels_path
+from openpyxl.worksheet._read_only import ReadOnlyWorksheet
+from openpyxl.worksheet._reader import WorkSheetParser
+from openpyxl.worksheet.cell_range import MultiCellRange
+from openpyxl.worksheet.merge import MergedCellRange
+from openpyxl.worksheet.worksheet import Worksheet
+
+from itmo_ai_timetable.logger import get_logger
+
+logger = get_logger(__name__)
+
+
+def load_sheet(source: str | BinaryIO, sheet_name: str) -> Worksheet:
+    """Load one sheet of a workbook without materialising the rest of it.
+
+    The workbook is opened in read-only mode and the sheet XML is streamed once. Only non-empty cell values
+    are copied into a bare worksheet (no styles, no other sheets); merged ranges and hyperlinks, which
+    read-only worksheets don't expose, are rebuilt from the same pass.
+    """
+    workbook = openpyxl.load_workbook(source, read_only=True)
+    try:
+        read_only_sheet = workbook[sheet_name]
+        if not isinstance(read_only_sheet, ReadOnlyWorksheet):
+            raise ValueError(f"Sheet {sheet_name} is not a worksheet")
+        sheet = Worksheet(Workbook(), title=sheet_name)
+
+        worksheet_path: str = read_only_sheet._worksheet_path  # type: ignore[attr-defined] # noqa: SLF001
+        with workbook._archive.open(worksheet_path) as src:  # type: ignore[attr-defined] # noqa: SLF001
+            parser = WorkSheetParser(
+                src,
+                workbook.shared_strings,
+                data_only=workbook.data_only,
+                epoch=workbook.epoch,
+                date_formats=workbook._date_formats,  # type: ignore[attr-defined] # noqa: SLF001
+                timedelta_formats=workbook._timedelta_formats,  # type: ignore[attr-defined] # noqa: SLF001
+            )
+            _bind_values(sheet, parser)
+        _bind_merged_cells(sheet, parser)
+        _bind_hyperlinks(sheet, parser, _read_rels(workbook, worksheet_path))
+    finally:
+        workbook.close()
+    logger.info("Loaded sheet %s with %d cells", sheet_name, len(sheet._cells))  # type: ignore[attr-defined] # noqa: SLF001
+    return sheet
+
+
+def _read_rels(workbook: Workbook, worksheet_path: str) -> RelationshipList:
+    archive = workbook._archive  # type: ignore[attr-defined] # noqa: SLF001
+    rels_path = get_rels_path(worksheet_path)  # type: ignore[no-untyped-call]
+    if rels_path not in archive.namelist():
+        return RelationshipList()
+    return get_dependents(archive, rels_path)
+
+
+def _bind_values(sheet: Worksheet, parser: WorkSheetParser) -> None:
+    for _, row in parser.parse():
+        for parsed_cell in row:
+            if parsed_cell["value"] is None:
+                continue
+            cell = Cell(sheet, row=parsed_cell["row"], column=parsed_cell["column"])
+            cell._value = parsed_cell["value"]  # type: ignore[attr-defined] # noqa: SLF001
+            cell.data_type = parsed_cell["data_type"]
+            sheet._cells[parsed_cell["row"], parsed_cell["column"]] = cell  # type: ignore[attr-defined] # noqa: SLF001
+
+
+def _bind_merged_cells(sheet: Worksheet, parser: WorkSheetParser) -> None:
+    if not parser.merged_cells:
+        return
+    ranges = []
+    for cell_range in parser.merged_cells.mergeCell:
+        merged_range = MergedCellRange(sheet, cell_range.ref)
+        sheet._clean_merge_range(merged_range)  # type: ignore[attr-defined] # noqa: SLF001
+        ranges.append(merged_range)
+    sheet.merged_cells = MultiCellRange(ranges)
+
+
+def _bind_hyperlinks(sheet: Worksheet, parser: WorkSheetParser, rels: RelationshipList) -> None:
+    for link in parser.hyperlinks.hyperlink:
+        if link.id:
+            link.target = rels.get(link.id).Target
+        if ":" in link.ref:
+            for row in sheet[link.ref]:
+                for cell in row:
+                    if not isinstance(cell, MergedCell):
+                        cell.hyperlink = copy(link)
+            continue
+        cell = sheet[link.ref]
+        if isinstance(cell, MergedCell):
+            merged_range = next(r for r in sheet.merged_cells.ranges if link.ref in r)
+            cell = sheet.cell(row=merged_range.min_row, column=merged_range.min_col)
+        cell.hyperlink = link
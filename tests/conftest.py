@@ -1,4 +1,5 @@
 import logging
+from collections.abc import Generator
 from os import environ
 from types import SimpleNamespace
 from uuid import uuid4
@@ -14,6 +15,8 @@ from sqlalchemy.ext.asyncio import (
 )
 from sqlalchemy_utils import create_database, database_exists, drop_database
 
+from itmo_ai_timetable.db.session_manager import SessionManager
+from itmo_ai_timetable.instrumentation import Instrumentation, get_instrumentation
 from itmo_ai_timetable.settings import Settings
 from tests.utils import make_alembic_config
 
@@ -79,7 +82,27 @@ def session_factory_async(engine_async) -> async_sessionmaker[AsyncSession]:
     return async_sessionmaker(engine_async, expire_on_commit=False)
 
 
+@pytest.fixture
+async def session_manager(_migrated_postgres) -> SessionManager:
+    """Global session manager connected to the test database, used by calls without explicit session."""
+    manager = SessionManager()
+    manager.refresh()
+    yield manager
+    await manager.engine.dispose()
+
+
 @pytest.fixture
 async def session(session_factory_async) -> AsyncSession:
     async with session_factory_async() as session:
         yield session
+
+
+@pytest.fixture
+def instrumentation() -> Generator[Instrumentation, None, None]:
+    instrumentation = get_instrumentation()
+    enabled, profile_dir = instrumentation.enabled, instrumentation.profile_dir
+    instrumentation.configure(enabled=True)
+    instrumentation.reset()
+    yield instrumentation
+    instrumentation.configure(enabled=enabled, profile_dir=profile_dir)
+    instrumentation.reset()
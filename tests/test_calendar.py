@@ -0,0 +1,218 @@
+from collections.abc import Generator
+from datetime import datetime, timedelta
+
+import pytest
+
+from benchmarks.fake_calendar import FakeCalendarServer
+from itmo_ai_timetable.db.base import Class
+from itmo_ai_timetable.instrumentation import Instrumentation
+from itmo_ai_timetable.rate_limiter import TokenBucket
+from itmo_ai_timetable.repositories.calendar import MAX_BATCH_SIZE, CalendarIdCache, CalendarRepository
+
+START = datetime(2024, 9, 2, 10, 0)  # noqa: DTZ001
+
+
+@pytest.fixture
+def server() -> Generator[FakeCalendarServer, None, None]:
+    with FakeCalendarServer() as server:
+        yield server
+
+
+@pytest.fixture
+def repository(server: FakeCalendarServer, monkeypatch: pytest.MonkeyPatch) -> CalendarRepository:
+    monkeypatch.setenv("CALENDAR_BACKOFF_FACTOR", "0")
+    return make_repository(server, CalendarIdCache(ttl=60))
+
+
+def make_repository(server: FakeCalendarServer, calendar_ids: CalendarIdCache) -> CalendarRepository:
+    return CalendarRepository(server.make_client(), TokenBucket(rate=1000, capacity=MAX_BATCH_SIZE), calendar_ids)
+
+
+def make_classes(n: int) -> list[Class]:
+    return [
+        Class(
+            id=class_id,
+            start_time=START + timedelta(days=class_id),
+            end_time=START + timedelta(days=class_id, minutes=90),
+            class_type="Лекция",
+        )
+        for class_id in range(1, n + 1)
+    ]
+
+
+def test_get_or_create_calendar(server: FakeCalendarServer, repository: CalendarRepository):
+    calendar_id = repository.get_or_create_calendar("Курс")
+
+    assert server.calendars == {"Курс": calendar_id}
+    assert repository.get_or_create_calendar("Курс") == calendar_id
+
+
+def test_get_or_create_calendar_lists_calendars_once(server: FakeCalendarServer):
+    server.calendars = {"Первый": "calendar-1", "Второй": "calendar-2"}
+    calendar_ids = CalendarIdCache(ttl=60)
+    # repositories of bot workers and cli share the cache
+    first, second = make_repository(server, calendar_ids), make_repository(server, calendar_ids)
+
+    assert first.get_or_create_calendar("Первый") == "calendar-1"
+    assert second.get_or_create_calendar("Второй") == "calendar-2"
+    created = first.get_or_create_calendar("Третий")
+    assert second.get_or_create_calendar("Третий") == created
+    assert server.calendar_list_requests == 1
+
+
+def test_calendar_id_cache_expires():
+    now = 0.0
+    calendars = [("Курс", "calendar-1")]
+    loads = 0
+
+    def load() -> list[tuple[str, str]]:
+        nonlocal loads
+        loads += 1
+        return calendars
+
+    calendar_ids = CalendarIdCache(ttl=60, clock=lambda: now)
+    assert calendar_ids.get("Курс", load) == "calendar-1"
+    calendar_ids.put("Новый", "calendar-2")
+    now = 59
+    assert calendar_ids.get("Новый", load) == "calendar-2"
+    assert loads == 1
+
+    now = 60
+    calendars = [("Курс", "calendar-3")]
+    assert calendar_ids.get("Курс", load) == "calendar-3"
+    assert calendar_ids.get("Новый", load) is None
+    assert loads == 2
+
+    calendar_ids.invalidate()
+    calendar_ids.get("Курс", load)
+    assert loads == 3
+
+
+def test_add_class_to_calendar_returns_event_id(server: FakeCalendarServer, repository: CalendarRepository):
+    event_id = repository.add_class_to_calendar("calendar", "Курс", START, START + timedelta(minutes=90))
+
+    assert list(server.events["calendar"]) == [event_id]
+
+
+def test_add_classes_to_calendar(
+    server: FakeCalendarServer,
+    repository: CalendarRepository,
+    instrumentation: Instrumentation,
+):
+    event_ids = repository.add_classes_to_calendar("calendar", "Курс", make_classes(MAX_BATCH_SIZE + 10))
+
+    assert server.http_requests == 2
+    assert instrumentation.snapshot()["counters"] == {"calendar_api_calls": 2, "calendar_batched_requests": 60}
+    assert sorted(event_ids) == list(range(1, MAX_BATCH_SIZE + 11))
+    events = server.events["calendar"]
+    assert set(event_ids.values()) == set(events)
+    assert all(events[event_ids[class_id]]["summary"] == "Курс" for class_id in event_ids)
+    assert events[event_ids[3]]["start"]["dateTime"].startswith("2024-09-05T10:00:00")
+
+
+def test_add_classes_to_calendar_skips_failed(server: FakeCalendarServer, repository: CalendarRepository):
+    server.fail_calendars = frozenset({"broken"})
+    repository.rate_limiter.rate = repository.rate_limiter.min_rate
+
+    assert repository.add_classes_to_calendar("broken", "Курс", make_classes(3)) == {}
+    assert server.events["broken"] == {}
+    assert server.http_requests == 1
+    # failed requests don't restore the rate
+    assert repository.rate_limiter.rate == repository.rate_limiter.min_rate
+
+
+def test_add_classes_to_calendar_retries_rate_limited(
+    server: FakeCalendarServer,
+    repository: CalendarRepository,
+    instrumentation: Instrumentation,
+):
+    server.rate_limited_inserts = 15
+
+    event_ids = repository.add_classes_to_calendar("calendar", "Курс", make_classes(10))
+
+    assert sorted(event_ids) == list(range(1, 11))
+    assert set(server.events["calendar"]) == set(event_ids.values())
+    # 10 limited requests, then 5, then all pass
+    assert server.http_requests == 3
+    assert instrumentation.snapshot()["counters"]["calendar_rate_limited"] == 15
+    assert repository.rate_limiter.rate < repository.rate_limiter.max_rate
+
+
+def test_add_classes_to_calendar_gives_up_after_retries(
+    server: FakeCalendarServer,
+    repository: CalendarRepository,
+    monkeypatch: pytest.MonkeyPatch,
+):
+    monkeypatch.setattr(repository.settings, "calendar_max_retries", 2)
+    server.rate_limited_inserts = 100
+
+    assert repository.add_classes_to_calendar("calendar", "Курс", make_classes(2)) == {}
+    assert server.http_requests == 3
+
+
+def test_add_classes_to_calendar_retries_rate_limited_batch(server: FakeCalendarServer, repository: CalendarRepository):
+    server.failed_batches = {0: 429}
+
+    event_ids = repository.add_classes_to_calendar("calendar", "Курс", make_classes(3))
+
+    assert sorted(event_ids) == [1, 2, 3]
+    assert set(server.events["calendar"]) == set(event_ids.values())
+    assert server.http_requests == 2
+
+
+def test_add_classes_to_calendar_keeps_responses_before_failed_batch(
+    server: FakeCalendarServer,
+    repository: CalendarRepository,
+):
+    server.failed_batches = {1: 500}
+
+    event_ids = repository.add_classes_to_calendar("calendar", "Курс", make_classes(MAX_BATCH_SIZE * 3))
+
+    # events of the first batch are returned, the third batch is not sent
+    assert sorted(event_ids) == list(range(1, MAX_BATCH_SIZE + 1))
+    assert set(server.events["calendar"]) == set(event_ids.values())
+    assert server.http_requests == 2
+
+
+def test_add_class_to_calendar_retries_rate_limited(server: FakeCalendarServer, repository: CalendarRepository):
+    server.rate_limited_inserts = 2
+
+    event_id = repository.add_class_to_calendar("calendar", "Курс", START, START + timedelta(minutes=90))
+
+    assert list(server.events["calendar"]) == [event_id]
+    assert server.http_requests == 3
+
+
+def test_delete_classes_from_calendar(server: FakeCalendarServer, repository: CalendarRepository):
+    event_ids = repository.add_classes_to_calendar("calendar", "Курс", make_classes(5))
+    requests = server.http_requests
+
+    deleted = repository.delete_classes_from_calendar("calendar", [event_ids[1], event_ids[2], "missing"])
+
+    # events already deleted from the calendar count as deleted
+    assert sorted(deleted) == sorted([event_ids[1], event_ids[2], "missing"])
+    assert server.http_requests == requests + 1
+    assert set(server.events["calendar"]) == {event_ids[i] for i in (3, 4, 5)}
+
+
+def test_update_classes_in_calendar(server: FakeCalendarServer, repository: CalendarRepository):
+    classes = make_classes(3)
+    event_ids = repository.add_classes_to_calendar("calendar", "Курс", classes)
+    for class_ in classes:
+        class_.gcal_event_id = event_ids[class_.id]
+        class_.start_time += timedelta(hours=1)
+        class_.class_type = "Экзамен"
+    del server.events["calendar"][event_ids[3]]
+    requests = server.http_requests
+
+    updated = repository.update_classes_in_calendar("calendar", "Курс", classes)
+
+    # event deleted by hand is created again with a second batch
+    assert updated[1] == event_ids[1]
+    assert updated[2] == event_ids[2]
+    assert updated[3] != event_ids[3]
+    assert server.http_requests == requests + 2
+    events = server.events["calendar"]
+    assert set(events) == set(updated.values())
+    assert all(event["description"] == "Экзамен" for event in events.values())
+    assert events[event_ids[1]]["start"]["dateTime"].startswith((START + timedelta(days=1, hours=1)).isoformat())
@@ -0,0 +1,174 @@
+import threading
+import time
+from collections.abc import Generator
+from datetime import datetime
+
+import pytest
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from benchmarks.fake_calendar import FakeCalendarServer
+from itmo_ai_timetable.calendar_sync import CalendarSync
+from itmo_ai_timetable.db.base import Class, Course, get_class_status_id
+from itmo_ai_timetable.db.session_manager import SessionManager
+from itmo_ai_timetable.rate_limiter import TokenBucket
+from itmo_ai_timetable.repositories.calendar import MAX_BATCH_SIZE, CalendarIdCache, CalendarRepository
+from itmo_ai_timetable.repositories.db import DBRepository
+from itmo_ai_timetable.schemes import ClassStatus
+from tests.test_repository import make_pairs, tzinfo
+
+COURSE_NAMES = ["Этика искусственного интеллекта", "Рекомендательные системы", "Ранжирование и матчинг"]
+
+
+@pytest.fixture
+def server() -> Generator[FakeCalendarServer, None, None]:
+    with FakeCalendarServer(latency=0.01) as server:
+        yield server
+
+
+def make_sync(server: FakeCalendarServer, rate_limiter: TokenBucket) -> CalendarSync:
+    calendar_ids = CalendarIdCache(ttl=60)
+    return CalendarSync(lambda: CalendarRepository(server.make_client(), rate_limiter, calendar_ids))
+
+
+async def test_calendar_sync(
+    session: AsyncSession,
+    session_manager: SessionManager,  # noqa: ARG001
+    server: FakeCalendarServer,
+    monkeypatch: pytest.MonkeyPatch,
+):
+    monkeypatch.setenv("DB_STREAM_CHUNK_SIZE", "10")
+    monkeypatch.setenv("CALENDAR_SYNC_WORKERS", "2")
+    await DBRepository.add_classes([p for name in COURSE_NAMES for p in make_pairs(name, 25)], session=session)
+    calendar_sync = make_sync(server, TokenBucket(rate=1000, capacity=MAX_BATCH_SIZE))
+
+    await calendar_sync.run()
+
+    # one repository per worker
+    assert len(calendar_sync._repositories) == 2
+    courses = {course.name: course.timetable_id for course in (await session.execute(select(Course))).scalars()}
+    assert courses == server.calendars
+    assert server.calendar_list_requests == 1
+    result = await session.execute(select(Course.timetable_id, Class.class_status_id, Class.gcal_event_id).join(Course))
+    rows = result.tuples().all()
+    assert len(rows) == 75
+    for timetable_id, status_id, event_id in rows:
+        assert status_id == get_class_status_id(ClassStatus.synced)
+        assert event_id in server.events[timetable_id]
+
+    # nothing left to sync
+    requests = server.http_requests
+    await calendar_sync.run()
+    assert server.http_requests == requests
+
+
+async def test_calendar_sync_propagates_changes(
+    session: AsyncSession,
+    session_manager: SessionManager,  # noqa: ARG001
+    server: FakeCalendarServer,
+):
+    pairs = make_pairs(COURSE_NAMES[0], 5)
+    await DBRepository.add_classes(pairs, session=session)
+    calendar_sync = make_sync(server, TokenBucket(rate=1000, capacity=MAX_BATCH_SIZE))
+    await calendar_sync.run()
+    result = await session.execute(select(Class.start_time, Class.gcal_event_id))
+    event_ids = dict(result.tuples().all())
+
+    moved = pairs[3].model_copy(
+        update={
+            "start_time": datetime(2023, 1, 1, 12, 0, tzinfo=tzinfo),
+            "end_time": datetime(2023, 1, 1, 13, 0, tzinfo=tzinfo),
+        },
+    )
+    added = make_pairs(COURSE_NAMES[0], 1, day=2)[0]
+    await DBRepository.add_classes([*pairs[:3], moved, added], session=session)
+    requests = server.http_requests
+    await calendar_sync.run()
+
+    # one batch of patches, one of inserts and one of deletes
+    assert server.http_requests == requests + 3
+    events = next(iter(server.events.values()))
+    assert len(events) == 5
+    assert event_ids[pairs[4].start_time] not in events
+    moved_event = events[event_ids[pairs[3].start_time]]
+    assert datetime.fromisoformat(moved_event["start"]["dateTime"]) == moved.start_time
+    result = await session.execute(select(Class.start_time, Class.class_status_id, Class.gcal_event_id))
+    statuses = {start_time: (status_id, event_id) for start_time, status_id, event_id in result.tuples()}
+    assert statuses[moved.start_time] == (get_class_status_id(ClassStatus.synced), event_ids[pairs[3].start_time])
+    assert statuses[pairs[4].start_time][0] == get_class_status_id(ClassStatus.deleted)
+    assert statuses[added.start_time][0] == get_class_status_id(ClassStatus.synced)
+
+
+async def test_calendar_sync_only_given_courses(
+    session: AsyncSession,
+    session_manager: SessionManager,  # noqa: ARG001
+    server: FakeCalendarServer,
+):
+    await DBRepository.add_classes([p for name in COURSE_NAMES for p in make_pairs(name, 5)], session=session)
+    course = (await session.execute(select(Course).where(Course.name == COURSE_NAMES[1]))).scalar_one()
+    calendar_ids = CalendarIdCache(ttl=60)
+    rate_limiter = TokenBucket(rate=1000, capacity=MAX_BATCH_SIZE)
+
+    await CalendarSync(
+        lambda: CalendarRepository(server.make_client(), rate_limiter, calendar_ids),
+        course_ids=[course.id],
+    ).run()
+
+    result = await session.execute(select(Course.name, Class.gcal_event_id).join(Course))
+    synced = {name for name, event_id in result.tuples() if event_id is not None}
+    assert synced == {COURSE_NAMES[1]}
+
+
+async def test_calendar_sync_creates_repositories_in_threads(
+    session: AsyncSession,
+    session_manager: SessionManager,  # noqa: ARG001
+    server: FakeCalendarServer,
+):
+    await DBRepository.add_classes(make_pairs(COURSE_NAMES[0], 5), session=session)
+    calendar_ids = CalendarIdCache(ttl=60)
+    rate_limiter = TokenBucket(rate=1000, capacity=MAX_BATCH_SIZE)
+    factory_threads = []
+
+    def repository_factory() -> CalendarRepository:
+        factory_threads.append(threading.current_thread())
+        return CalendarRepository(server.make_client(), rate_limiter, calendar_ids)
+
+    await CalendarSync(repository_factory).run()
+
+    # the client is built with blocking token loading, which must not stall the event loop
+    assert factory_threads
+    assert threading.main_thread() not in factory_threads
+
+
+async def test_calendar_sync_continues_after_failed_course(
+    session: AsyncSession,
+    session_manager: SessionManager,  # noqa: ARG001
+    server: FakeCalendarServer,
+):
+    await DBRepository.add_classes([p for name in COURSE_NAMES for p in make_pairs(name, 5)], session=session)
+    broken = (await session.execute(select(Course).where(Course.name == COURSE_NAMES[0]))).scalar_one()
+    broken.timetable_id = "missing"
+    await session.commit()
+    server.fail_calendars = frozenset({"missing"})
+    calendar_sync = make_sync(server, TokenBucket(rate=1000, capacity=MAX_BATCH_SIZE))
+
+    await calendar_sync.run()
+
+    result = await session.execute(select(Course.name, Class.gcal_event_id).join(Course))
+    synced = {name for name, event_id in result.tuples() if event_id is not None}
+    assert synced == set(COURSE_NAMES[1:])
+
+
+async def test_calendar_sync_is_limited_by_quota(
+    session: AsyncSession,
+    session_manager: SessionManager,  # noqa: ARG001
+    server: FakeCalendarServer,
+):
+    await DBRepository.add_classes([p for name in COURSE_NAMES for p in make_pairs(name, 10)], session=session)
+    rate_limiter = TokenBucket(rate=100, capacity=10)
+
+    start = time.perf_counter()
+    await make_sync(server, rate_limiter).run()
+
+    # calendar list, 3 calendars and 3 acl rules, then 30 events, all but 10 tokens of burst wait for refill
+    assert time.perf_counter() - start >= (7 + 30 - 10) / 100
@@ -0,0 +1,30 @@
+from itmo_ai_timetable.cell_matcher import CellMatch, CellTextMatcher
+
+KEYWORDS = ["Экзамен", "Лекция", "Зачет", "Семинар", "Защита", "Дифф. зачет"]
+
+
+def test_match_keyword_and_time():
+    matcher = CellTextMatcher(KEYWORDS)
+    assert matcher.match("C++ hard Зачет 18:30 - 20:00") == CellMatch("C++ hard", "Зачет", (18, 30), (20, 0))
+
+
+def test_match_without_keyword_and_time():
+    matcher = CellTextMatcher(KEYWORDS)
+    assert matcher.match(" UPLIFT-моделирование ") == CellMatch("UPLIFT-моделирование", None, None, None)
+
+
+def test_first_keyword_from_settings_wins():
+    matcher = CellTextMatcher(KEYWORDS)
+    assert matcher.match("Семинар Экзамен Курс") == CellMatch("Курс", "Экзамен", None, None)
+
+
+def test_text_with_colon_is_not_time():
+    matcher = CellTextMatcher(KEYWORDS)
+    match = matcher.match("Преподаватель: Иванов 17:00-19:15")
+    assert match == CellMatch("Преподаватель: Иванов", None, (17, 0), (19, 15))
+
+
+def test_numbers_in_title_are_not_time():
+    matcher = CellTextMatcher(KEYWORDS)
+    match = matcher.match("Публичные выступления 1 \\ Финансовая грамотность 3 Лекция 17:00 - 19:15")
+    assert match == CellMatch("Публичные выступления 1 \\ Финансовая грамотность 3", "Лекция", (17, 0), (19, 15))
@@ -0,0 +1,107 @@
+import asyncio
+from collections.abc import Callable, Collection
+
+import pytest
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from itmo_ai_timetable.class_listener import ClassChangeListener
+from itmo_ai_timetable.db.base import Class, Course
+from itmo_ai_timetable.db.session_manager import SessionManager
+from itmo_ai_timetable.repositories.db import DBRepository
+from tests.test_repository import make_pairs
+
+COURSE_NAMES = ["Этика искусственного интеллекта", "Рекомендательные системы", "Ранжирование и матчинг"]
+
+
+class SyncCalls:
+    """Records calls of the sync callback."""
+
+    def __init__(self) -> None:
+        self.calls: asyncio.Queue[Collection[int] | None] = asyncio.Queue()
+
+    async def __call__(self, course_ids: Collection[int] | None) -> None:
+        await self.calls.put(course_ids)
+
+    async def next(self) -> Collection[int] | None:
+        return await asyncio.wait_for(self.calls.get(), 5)
+
+
+class FakeConnection:
+    def __init__(self) -> None:
+        self.termination_listeners: list[Callable[[object], None]] = []
+        self.closed = False
+
+    def add_termination_listener(self, callback: Callable[[object], None]) -> None:
+        self.termination_listeners.append(callback)
+
+    async def add_listener(self, channel: str, callback: object) -> None:
+        pass
+
+    def is_closed(self) -> bool:
+        return self.closed
+
+    def terminate(self) -> None:
+        self.closed = True
+        for callback in self.termination_listeners:
+            callback(self)
+
+    async def close(self) -> None:
+        self.closed = True
+
+
+@pytest.fixture
+def listener_settings(monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setenv("CALENDAR_NOTIFY_DEBOUNCE", "0.2")
+    monkeypatch.setenv("CALENDAR_NOTIFY_MAX_DELAY", "1")
+    monkeypatch.setenv("CALENDAR_LISTENER_RECONNECT_DELAY", "0")
+
+
+@pytest.mark.usefixtures("listener_settings")
+async def test_listener_syncs_changed_courses(
+    session: AsyncSession,
+    session_manager: SessionManager,  # noqa: ARG001
+):
+    sync = SyncCalls()
+    listener = ClassChangeListener(sync)
+    listener.start()
+    try:
+        assert await sync.next() is None
+
+        # burst of writes of two courses is synced once
+        for name in COURSE_NAMES[:2]:
+            await DBRepository.add_classes(make_pairs(name, 5), session=session)
+        result = await session.execute(select(Course.id).where(Course.name.in_(COURSE_NAMES[:2])))
+        assert await sync.next() == set(result.scalars())
+
+        # writes of the sync itself don't wake the listener
+        result = await session.execute(select(Class.id))
+        await DBRepository.mark_classes_synced({class_id: "event" for class_id in result.scalars()}, session=session)
+        await asyncio.sleep(0.5)
+        assert sync.calls.empty()
+    finally:
+        await listener.stop()
+
+
+@pytest.mark.usefixtures("listener_settings")
+async def test_listener_syncs_all_courses_after_reconnect():
+    connections: list[FakeConnection] = []
+
+    async def connect() -> FakeConnection:
+        connections.append(FakeConnection())
+        return connections[-1]
+
+    sync = SyncCalls()
+    listener = ClassChangeListener(sync, connect)
+    listener.start()
+    try:
+        assert await sync.next() is None
+        listener._on_notification(connections[0], 1, "class_changed", "7")
+        assert await sync.next() == {7}
+
+        # notifications sent while the listener was disconnected are lost
+        connections[0].terminate()
+        assert await sync.next() is None
+        assert len(connections) == 2
+    finally:
+        await listener.stop()
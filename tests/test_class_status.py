@@ -0,0 +1,40 @@
+import pytest
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession
+
+from itmo_ai_timetable.db.base import get_class_status_id
+from itmo_ai_timetable.db.class_status import ClassStatusRegistry, get_class_status_registry
+from itmo_ai_timetable.schemes import ClassStatus
+
+
+def test_from_rows():
+    registry = ClassStatusRegistry.from_rows((get_class_status_id(status), status.value) for status in ClassStatus)
+
+    assert registry.id(ClassStatus.synced) == get_class_status_id(ClassStatus.synced)
+
+
+def test_from_rows_missing_status():
+    rows = [(get_class_status_id(status), status.value) for status in ClassStatus if status != ClassStatus.deleted]
+
+    with pytest.raises(ValueError, match="deleted not found"):
+        ClassStatusRegistry.from_rows(rows)
+
+
+def test_from_rows_wrong_id():
+    rows = [(get_class_status_id(status), status.value) for status in ClassStatus]
+    rows[0] = (100, rows[0][1])
+
+    with pytest.raises(ValueError, match="has id 100"):
+        ClassStatusRegistry.from_rows(rows)
+
+
+async def test_registry_loaded_once(engine_async: AsyncEngine, session: AsyncSession):
+    statements = []
+    event.listen(engine_async.sync_engine, "before_cursor_execute", lambda *args: statements.append(args[2]))
+
+    first = await get_class_status_registry(session)
+    second = await get_class_status_registry(session)
+
+    assert first is second
+    assert len(statements) == 1
+    assert first.id(ClassStatus.need_to_add) == get_class_status_id(ClassStatus.need_to_add)
@@ -0,0 +1,27 @@
+import json
+import os
+from pathlib import Path
+
+from itmo_ai_timetable.cleaner import CourseNameNormalizer, course_name_cleaner
+
+
+def test_course_name_cleaner():
+    assert course_name_cleaner(" Этика ИИ ") == "Этика искусственного интеллекта"
+    assert course_name_cleaner("Основы машинного обучения (ml basic)\n(LLM трек)") == (
+        "Основы машинного обучения (ml-basic)"
+    )
+    assert course_name_cleaner("C++ hard") == "C++ hard"
+
+
+def test_reload_changed_file(tmp_path: Path):
+    path = tmp_path / "aliases.json"
+    path.write_text(json.dumps({"aliases": {"Этика ИИ": "Этика"}}))
+    normalizer = CourseNameNormalizer(path)
+    assert normalizer.normalize("Этика ИИ") == "Этика"
+
+    assert not normalizer.reload()
+    path.write_text(json.dumps({"aliases": {"Этика ИИ": "Этика искусственного интеллекта"}}))
+    os.utime(path, (normalizer._mtime + 1, normalizer._mtime + 1))
+
+    assert normalizer.reload()
+    assert normalizer.normalize("Этика ИИ") == "Этика искусственного интеллекта"
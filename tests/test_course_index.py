@@ -0,0 +1,42 @@
+from itmo_ai_timetable.course_index import CourseNameIndex, same_qualifiers
+
+COURSES = [
+    "Этика искусственного интеллекта",
+    "Рекомендательные системы",
+    "Ранжирование и матчинг",
+    "Глубокие генеративные модели (Deep Generative Models)",
+]
+
+
+def test_exact_name_has_full_score():
+    index = CourseNameIndex(COURSES)
+
+    assert index.best_match("Рекомендательные системы") == ("Рекомендательные системы", 1.0)
+
+
+def test_typo_is_matched():
+    index = CourseNameIndex(COURSES)
+
+    match = index.best_match("Этика искуственного  интелекта")
+
+    assert match is not None
+    assert match.name == "Этика искусственного интеллекта"
+    assert match.score > 0.85
+
+
+def test_unrelated_name():
+    index = CourseNameIndex(COURSES)
+
+    assert index.best_match("xyz") is None
+    match = index.best_match("Физика")
+    assert match is None or match.score < 0.5
+
+
+def test_numbered_siblings_have_other_qualifiers():
+    assert same_qualifiers("Этика искуственного интеллекта", "Этика искусственного интеллекта")
+    assert same_qualifiers("Работа в удаленных командах (В 9)", "Работа в удаленных командах (в  9)")
+    assert not same_qualifiers("Работа в удаленных командах (в 19)", "Работа в удаленных командах (в 9)")
+    assert not same_qualifiers("Публичные выступления 2", "Публичные выступления 1")
+    assert not same_qualifiers("C++ Lite 2", "C++ Lite")
+    assert not same_qualifiers("Продвинутое А/B - тестирование 2", "Продвинутое А/B - тестирование")
+    assert not same_qualifiers("Курс (продвинутый)", "Курс (базовый)")
@@ -0,0 +1,73 @@
+import threading
+from collections.abc import Generator
+from http import HTTPStatus
+from http.server import BaseHTTPRequestHandler, HTTPServer
+
+import pytest
+
+from itmo_ai_timetable.downloader import SpreadsheetDownloader
+
+CONTENT = b"xlsx bytes"
+ETAG = '"v1"'
+
+
+class SpreadsheetHandler(BaseHTTPRequestHandler):
+    requests_log: list[dict[str, str]] = []  # noqa: RUF012
+    failures_left = 0
+
+    def do_GET(self) -> None:  # noqa: N802
+        SpreadsheetHandler.requests_log.append(dict(self.headers))
+        if SpreadsheetHandler.failures_left > 0:
+            SpreadsheetHandler.failures_left -= 1
+            self.send_response(HTTPStatus.SERVICE_UNAVAILABLE)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+        if self.headers.get("If-None-Match") == ETAG:
+            self.send_response(HTTPStatus.NOT_MODIFIED)
+            self.end_headers()
+            return
+        self.send_response(HTTPStatus.OK)
+        self.send_header("ETag", ETAG)
+        self.send_header("Content-Length", str(len(CONTENT)))
+        self.end_headers()
+        self.wfile.write(CONTENT)
+
+    def log_message(self, *args: object) -> None:
+        pass
+
+
+@pytest.fixture
+def server_url() -> Generator[str, None, None]:
+    SpreadsheetHandler.requests_log = []
+    SpreadsheetHandler.failures_left = 0
+    server = HTTPServer(("127.0.0.1", 0), SpreadsheetHandler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{server.server_port}/export?format=xlsx"
+    server.shutdown()
+    server.server_close()
+
+
+def test_conditional_download(server_url: str):
+    downloader = SpreadsheetDownloader()
+
+    first = downloader.download(server_url)
+    second = downloader.download(server_url)
+
+    assert first.content == CONTENT
+    assert not first.not_modified
+    assert second.content == CONTENT
+    assert second.not_modified
+    assert "If-None-Match" not in SpreadsheetHandler.requests_log[0]
+    assert SpreadsheetHandler.requests_log[1]["If-None-Match"] == ETAG
+
+
+def test_retries_server_errors(server_url: str):
+    SpreadsheetHandler.failures_left = 2
+    downloader = SpreadsheetDownloader()
+
+    result = downloader.download(server_url)
+
+    assert result.content == CONTENT
+    assert len(SpreadsheetHandler.requests_log) == 3
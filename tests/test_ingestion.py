@@ -0,0 +1,88 @@
+from datetime import datetime
+from pathlib import Path
+
+import pytest
+from dateutil import tz
+from openpyxl import Workbook
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from itmo_ai_timetable.db.base import Class, ClassStatusTable, Course
+from itmo_ai_timetable.ingestion import ScheduleIngestion
+from itmo_ai_timetable.parse_cache import ParseCache
+from itmo_ai_timetable.repositories.db import LIVE_STATUSES
+
+timezone = tz.gettz("Europe/Moscow")
+
+
+def save_timetable(path: Path, course_name: str) -> str:
+    wb = Workbook()
+    sheet = wb.active
+    now = datetime.now(tz=timezone)
+    sheet.cell(row=2, column=2, value=datetime(now.year, now.month, now.day))  # noqa: DTZ001
+    sheet.merge_cells(start_row=2, start_column=2, end_row=3, end_column=2)
+    sheet.cell(row=2, column=5, value="10:00-11:30")
+    sheet.cell(row=2, column=6, value=course_name)
+    sheet.cell(row=3, column=5, value="11:40-13:10")
+    sheet.cell(row=3, column=7, value=f"{course_name}\nЛекция")
+    wb.save(path)
+    return str(path)
+
+
+async def test_ingests_all_sources(tmp_path: Path):
+    sources = [
+        (save_timetable(tmp_path / "course_1.xlsx", "Этика искусственного интеллекта"), "Sheet"),
+        (save_timetable(tmp_path / "course_2.xlsx", "Рекомендательные системы"), "Sheet"),
+    ]
+    ingestion = ScheduleIngestion(ParseCache(tmp_path / "cache"))
+
+    sheets = await ingestion.run(sources, save=False)
+
+    assert [sheet.from_cache for sheet in sheets] == [False, False]
+    assert [{pair.name for pair in sheet.pairs} for sheet in sheets] == [
+        {"Этика искусственного интеллекта"},
+        {"Рекомендательные системы"},
+    ]
+    assert [pair.pair_type for pair in sheets[0].pairs] == [None, "Лекция"]
+
+
+async def test_uses_parse_cache(tmp_path: Path):
+    sources = [(save_timetable(tmp_path / "course_1.xlsx", "Этика искусственного интеллекта"), "Sheet")]
+    parse_cache = ParseCache(tmp_path / "cache")
+    ingestion = ScheduleIngestion(parse_cache)
+    sheets = await ingestion.run(sources, save=False)
+    parse_cache.put(sheets[0].cache_key, sheets[0].pairs)
+
+    cached_sheets = await ingestion.run(sources, save=False)
+
+    assert cached_sheets[0].from_cache
+    assert cached_sheets[0].pairs == sheets[0].pairs
+
+
+@pytest.mark.usefixtures("session_manager")
+async def test_reverted_sheet_is_saved_again(session: AsyncSession, tmp_path: Path):
+    path = tmp_path / "timetable.xlsx"
+    sources = [(str(path), "Sheet")]
+    ingestion = ScheduleIngestion(ParseCache(tmp_path / "cache"))
+    save_timetable(path, "Этика искусственного интеллекта")
+    version_a = path.read_bytes()
+    await ingestion.run(sources)
+    save_timetable(path, "Рекомендательные системы")
+    await ingestion.run(sources)
+
+    path.write_bytes(version_a)
+    sheets = await ingestion.run(sources)
+
+    # version A is found in the parse cache, but the database holds version B
+    assert sheets[0].from_cache
+    assert not sheets[0].unchanged
+    result = await session.execute(
+        select(Course.name)
+        .join(Class)
+        .join(ClassStatusTable)
+        .where(ClassStatusTable.name.in_([status.value for status in LIVE_STATUSES])),
+    )
+    assert set(result.scalars()) == {"Этика искусственного интеллекта"}
+
+    sheets = await ingestion.run(sources)
+    assert sheets[0].unchanged
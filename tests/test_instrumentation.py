@@ -0,0 +1,131 @@
+import asyncio
+from collections.abc import AsyncIterator
+from pathlib import Path
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+from benchmarks.timetable_generator import TimetableSize, generate_timetable
+from itmo_ai_timetable.instrumentation import (
+    Instrumentation,
+    count_sql_statements,
+    instrumented,
+)
+from itmo_ai_timetable.schedule_parser import ScheduleParser
+
+
+def test_disabled_collects_nothing():
+    instrumentation = Instrumentation()
+
+    with instrumentation.span("stage"):
+        instrumentation.count("items")
+
+    assert instrumentation.snapshot() == {"spans": {}, "counters": {}, "queries": {}}
+
+
+def test_spans_and_counters():
+    instrumentation = Instrumentation(enabled=True)
+
+    for _ in range(2):
+        with instrumentation.span("stage"):
+            instrumentation.count("items", 3)
+
+    assert instrumentation.spans["stage"].calls == 2
+    assert instrumentation.counters["items"] == 6
+    assert "stage" in instrumentation.report()
+
+
+def test_merge_worker_snapshot():
+    worker = Instrumentation(enabled=True)
+    with worker.span("stage"):
+        worker.count("items")
+    instrumentation = Instrumentation(enabled=True)
+    with instrumentation.span("stage"):
+        pass
+
+    instrumentation.merge(worker.snapshot())
+
+    assert instrumentation.spans["stage"].calls == 2
+    assert instrumentation.counters["items"] == 1
+
+
+async def test_instrumented_async_function(instrumentation: Instrumentation):
+    @instrumented("job")
+    async def job() -> int:
+        return 1
+
+    assert await job() == 1
+    assert instrumentation.spans["job"].calls == 1
+
+
+async def test_instrumented_async_generator(instrumentation: Instrumentation):
+    @instrumented("stream")
+    async def stream() -> AsyncIterator[int]:
+        for i in range(3):
+            yield i
+
+    assert [i async for i in stream()] == [0, 1, 2]
+    assert instrumentation.spans["stream"].calls == 1
+
+
+async def test_instrumented_async_generator_closed_in_another_task(instrumentation: Instrumentation):
+    @instrumented("stream")
+    async def stream() -> AsyncIterator[int]:
+        for i in range(3):
+            instrumentation.record_query(0.1)
+            yield i
+
+    iterator = stream()
+    assert await iterator.__anext__() == 0
+    # statements of the consumer between items are not attributed to the stream
+    instrumentation.record_query(1.0)
+    await asyncio.create_task(iterator.aclose())
+
+    assert instrumentation.spans["stream"].calls == 1
+    assert instrumentation.queries["stream"].calls == 1
+
+
+def test_profile_dump(tmp_path: Path):
+    instrumentation = Instrumentation(profile_dir=tmp_path)
+
+    with instrumentation.profile("run"):
+        sum(range(100))
+
+    assert len(list(tmp_path.glob("run-*.prof"))) == 1
+
+
+def test_parser_counters(tmp_path: Path, instrumentation: Instrumentation):
+    path = tmp_path / "timetable.xlsx"
+    classes = generate_timetable(path, TimetableSize(days=3))
+
+    ScheduleParser(str(path), "Sheet").parse()
+
+    assert instrumentation.counters["pairs_emitted"] == classes
+    assert instrumentation.counters["cells_visited"] > 0
+    assert {"parser.load_sheet", "parser.walk_cells", "parser.clean_course_name"} <= instrumentation.spans.keys()
+
+
+async def test_count_sql_statements(engine_async: AsyncEngine, instrumentation: Instrumentation):
+    count_sql_statements(engine_async.sync_engine)
+
+    async with engine_async.connect() as connection:
+        await connection.execute(text("SELECT 1"))
+        await connection.execute(text("SELECT 2"))
+
+    assert instrumentation.counters["sql_statements"] == 2
+
+
+async def test_sql_statements_per_span(engine_async: AsyncEngine, instrumentation: Instrumentation):
+    count_sql_statements(engine_async.sync_engine)
+
+    async with engine_async.connect() as connection:
+        with instrumentation.span("job"):
+            await connection.execute(text("SELECT 1"))
+            with instrumentation.span("method"):
+                await connection.execute(text("SELECT 2"))
+        await connection.execute(text("SELECT 3"))
+
+    assert instrumentation.queries["job"].calls == 2
+    assert instrumentation.queries["method"].calls == 1
+    assert instrumentation.counters["sql_statements"] == 3
+    assert "method: 1 SQL statements" in instrumentation.report()
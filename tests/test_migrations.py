@@ -4,6 +4,7 @@ import pytest
 from alembic.command import downgrade, upgrade
 from alembic.config import Config
 from alembic.script import Script, ScriptDirectory
+from sqlalchemy import create_engine, text
 
 from tests.utils import make_alembic_config
 
@@ -29,3 +30,41 @@ def test_migrations_stairway(revision: Script, alembic_config: Config):
     # We need -1 for downgrading first migration (its down_revision is None)
     downgrade(alembic_config, revision.down_revision or "-1")
     upgrade(alembic_config, revision.revision)
+
+
+def test_lookup_indexes_merge_duplicates(postgres: str, alembic_config: Config):
+    upgrade(alembic_config, "c35b1b08a8b9")
+    engine = create_engine(postgres.replace("postgresql+asyncpg://", "postgresql://"))
+    with engine.begin() as connection:
+        courses = connection.execute(
+            text("INSERT INTO course (name, timetable_id) VALUES ('Дубль', NULL), ('Дубль', 'calendar') RETURNING id"),
+        ).scalars()
+        first_course, second_course = sorted(courses)
+        users = connection.execute(
+            text(
+                'INSERT INTO "user" (user_real_name, user_tg_id, studying_course) '
+                "VALUES ('Студент', NULL, 1), ('Студент', 42, 1), (NULL, NULL, 1), (NULL, NULL, 1) RETURNING id",
+            ),
+        ).scalars()
+        first_user, second_user, *_ = sorted(users)
+        connection.execute(
+            text("INSERT INTO user_course (user_id, course_id) VALUES (:u1, :c1), (:u2, :c1), (:u2, :c2)"),
+            {"u1": first_user, "u2": second_user, "c1": first_course, "c2": second_course},
+        )
+        connection.execute(
+            text("INSERT INTO class (course_id, start_time, end_time, class_status_id) VALUES (:c, now(), now(), 1)"),
+            {"c": second_course},
+        )
+
+    upgrade(alembic_config, "5f2a9c7e1d3b")
+
+    with engine.connect() as connection:
+        courses = connection.execute(text("SELECT id, timetable_id FROM course WHERE name = 'Дубль'")).all()
+        assert courses == [(first_course, "calendar")]
+        assert connection.execute(text("SELECT course_id FROM class")).scalars().all() == [first_course]
+        users = connection.execute(text('SELECT user_real_name, user_tg_id FROM "user"')).all()
+        # users without a name are not duplicates for the unique index
+        assert sorted(users, key=str) == sorted([("Студент", 42), (None, None), (None, None)], key=str)
+        enrolments = connection.execute(text("SELECT user_id, course_id FROM user_course")).all()
+        assert enrolments == [(first_user, first_course)]
+    engine.dispose()
@@ -0,0 +1,79 @@
+from datetime import datetime
+
+from dateutil import tz
+
+from itmo_ai_timetable.pair_batch import PairBatch, diff_classes, to_epoch
+from itmo_ai_timetable.schemes import Pair
+
+tzinfo = tz.gettz("Europe/Moscow")
+
+PAIRS = [
+    Pair(
+        name="Этика искусственного интеллекта",
+        start_time=datetime(2024, 9, 2, 10, 0, tzinfo=tzinfo),
+        end_time=datetime(2024, 9, 2, 11, 30, tzinfo=tzinfo),
+        pair_type="Лекция",
+        link="https://example.com",
+    ),
+    Pair(
+        name="C++ hard",
+        start_time=datetime(2024, 9, 2, 18, 30, tzinfo=tzinfo),
+        end_time=datetime(2024, 9, 2, 20, 0, tzinfo=tzinfo),
+    ),
+    Pair(
+        name="Этика искусственного интеллекта",
+        start_time=datetime(2024, 9, 9, 10, 0, tzinfo=tzinfo),
+        end_time=datetime(2024, 9, 9, 11, 30, tzinfo=tzinfo),
+        pair_type="Лекция",
+    ),
+]
+
+
+def test_roundtrip():
+    batch = PairBatch.from_pairs(PAIRS)
+
+    assert len(batch) == 3
+    assert batch.to_pairs() == PAIRS
+    assert batch.names == ["Этика искусственного интеллекта", "C++ hard"]
+    assert batch.pair_types == [None, "Лекция"]
+
+
+def test_by_course():
+    batch = PairBatch.from_pairs(PAIRS)
+
+    courses = batch.by_course()
+
+    assert list(courses) == ["Этика искусственного интеллекта", "C++ hard"]
+    assert list(courses["Этика искусственного интеллекта"]) == [0, 2]
+    assert courses["C++ hard"].pairs() == [PAIRS[1]]
+    assert courses["C++ hard"].time_keys() == {
+        (int(PAIRS[1].start_time.timestamp()), int(PAIRS[1].end_time.timestamp())),
+    }
+
+
+def key(day: int, hour: int) -> tuple[int, int]:
+    start = datetime(2024, 9, day, hour, 0, tzinfo=tzinfo)
+    return to_epoch(start), to_epoch(start.replace(hour=hour + 1))
+
+
+def test_diff_classes():
+    old = {key(2, 10): "Лекция", key(2, 12): None, key(3, 10): None, key(4, 10): None}
+    new = {key(2, 10): "Семинар", key(2, 14): None, key(5, 10): None, key(4, 10): None}
+
+    diff = diff_classes(old, new, tzinfo)
+
+    # type of the first class changed, class moved within a day is changed, class moved to another day is re-created
+    assert diff.changed == [(key(2, 10), key(2, 10)), (key(2, 12), key(2, 14))]
+    assert diff.added == [key(5, 10)]
+    assert diff.removed == [key(3, 10)]
+
+
+def test_diff_classes_moved_in_time_order():
+    old = {key(2, 12): None, key(2, 10): None}
+    new = {key(2, 15): None, key(2, 11): None, key(2, 17): None}
+
+    diff = diff_classes(old, new, tzinfo)
+
+    assert diff.changed == [(key(2, 10), key(2, 11)), (key(2, 12), key(2, 15))]
+    assert diff.added == [key(2, 17)]
+    assert diff.removed == []
@@ -0,0 +1,67 @@
+import os
+from datetime import datetime
+from pathlib import Path
+
+from dateutil import tz
+
+from itmo_ai_timetable.parse_cache import ParseCache
+from itmo_ai_timetable.schemes import Pair
+
+tzinfo = tz.gettz("Europe/Moscow")
+
+
+def make_pairs(name: str) -> list[Pair]:
+    return [
+        Pair(
+            name=name,
+            start_time=datetime(2024, 9, 2, 10, 0, tzinfo=tzinfo),
+            end_time=datetime(2024, 9, 2, 11, 30, tzinfo=tzinfo),
+            pair_type="Лекция",
+            link="https://example.com",
+        ),
+    ]
+
+
+def test_roundtrip(tmp_path: Path):
+    cache = ParseCache(tmp_path)
+    key = cache.make_key(b"content", "Расписание")
+    assert cache.get(key) is None
+
+    pairs = make_pairs("Этика искусственного интеллекта")
+    cache.put(key, pairs)
+
+    assert cache.get(key) == pairs
+    assert (cache.hits, cache.misses) == (1, 1)
+
+
+def test_key_depends_on_content_and_sheet(tmp_path: Path):
+    cache = ParseCache(tmp_path)
+    key = cache.make_key(b"content", "Расписание")
+    assert key == cache.make_key(b"content", "Расписание")
+    assert key != cache.make_key(b"other content", "Расписание")
+    assert key != cache.make_key(b"content", "Расписание 2")
+
+    cache.settings.timetable_len += 1
+    assert key != cache.make_key(b"content", "Расписание")
+
+
+def test_evicts_least_recently_used(tmp_path: Path):
+    cache = ParseCache(tmp_path)
+    for i in range(2):
+        cache.put(str(i), make_pairs(f"Course {i}"))
+        os.utime(cache._path(str(i)), (i, i))
+    entry_size = cache._path("0").stat().st_size
+
+    cache.max_bytes = 2 * entry_size
+    assert cache.get("0") is not None  # "1" becomes the least recently used
+    cache.put("2", make_pairs("Course 2"))
+
+    assert sorted(p.stem for p in tmp_path.glob("*.json")) == ["0", "2"]
+
+
+def test_drops_corrupted_entry(tmp_path: Path):
+    cache = ParseCache(tmp_path)
+    (tmp_path / "broken.json").write_text("not json")
+
+    assert cache.get("broken") is None
+    assert not (tmp_path / "broken.json").exists()
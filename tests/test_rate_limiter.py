@@ -0,0 +1,63 @@
+import pytest
+
+from itmo_ai_timetable.rate_limiter import TokenBucket
+
+
+class FakeClock:
+    def __init__(self) -> None:
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+    def sleep(self, seconds: float) -> None:
+        self.now += seconds
+
+
+@pytest.fixture
+def clock() -> FakeClock:
+    return FakeClock()
+
+
+def test_acquire_within_capacity(clock: FakeClock):
+    bucket = TokenBucket(rate=10, capacity=50, clock=clock, sleep=clock.sleep)
+
+    assert bucket.acquire(50) == 0
+    assert bucket.acquire(5) == pytest.approx(0.5)
+    assert clock.now == pytest.approx(0.5)
+
+
+def test_acquire_more_than_capacity_waits_for_full_bucket(clock: FakeClock):
+    bucket = TokenBucket(rate=10, capacity=50, clock=clock, sleep=clock.sleep)
+    bucket.acquire(50)
+
+    assert bucket.acquire(80) == pytest.approx(5)
+
+
+def test_backoff_pauses_and_slows_down(clock: FakeClock):
+    bucket = TokenBucket(rate=10, capacity=10, clock=clock, sleep=clock.sleep)
+
+    bucket.backoff(2)
+
+    assert bucket.rate == 5
+    # no tokens are refilled during the pause, then 5 tokens per second
+    assert bucket.acquire(5) == pytest.approx(3)
+
+
+def test_backoff_keeps_min_rate(clock: FakeClock):
+    bucket = TokenBucket(rate=2, capacity=10, min_rate=1, clock=clock, sleep=clock.sleep)
+
+    for _ in range(5):
+        bucket.backoff(0)
+
+    assert bucket.rate == 1
+
+
+def test_succeeded_restores_rate(clock: FakeClock):
+    bucket = TokenBucket(rate=10, capacity=10, clock=clock, sleep=clock.sleep)
+    bucket.backoff(0)
+
+    bucket.succeeded(10)
+    assert bucket.rate == pytest.approx(6)
+    bucket.succeeded(1000)
+    assert bucket.rate == 10
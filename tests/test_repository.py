@@ -1,12 +1,16 @@
 from datetime import datetime
 
+import pytest
 from dateutil import tz
-from sqlalchemy import select
+from sqlalchemy import select, update
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from itmo_ai_timetable.db.base import Class, ClassStatusTable, Course
+from itmo_ai_timetable import bot
+from itmo_ai_timetable.db.base import Class, ClassStatusTable, Course, User, UserCourse, get_class_status_id
+from itmo_ai_timetable.db.session_manager import SessionManager
 from itmo_ai_timetable.repositories.db import DBRepository
-from itmo_ai_timetable.schemes import ClassStatus, Pair
+from itmo_ai_timetable.schemes import ClassStatus, Pair, ScheduleDelta
+from tests.utils import assert_max_queries
 
 tzinfo = tz.gettz("Europe/Moscow")
 
@@ -209,22 +213,22 @@ async def test_add_classes_update_existing(session: AsyncSession):
     assert class_obj is not None
     assert class_obj.start_time == start_time
     assert class_obj.end_time == end_time
-    assert class_obj.class_status_id == synced_status.id
+    assert class_obj.class_type == "Lab"
+    assert class_obj.class_status_id == get_class_status_id(ClassStatus.need_to_update)
 
 
-async def test_add_classes_delete_existing(session: AsyncSession):
+async def test_add_classes_move_existing(session: AsyncSession):
     course = Course(name="Biology")
     session.add(course)
     await session.commit()
     synced_status = await DBRepository.get_class_status_by_name(ClassStatus.synced, session=session)
-    added_status = await DBRepository.get_class_status_by_name(ClassStatus.need_to_add, session=session)
-    deleted_status = await DBRepository.get_class_status_by_name(ClassStatus.need_to_delete, session=session)
 
     existing_class = Class(
         course_id=course.id,
         start_time=datetime(2023, 1, 1, 15, 0, tzinfo=tzinfo),
         end_time=datetime(2023, 1, 1, 16, 30, tzinfo=tzinfo),
         class_status_id=synced_status.id,
+        gcal_event_id="event",
     )
     session.add(existing_class)
     await session.commit()
@@ -241,15 +245,61 @@ async def test_add_classes_delete_existing(session: AsyncSession):
 
     await DBRepository.add_classes(classes, session=session)
 
+    # class moved within a day keeps its calendar event to patch it
     result = await session.execute(select(Class).where(Class.course_id == course.id))
-    classes = result.scalars().all()
-    assert len(classes) == 2
+    class_obj = result.scalar_one()
+    assert class_obj.start_time == datetime(2023, 1, 1, 16, 0, tzinfo=tzinfo)
+    assert class_obj.end_time == datetime(2023, 1, 1, 17, 30, tzinfo=tzinfo)
+    assert class_obj.gcal_event_id == "event"
+    assert class_obj.class_status_id == get_class_status_id(ClassStatus.need_to_update)
 
-    deleted_class = next(c for c in classes if c.start_time == datetime(2023, 1, 1, 15, 0, tzinfo=tzinfo))
-    assert deleted_class.class_status_id == deleted_status.id
 
-    new_class = next(c for c in classes if c.start_time == datetime(2023, 1, 1, 16, 0, tzinfo=tzinfo))
-    assert new_class.class_status_id == added_status.id
+async def test_add_classes_delete_existing(session: AsyncSession):
+    course = Course(name="Biology")
+    session.add(course)
+    await session.commit()
+    synced_status = await DBRepository.get_class_status_by_name(ClassStatus.synced, session=session)
+    added_status = await DBRepository.get_class_status_by_name(ClassStatus.need_to_add, session=session)
+    deleted_status = await DBRepository.get_class_status_by_name(ClassStatus.need_to_delete, session=session)
+
+    session.add_all(
+        [
+            Class(
+                course_id=course.id,
+                start_time=datetime(2023, 1, 1, 15, 0, tzinfo=tzinfo),
+                end_time=datetime(2023, 1, 1, 16, 30, tzinfo=tzinfo),
+                class_status_id=synced_status.id,
+            ),
+            Class(
+                course_id=course.id,
+                start_time=datetime(2023, 1, 3, 15, 0, tzinfo=tzinfo),
+                end_time=datetime(2023, 1, 3, 16, 30, tzinfo=tzinfo),
+                class_status_id=added_status.id,
+            ),
+        ],
+    )
+    await session.commit()
+
+    classes = [
+        Pair(
+            name="Biology",
+            start_time=datetime(2023, 1, 2, 16, 0, tzinfo=tzinfo),
+            end_time=datetime(2023, 1, 2, 17, 30, tzinfo=tzinfo),
+            pair_type="Seminar",
+            link=None,
+        ),
+    ]
+
+    await DBRepository.add_classes(classes, session=session)
+
+    result = await session.execute(select(Class).where(Class.course_id == course.id).order_by(Class.start_time))
+    classes = result.scalars().all()
+    # class moved to another day is deleted and created, class not sent to calendar yet is deleted right away
+    assert [c.class_status_id for c in classes] == [
+        deleted_status.id,
+        added_status.id,
+        get_class_status_id(ClassStatus.deleted),
+    ]
 
 
 async def test_add_classes_multiple_courses(session: AsyncSession):
@@ -276,3 +326,262 @@ async def test_add_classes_multiple_courses(session: AsyncSession):
     result = await session.execute(select(Class))
     classes = result.scalars().all()
     assert len(classes) == 3
+
+
+async def test_apply_schedule_delta(session: AsyncSession):
+    course = Course(name="Geography")
+    session.add(course)
+    await session.commit()
+    synced_status = await DBRepository.get_class_status_by_name(ClassStatus.synced, session=session)
+    deleted_status = await DBRepository.get_class_status_by_name(ClassStatus.need_to_delete, session=session)
+
+    removed = Pair(
+        name="Geography",
+        start_time=datetime(2023, 1, 1, 9, 0, tzinfo=tzinfo),
+        end_time=datetime(2023, 1, 1, 10, 30, tzinfo=tzinfo),
+    )
+    changed = Pair(
+        name="Geography",
+        start_time=datetime(2023, 1, 2, 9, 0, tzinfo=tzinfo),
+        end_time=datetime(2023, 1, 2, 10, 30, tzinfo=tzinfo),
+        pair_type="Экзамен",
+    )
+    added = Pair(
+        name="Geography",
+        start_time=datetime(2023, 1, 3, 9, 0, tzinfo=tzinfo),
+        end_time=datetime(2023, 1, 3, 10, 30, tzinfo=tzinfo),
+    )
+    session.add_all(
+        [
+            Class(course_id=course.id, start_time=p.start_time, end_time=p.end_time, class_status_id=synced_status.id)
+            for p in [removed, changed]
+        ],
+    )
+    await session.commit()
+
+    not_found = await DBRepository.apply_schedule_delta(
+        ScheduleDelta(
+            added=[added, added.model_copy(update={"name": "Unknown course"})],
+            removed=[removed],
+            changed=[changed],
+        ),
+        session=session,
+    )
+
+    assert not_found == ["Unknown course"]
+    result = await session.execute(select(Class).where(Class.course_id == course.id).order_by(Class.start_time))
+    classes = result.scalars().all()
+    assert [c.class_status_id for c in classes] == [
+        deleted_status.id,
+        get_class_status_id(ClassStatus.need_to_update),
+        get_class_status_id(ClassStatus.need_to_add),
+    ]
+    assert classes[1].class_type == "Экзамен"
+
+
+async def test_add_classes_misspelled_course(session: AsyncSession):
+    classes = [
+        Pair(
+            name="Этика искуственного интеллекта",
+            start_time=datetime(2023, 1, 1, 9, 0, tzinfo=tzinfo),
+            end_time=datetime(2023, 1, 1, 10, 30, tzinfo=tzinfo),
+        ),
+        Pair(
+            name="Совсем другой курс",
+            start_time=datetime(2023, 1, 1, 11, 0, tzinfo=tzinfo),
+            end_time=datetime(2023, 1, 1, 12, 30, tzinfo=tzinfo),
+        ),
+    ]
+
+    not_found = await DBRepository.add_classes(classes, session=session)
+
+    assert not_found == ["Совсем другой курс"]
+    result = await session.execute(
+        select(Class).join(Course).where(Course.name == "Этика искусственного интеллекта"),
+    )
+    assert len(result.scalars().all()) == 1
+
+
+async def test_add_classes_numbered_sibling_course(session: AsyncSession):
+    session.add(Course(name="Публичные выступления 1"))
+    await session.commit()
+    siblings = [
+        "Работа в удаленных командах (в 19)",
+        "Публичные выступления 2",
+        "C++ Lite 2",
+        "Продвинутое А/B - тестирование 2",
+    ]
+    classes = [
+        Pair(
+            name=name,
+            start_time=datetime(2023, 1, 1, 9 + i, 0, tzinfo=tzinfo),
+            end_time=datetime(2023, 1, 1, 10 + i, 0, tzinfo=tzinfo),
+        )
+        for i, name in enumerate(siblings)
+    ]
+
+    # similar names of other courses of a series are not saved to a sibling, they are only suggested
+    not_found = await DBRepository.add_classes(classes, session=session)
+
+    assert sorted(not_found) == sorted(siblings)
+    assert (await session.execute(select(Class))).scalars().all() == []
+    suggestions = await DBRepository.suggest_courses(siblings, session=session)
+    assert suggestions["Публичные выступления 2"] == "Публичные выступления 1"
+    assert suggestions["C++ Lite 2"] == "C++ Lite"
+
+
+async def test_create_matching(session: AsyncSession):
+    await DBRepository.create_matching(
+        {
+            "Иванов Иван": ["Этика искусственного интеллекта", "Рекомендательные системы"],
+            "Петров Петр": ["Рекомендательные системы"],
+        },
+        2,
+        session=session,
+    )
+    await DBRepository.create_matching(
+        {"Иванов Иван": ["Ранжирование и матчинг", "Рекомендательные системы"]},
+        2,
+        session=session,
+    )
+
+    result = await session.execute(
+        select(User.user_real_name, Course.name).join(UserCourse, UserCourse.user_id == User.id).join(Course),
+    )
+    assert sorted(result.tuples().all()) == [
+        ("Иванов Иван", "Ранжирование и матчинг"),
+        ("Иванов Иван", "Рекомендательные системы"),
+        ("Петров Петр", "Рекомендательные системы"),
+    ]
+    result = await session.execute(select(User).where(User.studying_course == 2))
+    assert len(result.scalars().all()) == 2
+
+
+async def test_create_matching_clears_deselected_student(session: AsyncSession):
+    await DBRepository.create_matching(
+        {"Иванов Иван": ["Этика искусственного интеллекта"], "Петров Петр": ["Рекомендательные системы"]},
+        1,
+        session=session,
+    )
+    # Иванов Иван deselected everything
+    await DBRepository.create_matching(
+        {"Иванов Иван": [], "Петров Петр": ["Рекомендательные системы"]},
+        1,
+        session=session,
+    )
+
+    result = await session.execute(
+        select(User.user_real_name, Course.name).join(UserCourse, UserCourse.user_id == User.id).join(Course),
+    )
+    assert result.tuples().all() == [("Петров Петр", "Рекомендательные системы")]
+
+
+async def test_create_matching_course_not_found(session: AsyncSession):
+    with pytest.raises(ValueError, match="Unknown course"):
+        await DBRepository.create_matching({"Иванов Иван": ["Unknown course"]}, 1, session=session)
+
+    result = await session.execute(select(User))
+    assert result.scalars().all() == []
+
+
+async def test_stream_courses(session: AsyncSession):
+    courses = [course async for course in DBRepository.stream_courses(session=session)]
+
+    result = await session.execute(select(Course))
+    assert {course.id for course in courses} == {course.id for course in result.scalars()}
+
+
+async def test_stream_unsynced_classes_for_course(session: AsyncSession, monkeypatch: pytest.MonkeyPatch):
+    monkeypatch.setenv("DB_STREAM_CHUNK_SIZE", "2")
+    course = Course(name="Streaming")
+    session.add(course)
+    await session.flush()
+    session.add_all(
+        Class(
+            course_id=course.id,
+            start_time=datetime(2023, 1, 1, 9 + i, 0, tzinfo=tzinfo),
+            end_time=datetime(2023, 1, 1, 10 + i, 0, tzinfo=tzinfo),
+        )
+        for i in range(5)
+    )
+    await session.commit()
+
+    chunk_sizes = []
+    async for classes in DBRepository.stream_unsynced_classes_for_course(course, session=session):
+        chunk_sizes.append(len(classes))
+        await DBRepository.mark_classes_synced({c.id: f"event-{c.id}" for c in classes}, commit=False, session=session)
+    await session.commit()
+
+    assert chunk_sizes == [2, 2, 1]
+    assert await DBRepository.get_unsynced_classes_for_course(course, session=session) == []
+    result = await session.execute(select(Class.id, Class.gcal_event_id).where(Class.course_id == course.id))
+    assert all(event_id == f"event-{class_id}" for class_id, event_id in result.tuples())
+
+
+def make_pairs(course_name: str, count: int, day: int = 1) -> list[Pair]:
+    return [
+        Pair(
+            name=course_name,
+            start_time=datetime(2023, 1, day, 9, i, tzinfo=tzinfo),
+            end_time=datetime(2023, 1, day, 10, i, tzinfo=tzinfo),
+        )
+        for i in range(count)
+    ]
+
+
+async def test_add_classes_query_budget(session: AsyncSession):
+    course_names = ["Этика искусственного интеллекта", "Рекомендательные системы", "Ранжирование и матчинг"]
+    await DBRepository.add_classes([p for name in course_names for p in make_pairs(name, 20)], session=session)
+    await session.execute(update(Class).values(class_status_id=get_class_status_id(ClassStatus.synced)))
+    await session.commit()
+
+    # courses, synced classes, insert and status update regardless of number of courses and classes
+    with assert_max_queries(4):
+        await DBRepository.add_classes([p for name in course_names for p in make_pairs(name, 30, 2)], session=session)
+
+
+async def test_create_matching_query_budget(session: AsyncSession):
+    courses = ["Этика искусственного интеллекта", "Рекомендательные системы", "Ранжирование и матчинг"]
+    await DBRepository.create_matching({f"Студент {i}": courses[:2] for i in range(20)}, 1, session=session)
+
+    # courses, users upsert, existing enrolments, insert, delete
+    with assert_max_queries(5):
+        await DBRepository.create_matching({f"Студент {i}": courses[1:] for i in range(40)}, 1, session=session)
+
+
+class FakeCalendarRepository:
+    def __init__(self) -> None:
+        self.events = 0
+
+    def get_or_create_calendar(self, calendar_name: str) -> str:
+        return f"calendar-{calendar_name}"
+
+    def add_class_to_calendar(self, calendar_id: str, class_name: str, start: datetime, end: datetime) -> str:  # noqa: ARG002
+        self.events += 1
+        return f"event-{self.events}"
+
+    def add_classes_to_calendar(self, calendar_id: str, class_name: str, classes: list[Class]) -> dict[int, str]:
+        return {
+            class_.id: self.add_class_to_calendar(calendar_id, class_name, class_.start_time, class_.end_time)
+            for class_ in classes
+        }
+
+
+async def test_sync_classes_to_calendar_query_budget(
+    session: AsyncSession,
+    session_manager: SessionManager,  # noqa: ARG001
+    monkeypatch: pytest.MonkeyPatch,
+):
+    monkeypatch.setenv("DB_STREAM_CHUNK_SIZE", "10")
+    monkeypatch.setattr(bot, "CalendarRepository", FakeCalendarRepository)
+    course_names = ["Этика искусственного интеллекта", "Продвинутый курс научных исследований"]
+    await DBRepository.add_classes([p for name in course_names for p in make_pairs(name, 25)], session=session)
+
+    # courses, statuses, then for each course: calendar id update, stream and 3 chunk updates
+    with assert_max_queries(12):
+        await bot.sync_classes_to_calendar()
+
+    result = await session.execute(select(Class.class_status_id, Class.gcal_event_id))
+    rows = result.tuples().all()
+    assert len(rows) == 50
+    assert all(status == get_class_status_id(ClassStatus.synced) and event_id for status, event_id in rows)
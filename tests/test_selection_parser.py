@@ -0,0 +1,57 @@
+from pathlib import Path
+
+import pytest
+from openpyxl import Workbook
+
+from itmo_ai_timetable.selection_parser import SelectionParser
+
+
+@pytest.fixture
+def selection_file(tmp_path: Path) -> str:
+    wb = Workbook()
+    sheet = wb.active
+    sheet["A1"] = "Таблица предвыборности"
+    sheet["C3"] = "Этика ИИ"
+    sheet["D3"] = "Рекомендательные системы"
+    sheet["E3"] = "Ранжирование и матчинг"
+    sheet["F3"] = "Вне диапазона"
+    for row, (name, selected) in enumerate(
+        [
+            ("Иванов Иван", "CD"),
+            ("Петров Петр", "DE"),
+            ("Сидорова Анна", ""),
+            (None, "CDE"),
+        ],
+        start=4,
+    ):
+        sheet[f"A{row}"] = name
+        for column in selected:
+            sheet[f"{column}{row}"] = 1
+        sheet[f"F{row}"] = 1
+    path = tmp_path / "selection.xlsx"
+    wb.save(path)
+    return str(path)
+
+
+def test_parse(selection_file: str):
+    selected = SelectionParser(selection_file, "Sheet", 3, "C", "E").parse()
+
+    assert selected == {
+        "Иванов Иван": ["Этика искусственного интеллекта", "Рекомендательные системы"],
+        "Петров Петр": ["Рекомендательные системы", "Ранжирование и матчинг"],
+    }
+
+
+def test_parse_matrix(selection_file: str):
+    matrix = SelectionParser(selection_file, "Sheet", 3, "C", "E").parse_matrix()
+
+    assert matrix.students == ["Иванов Иван", "Петров Петр", "Сидорова Анна"]
+    assert matrix.enrolment_counts() == {
+        "Этика искусственного интеллекта": 1,
+        "Рекомендательные системы": 2,
+        "Ранжирование и матчинг": 1,
+    }
+    assert matrix.students_of("Рекомендательные системы") == ["Иванов Иван", "Петров Петр"]
+    assert matrix.overlap("Рекомендательные системы", "Ранжирование и матчинг") == 1
+    assert matrix.courses_of(2) == []
+    assert matrix.to_dict(with_empty=True)["Сидорова Анна"] == []
@@ -0,0 +1,29 @@
+import pytest
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from itmo_ai_timetable.db.session_manager import SessionManager, unit_of_work, with_async_session
+
+
+@with_async_session
+async def get_session(*, session: AsyncSession) -> AsyncSession:
+    return session
+
+
+async def test_unit_of_work_shares_session(session_manager: SessionManager):
+    async with unit_of_work() as session:
+        assert await get_session() is session
+        async with unit_of_work() as nested_session:
+            assert nested_session is session
+        assert session_manager.pool_status()["checked_out"] == 1
+
+    assert session_manager.pool_status()["checked_out"] == 0
+    assert await get_session() is not session
+
+
+async def test_unit_of_work_rollback(session_manager: SessionManager):  # noqa: ARG001
+    with pytest.raises(ValueError, match="failed"):
+        async with unit_of_work():
+            raise ValueError("failed")
+
+    async with unit_of_work() as session:
+        assert await get_session() is session
@@ -9,6 +9,7 @@ from openpyxl.styles import PatternFill
 
 from itmo_ai_timetable.schedule_parser import ScheduleParser
 from itmo_ai_timetable.schemes import Pair
+from itmo_ai_timetable.xlsx_reader import load_sheet
 
 # Set up dates and time slots
 timezone = tz.gettz("Europe/Moscow")
@@ -90,6 +91,12 @@ def test_get_days(timetable_file: ScheduleParser):
     assert all(isinstance(day, openpyxl.worksheet.merge.MergedCellRange) for day in days)
 
 
+def test_find_mergedcell_mergerange(timetable_file: ScheduleParser):
+    merged_range = timetable_file._find_mergedcell_mergerange(timetable_file.sheet["F15"])
+    assert merged_range.coord == "F14:F15"
+    assert timetable_file._get_first_cell_from_range(merged_range).coordinate == "F14"
+
+
 def test_pair_time(timetable_file: ScheduleParser):
     cell = timetable_file.sheet["E7"]
     day = datetime(2024, 2, 5, tzinfo=timezone)
@@ -100,41 +107,41 @@ def test_pair_time(timetable_file: ScheduleParser):
 
 def test_find_time_in_cell(timetable_file: ScheduleParser):
     cell_value = "Машинное обучение на больших данных (Big Data ML)"
-    cleaned, start, end = timetable_file._find_time_in_cell(cell_value)
-    assert cleaned == "Машинное обучение на больших данных (Big Data ML)"
-    assert start is None
-    assert end is None
+    match = timetable_file._matcher.match(cell_value)
+    assert match.title == "Машинное обучение на больших данных (Big Data ML)"
+    assert match.start is None
+    assert match.end is None
 
 
 def test_find_key_words_in_cell(timetable_file: ScheduleParser):
     cell_value = "Глубокие генеративные модели (Deep Generative Models)"
-    cleaned, keyword = timetable_file._find_key_words_in_cell(cell_value)
-    assert cleaned == "Глубокие генеративные модели (Deep Generative Models)"
-    assert keyword is None
+    match = timetable_file._matcher.match(cell_value)
+    assert match.title == "Глубокие генеративные модели (Deep Generative Models)"
+    assert match.pair_type is None
 
 
 async def test_removes_keyword_from_title(timetable_file: ScheduleParser):
     timetable_file.settings.keywords = ["Зачет"]
     cell_title = timetable_file.sheet["F19"].value
-    title, keyword = timetable_file._find_key_words_in_cell(cell_title)
-    assert title == "Глубокие генеративные модели (Deep Generative Models)"
-    assert keyword == "Зачет"
+    match = timetable_file._matcher.match(cell_title)
+    assert match.title == "Глубокие генеративные модели (Deep Generative Models)"
+    assert match.pair_type == "Зачет"
 
 
 async def test_time_from_name(timetable_file: ScheduleParser):
     timetable_file.settings.keywords = ["Зачет"]
     cell_title = timetable_file.sheet["F20"].value
-    title, start_time, end_time = timetable_file._find_time_in_cell(cell_title)
-    assert title == "C++ hard"
-    assert start_time == (18, 30)
-    assert end_time == (20, 0)
+    match = timetable_file._matcher.match(cell_title)
+    assert match.title == "C++ hard"
+    assert match.start == (18, 30)
+    assert match.end == (20, 0)
 
 
 def test_process_cell(timetable_file: ScheduleParser):
     cell = timetable_file.sheet["F11"]
-    title, keyword, link = timetable_file._process_cell(cell)
-    assert title == "Безопасность ИИ Чат курса"
-    assert keyword is None
+    match, link = timetable_file._match_cell(cell)
+    assert match.title == "Безопасность ИИ Чат курса"
+    assert match.pair_type is None
     assert link is None
 
 
@@ -146,3 +153,62 @@ def test_parse(timetable_file: ScheduleParser):
     assert pairs[0].name == "Безопасность ИИ Чат курса"
     assert pairs[0].start_time == datetime(now.year, now.month, 5, 17, 0, tzinfo=timezone)
     assert pairs[0].end_time == datetime(now.year, now.month, 5, 18, 30, tzinfo=timezone)
+
+
+def test_parse_batch(timetable_file: ScheduleParser):
+    batch = timetable_file.parse_batch()
+    assert len(batch) == 6
+    assert batch.to_pairs() == timetable_file.parse()
+
+
+def test_load_sheet_matches_full_workbook(tmp_path: Path, sample_workbook: Workbook):
+    sample_workbook.active["F12"].hyperlink = "https://example.com/course"
+    file_path = tmp_path / "test_timetable.xlsx"
+    sample_workbook.save(file_path)
+
+    full_sheet = openpyxl.load_workbook(file_path)["Sheet"]
+    sheet = load_sheet(str(file_path), "Sheet")
+
+    assert {r.coord for r in sheet.merged_cells.ranges} == {r.coord for r in full_sheet.merged_cells.ranges}
+    for row in full_sheet.iter_rows():
+        for cell in row:
+            assert sheet.cell(row=cell.row, column=cell.column).value == cell.value
+    assert sheet["F12"].hyperlink.target == "https://example.com/course"
+
+    pairs = ScheduleParser(str(file_path), "Sheet").parse()
+    assert [p.link for p in pairs if p.name == "Разработка приложений разговорного искусственного интеллекта"] == [
+        "https://example.com/course"
+    ]
+
+
+def test_parse_incremental(tmp_path: Path, sample_workbook: Workbook):
+    file_path = tmp_path / "test_timetable.xlsx"
+    sample_workbook.save(file_path)
+    delta, snapshot = ScheduleParser(str(file_path), "Sheet").parse_incremental()
+    assert len(delta.added) == 6
+    assert not delta.removed
+    assert len(snapshot) == TOTAL_DAYS
+
+    # change only the second day
+    sample_workbook.active["F19"] = "Глубокие генеративные модели (Deep Generative Models)\nЭкзамен"
+    sample_workbook.active["G19"] = "Новый курс"
+    sample_workbook.save(file_path)
+    parser = ScheduleParser(str(file_path), "Sheet")
+    parsed_days = []
+    parse_day = parser._parse_day
+
+    def track_parse_day(day, day_cell, batch):
+        parsed_days.append(day_cell.coord)
+        parse_day(day, day_cell, batch)
+
+    parser._parse_day = track_parse_day
+
+    delta, new_snapshot = parser.parse_incremental(snapshot)
+
+    assert parsed_days == ["B14:B20"]
+    assert [p.name for p in delta.added] == ["Новый курс"]
+    assert not delta.removed
+    assert [(p.name, p.pair_type) for p in delta.changed] == [
+        ("Глубокие генеративные модели (Deep Generative Models)", "Экзамен"),
+    ]
+    assert len(new_snapshot.keys() & snapshot.keys()) == TOTAL_DAYS - 1
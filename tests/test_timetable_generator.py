@@ -0,0 +1,34 @@
+from pathlib import Path
+
+from benchmarks.timetable_generator import (
+    SELECTION_COURSE_ROW,
+    SelectionSize,
+    TimetableSize,
+    generate_selection,
+    generate_timetable,
+)
+from itmo_ai_timetable.schedule_parser import ScheduleParser
+from itmo_ai_timetable.selection_parser import SelectionParser
+
+
+def test_generated_timetable_is_parsed(tmp_path: Path):
+    path = tmp_path / "timetable.xlsx"
+    size = TimetableSize(days=5, merged_density=0.5, hyperlink_density=0.5, time_density=0.5)
+
+    classes = generate_timetable(path, size)
+    pairs = ScheduleParser(str(path), "Sheet").parse()
+
+    assert classes > 0
+    assert len(pairs) == classes
+    assert any(pair.link for pair in pairs)
+    assert any(pair.pair_type for pair in pairs)
+
+
+def test_generated_selection_is_parsed(tmp_path: Path):
+    path = tmp_path / "selection.xlsx"
+
+    first_column, last_column = generate_selection(path, SelectionSize(students=10, courses=5, select_density=1))
+    selected = SelectionParser(str(path), "Sheet", SELECTION_COURSE_ROW, first_column, last_column).parse()
+
+    assert len(selected) == 10
+    assert all(len(courses) == 5 for courses in selected.values())
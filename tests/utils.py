@@ -1,7 +1,10 @@
+from collections.abc import Iterator
+from contextlib import contextmanager
 from pathlib import Path
 from types import SimpleNamespace
 
 from alembic.config import Config
+from sqlalchemy import Engine, event
 
 from itmo_ai_timetable.settings import Settings
 
@@ -28,3 +31,19 @@ def make_alembic_config(cmd_opts: SimpleNamespace, base_path: Path = PROJECT_PAT
         config.set_main_option("sqlalchemy.url", database_uri)
 
     return config
+
+
+@contextmanager
+def assert_max_queries(n: int) -> Iterator[list[str]]:
+    """Fail if more than `n` SQL statements are sent by any engine inside the block, yields the statements."""
+    statements: list[str] = []
+
+    def before_cursor_execute(conn, cursor, statement, *args) -> None:  # noqa: ARG001
+        statements.append(statement)
+
+    event.listen(Engine, "before_cursor_execute", before_cursor_execute)
+    try:
+        yield statements
+    finally:
+        event.remove(Engine, "before_cursor_execute", before_cursor_execute)
+    assert len(statements) <= n, f"{len(statements)} statements sent, budget is {n}:\n" + "\n".join(statements)